@@ -0,0 +1,451 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from brackets import create_bracket
+from export import export_tournament
+from history import take_snapshot
+from pairings import round_robin_pairs, swiss_pairings
+from schedule import plan_tournament
+from tournament_engine import CONNECTION_PROFILES, DEFAULT_DB_PATH, TournamentEngine, connect
+
+# Benchmarks always run on a copy of the database, never on the real file.
+
+
+def copy_database(source_path, directory, name):
+    target_path = os.path.join(directory, name)
+    shutil.copyfile(source_path, target_path)
+    return target_path
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def first_entrant(engine):
+    # (EventID, EventType, entrant ID) of some registration to update
+    row = engine.conn.execute("""
+        SELECT ep.EventID, e.EventType, COALESCE(ep.ParticipantID, ep.TeamID)
+        FROM EventParticipants ep
+        INNER JOIN Events e ON e.EventID = ep.EventID
+        ORDER BY ep.EventParticipantID
+        LIMIT 1
+    """).fetchone()
+    if row is None:
+        raise SystemExit("The database has no registrations to benchmark with.")
+    return row
+
+
+def measure_commit_latency(db_path, profile, commits):
+    # One score update + commit at a time, like edit_points
+    engine = TournamentEngine(db_path, profile)
+    event_id, event_type, entrant_id = first_entrant(engine)
+    latencies = []
+    for points in range(commits):
+        start = time.perf_counter()
+        engine.update_points(event_id, event_type, entrant_id, points)
+        latencies.append((time.perf_counter() - start) * 1000)
+    engine.close()
+    return {
+        'commits': commits,
+        'mean_ms': statistics.mean(latencies),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'max_ms': max(latencies),
+    }
+
+
+def measure_concurrent_reads(db_path, profile, readers, seconds):
+    # Reader threads load event leaderboards while one writer keeps committing score updates
+    setup = TournamentEngine(db_path, profile)
+    event_id, event_type, entrant_id = first_entrant(setup)
+    setup.close()
+
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0]
+    errors = [0]
+
+    def reader(index):
+        conn = connect(db_path, profile)
+        while not stop.is_set():
+            try:
+                conn.execute("""
+                    SELECT ep.EventParticipantID, ep.PointsEarned
+                    FROM EventParticipants ep
+                    WHERE ep.EventID = ?
+                    ORDER BY ep.PointsEarned DESC
+                """, (event_id,)).fetchall()
+                reads[index] += 1
+            except Exception:
+                errors[0] += 1
+        conn.close()
+
+    def writer():
+        engine = TournamentEngine(db_path, profile)
+        points = 0
+        while not stop.is_set():
+            try:
+                engine.update_points(event_id, event_type, entrant_id, points)
+                writes[0] += 1
+            except Exception:
+                engine.conn.rollback()
+                errors[0] += 1
+            points += 1
+        engine.close()
+
+    threads = [threading.Thread(target=reader, args=(index,)) for index in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'readers': readers,
+        'seconds': seconds,
+        'reads_per_second': sum(reads) / seconds,
+        'writes_per_second': writes[0] / seconds,
+        'errors': errors[0],
+    }
+
+
+def run_connection_benchmark(source_path, profiles, commits, readers, seconds):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in profiles:
+            db_path = copy_database(source_path, directory, f"{profile}.db")
+            results[profile] = {
+                'settings': CONNECTION_PROFILES[profile],
+                'commit_latency': measure_commit_latency(db_path, profile, commits),
+                'concurrent_reads': measure_concurrent_reads(db_path, profile, readers, seconds),
+            }
+    return results
+
+
+def print_connection_results(results):
+    print(f"{'profile':<10} {'commit mean':>12} {'p95':>9} {'reads/s':>10} {'writes/s':>10} {'errors':>7}")
+    for profile, result in results.items():
+        latency = result['commit_latency']
+        concurrent = result['concurrent_reads']
+        print(f"{profile:<10} {latency['mean_ms']:>10.3f}ms {latency['p95_ms']:>7.3f}ms "
+              f"{concurrent['reads_per_second']:>10.0f} {concurrent['writes_per_second']:>10.0f} "
+              f"{concurrent['errors']:>7}")
+
+
+# ---------- Synthetic tournaments ----------
+
+# Sizes for generate/suite; any of them can be overridden on the command line
+SCALES = {
+    'small': {'tournaments': 1, 'individual_events': 5, 'team_events': 5, 'individuals': 200, 'teams': 40,
+              'team_members': 5, 'registrations_per_event': 100},
+    'medium': {'tournaments': 10, 'individual_events': 20, 'team_events': 20, 'individuals': 5000, 'teams': 1000,
+               'team_members': 5, 'registrations_per_event': 2000},
+    'large': {'tournaments': 200, 'individual_events': 10, 'team_events': 10, 'individuals': 2000, 'teams': 400,
+              'team_members': 5, 'registrations_per_event': 1000},
+}
+
+
+def generate_database(db_path, individual_events, team_events, individuals, teams, team_members,
+                      registrations_per_event, tournaments=1, seed=0):
+    # Creates a new database file with random entrants and points; every tournament gets the sizes
+    # given. The tournaments' limits are raised to fit, the point is to see how the program
+    # behaves far beyond the usual ones.
+    if os.path.exists(db_path):
+        raise SystemExit(f"{db_path} already exists, pick a new file name.")
+    rng = random.Random(seed)
+
+    engine = TournamentEngine(db_path)  # creates the current schema and tournament 1
+    conn = engine.conn
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO Tournaments (TournamentID, Name) VALUES (?, ?)",
+                     ((tournament_id, f"Tournament {tournament_id}") for tournament_id in range(2, tournaments + 1)))
+    conn.execute("UPDATE Tournaments SET MaxParticipants = ?, MaxIndividuals = ?, MaxTeams = ?, MaxTeamMembers = ?",
+                 (individuals + teams * team_members, individuals, teams, team_members))
+
+    registration_count = 0
+    for tournament_id in range(1, tournaments + 1):
+        # IDs are global, each tournament gets its own range
+        first_participant = (tournament_id - 1) * (individuals + teams * team_members)
+        first_team = (tournament_id - 1) * teams
+
+        conn.executemany("INSERT INTO Events (TournamentID, EventName, EventType, PointsAllocated) VALUES (?, ?, ?, ?)",
+                         [(tournament_id, f"Individual event {n}", 'Individual', 110)
+                          for n in range(1, individual_events + 1)]
+                         + [(tournament_id, f"Team event {n}", 'Team-based', 40) for n in range(1, team_events + 1)])
+        conn.executemany("INSERT INTO Teams (TeamID, TournamentID, TeamName) VALUES (?, ?, ?)",
+                         ((first_team + n, tournament_id, f"Team{n}") for n in range(1, teams + 1)))
+        conn.executemany("INSERT INTO Participants (ParticipantID, TournamentID, Name, TeamID) VALUES (?, ?, ?, NULL)",
+                         ((first_participant + n, tournament_id, f"Player{n}") for n in range(1, individuals + 1)))
+        conn.executemany("INSERT INTO Participants (ParticipantID, TournamentID, Name, TeamID) VALUES (?, ?, ?, ?)",
+                         ((first_participant + individuals + (n - 1) * team_members + member, tournament_id,
+                           f"Team{n} member {member}", first_team + n)
+                          for n in range(1, teams + 1) for member in range(1, team_members + 1)))
+
+        registrations = []
+        for event_id, event_type in conn.execute("SELECT EventID, EventType FROM Events WHERE TournamentID = ?",
+                                                 (tournament_id,)).fetchall():
+            if event_type == 'Individual':
+                entrants = rng.sample(range(first_participant + 1, first_participant + individuals + 1),
+                                      min(registrations_per_event, individuals))
+                registrations.extend((tournament_id, event_id, entrant_id, None, rng.randint(0, 110))
+                                     for entrant_id in entrants)
+            else:
+                entrants = rng.sample(range(first_team + 1, first_team + teams + 1), min(registrations_per_event, teams))
+                registrations.extend((tournament_id, event_id, None, entrant_id, rng.randint(0, 40))
+                                     for entrant_id in entrants)
+        conn.executemany("INSERT INTO EventParticipants (TournamentID, EventID, ParticipantID, TeamID, PointsEarned) "
+                         "VALUES (?, ?, ?, ?, ?)", registrations)
+        registration_count += len(registrations)
+
+    conn.commit()
+    # History replays start from here instead of going through the whole generated log
+    for tournament_id in range(1, tournaments + 1):
+        engine.use_tournament(tournament_id)
+        take_snapshot(engine)
+    conn.execute("ANALYZE")
+    engine.close()
+    return registration_count
+
+
+# ---------- Operation suite ----------
+
+def time_operation(function, repeat):
+    # Runs function(i) repeat times and summarises the wall-clock time of each call
+    latencies = []
+    for index in range(repeat):
+        start = time.perf_counter()
+        function(index)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'calls': repeat,
+        'mean_ms': statistics.mean(latencies),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'max_ms': max(latencies),
+        'ops_per_second': repeat / (sum(latencies) / 1000) if sum(latencies) else None,
+    }
+
+
+def run_suite(db_path, repeat, seed=0):
+    # Times the core operations on db_path (which is changed, so pass a copy)
+    rng = random.Random(seed)
+    engine = TournamentEngine(db_path)
+    # Room for the registrations timed below
+    engine.set_limits(engine.max_participants + 10 * repeat, engine.max_individuals + 10 * repeat,
+                      engine.max_teams + 10 * repeat, max(engine.max_team_members, 5))
+
+    events = {event_type: [event_id for event_id, _ in engine.load_events(event_type)]
+              for event_type in ('Individual', 'Team-based')}
+    registrations = engine.conn.execute("""
+        SELECT ep.EventID, e.EventType, COALESCE(ep.ParticipantID, ep.TeamID)
+        FROM EventParticipants ep
+        INNER JOIN Events e ON e.EventID = ep.EventID
+        WHERE ep.TournamentID = ?
+    """, (engine.tournament_id,)).fetchall()
+    if not registrations or not events['Individual'] or not events['Team-based']:
+        raise SystemExit("The database needs individual and team events with registrations to benchmark.")
+    all_events = [(event_id, event_type) for event_type, event_ids in events.items() for event_id in event_ids]
+    run_id = rng.randrange(10 ** 9)
+
+    def register_individual(index):
+        engine.register_individual(f"Bench {run_id} {index}", rng.sample(events['Individual'],
+                                                                          min(3, len(events['Individual']))))
+
+    def register_team(index):
+        engine.register_team(f"Bench team {run_id} {index}",
+                             [f"Bench {run_id} {index} member {member}" for member in range(5)],
+                             rng.sample(events['Team-based'], min(3, len(events['Team-based']))))
+
+    def update_points(index):
+        event_id, event_type, entrant_id = rng.choice(registrations)
+        engine.update_points(event_id, event_type, entrant_id, rng.randint(0, 110))
+
+    def update_points_many(index):
+        event_id, event_type = rng.choice(all_events)
+        entrants = [row[1] for row in engine.event_leaderboard(event_id, event_type)]
+        engine.update_points_many(event_id, event_type, [(entrant_id, rng.randint(0, 110)) for entrant_id in entrants])
+
+    def leaderboard_page(index):
+        event_id, event_type = rng.choice(all_events)
+        engine.event_entrant_count(event_id, event_type)
+        engine.event_leaderboard(event_id, event_type, 0, 50)
+
+    def leaderboard_full(index):
+        event_id, event_type = rng.choice(all_events)
+        engine.event_leaderboard(event_id, event_type)
+
+    def scoreboard_page(index):
+        engine.scoreboard_count()
+        engine.scoreboard(0, 50)
+
+    def scoreboard_full(index):
+        engine.scoreboard()
+
+    # Brackets are drawn for the biggest individual event. Rounds are paired for a field of the same
+    # size (at least 1000) halfway through a Swiss event: everyone has met 10 random opponents and
+    # has 0-20 match points.
+    bracket_event = max(events['Individual'], key=lambda event_id: engine.event_entrant_count(event_id, 'Individual'))
+    field = list(range(1, max(1000, engine.event_entrant_count(bracket_event, 'Individual')) + 1))
+    met = {registration: set(rng.sample(field, 10)) for registration in field}
+    match_points = {registration: rng.randint(0, 20) for registration in field}
+    standings = sorted(field, key=lambda registration: -match_points[registration])
+
+    with tempfile.TemporaryDirectory() as export_directory:
+        operations = {
+            'register_individual': (register_individual, repeat),
+            'register_team': (register_team, repeat),
+            'update_points': (update_points, repeat),
+            'update_points_many': (update_points_many, max(1, repeat // 10)),
+            'leaderboard_page': (leaderboard_page, repeat),
+            'leaderboard_full': (leaderboard_full, max(1, repeat // 10)),
+            'scoreboard_page': (scoreboard_page, repeat),
+            'scoreboard_full': (scoreboard_full, max(1, repeat // 10)),
+            'bracket_single': (lambda index: create_bracket(engine, bracket_event, 'single', replace=True),
+                               max(1, repeat // 50)),
+            'bracket_double': (lambda index: create_bracket(engine, bracket_event, 'double', replace=True),
+                               max(1, repeat // 50)),
+            'swiss_pairing': (lambda index: swiss_pairings(standings, match_points, met), max(1, repeat // 10)),
+            'round_robin_pairing': (lambda index: round_robin_pairs(field, index + 1), max(1, repeat // 10)),
+            'schedule_plan': (lambda index: plan_tournament(engine, [(f"Venue {venue}", None) for venue in range(4)]),
+                              max(1, repeat // 50)),
+            'export': (lambda index: export_tournament(engine, export_directory), max(1, repeat // 50)),
+        }
+        results = {name: time_operation(function, count) for name, (function, count) in operations.items()}
+
+    engine.close()
+    return results
+
+
+def database_size(engine):
+    counts = {}
+    for table in ('Tournaments', 'Events', 'Participants', 'Teams', 'EventParticipants'):
+        counts[table] = engine.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+
+def run_benchmark_suite(scale, source_path=None, repeat=200, seed=0):
+    # Returns the machine-readable report: environment, data size and one entry per operation
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "suite.db")
+        start = time.perf_counter()
+        if source_path:
+            shutil.copyfile(source_path, db_path)
+        else:
+            generate_database(db_path, seed=seed, **scale)
+        setup_seconds = time.perf_counter() - start
+
+        engine = TournamentEngine(db_path)
+        size = database_size(engine)
+        engine.close()
+
+        operations = run_suite(db_path, repeat, seed)
+
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'scale': None if source_path else scale,
+        'source': source_path,
+        'rows': size,
+        'setup_seconds': setup_seconds,
+        'repeat': repeat,
+        'operations': operations,
+    }
+
+
+def print_suite_results(report, baseline=None):
+    # With a baseline report, shows how much slower (+) or faster (-) each mean got
+    print("rows: " + ", ".join(f"{table} {count}" for table, count in report['rows'].items()))
+    header = f"{'operation':<22} {'calls':>6} {'mean':>11} {'p95':>11} {'max':>11}"
+    print(header + (f" {'vs baseline':>12}" if baseline else ""))
+    for name, result in report['operations'].items():
+        line = (f"{name:<22} {result['calls']:>6} {result['mean_ms']:>9.3f}ms "
+                f"{result['p95_ms']:>9.3f}ms {result['max_ms']:>9.3f}ms")
+        previous = baseline['operations'].get(name) if baseline else None
+        if previous:
+            change = (result['mean_ms'] - previous['mean_ms']) / previous['mean_ms'] * 100
+            line += f" {change:>+11.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tournament database benchmarks (always run on a copy).")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    connection_parser = subparsers.add_parser('connection', help="compare SQLite connection profiles")
+    connection_parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database to copy and benchmark")
+    connection_parser.add_argument('--profiles', nargs='+', default=list(CONNECTION_PROFILES),
+                                   choices=list(CONNECTION_PROFILES))
+    connection_parser.add_argument('--commits', type=int, default=300, help="single-row commits to time")
+    connection_parser.add_argument('--readers', type=int, default=4, help="concurrent reader threads")
+    connection_parser.add_argument('--seconds', type=float, default=3.0, help="length of the concurrent run")
+    connection_parser.add_argument('--json', help="also write the results to this file")
+
+    def add_scale_arguments(subparser):
+        subparser.add_argument('--scale', choices=list(SCALES), default='small', help="preset data size")
+        for name in SCALES['small']:
+            subparser.add_argument('--' + name.replace('_', '-'), type=int, dest=name,
+                                   help=f"override the preset's {name.replace('_', ' ')}")
+        subparser.add_argument('--seed', type=int, default=0, help="random seed, same seed gives the same data")
+
+    generate_parser = subparsers.add_parser('generate', help="create a synthetic tournament database")
+    generate_parser.add_argument('output', help="new database file to create")
+    add_scale_arguments(generate_parser)
+
+    suite_parser = subparsers.add_parser('suite', help="time registration, scoring, leaderboards and export")
+    add_scale_arguments(suite_parser)
+    suite_parser.add_argument('--db', help="benchmark a copy of this database instead of generated data")
+    suite_parser.add_argument('--repeat', type=int, default=200, help="calls per operation")
+    suite_parser.add_argument('--compare', help="earlier --json report to compare against")
+    suite_parser.add_argument('--json', help="also write the report to this file")
+
+    args = parser.parse_args(argv)
+
+    if args.command in ('generate', 'suite'):
+        scale = dict(SCALES[args.scale])
+        for name in scale:
+            if getattr(args, name) is not None:
+                scale[name] = getattr(args, name)
+
+    if args.command == 'connection':
+        results = run_connection_benchmark(args.db, args.profiles, args.commits, args.readers, args.seconds)
+        print_connection_results(results)
+
+    elif args.command == 'generate':
+        start = time.perf_counter()
+        registrations = generate_database(args.output, seed=args.seed, **scale)
+        print(f"Created {args.output} with {registrations} registrations in {time.perf_counter() - start:.1f}s")
+        return 0
+
+    elif args.command == 'suite':
+        results = run_benchmark_suite(scale, args.db, args.repeat, args.seed)
+        baseline = None
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as json_file:
+                baseline = json.load(json_file)
+        print_suite_results(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(results, json_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
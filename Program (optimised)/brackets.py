@@ -0,0 +1,450 @@
+import argparse
+import random
+import sys
+from datetime import datetime
+
+from pairings import assign_sides, round_robin_pairs, round_robin_rounds, swiss_pairings
+from tournament_engine import TournamentEngine, RegistrationError, DEFAULT_DB_PATH, DEFAULT_TOURNAMENT_ID
+
+# Head-to-head events: knockout brackets and Swiss rounds between the registrations of one event.
+#   python brackets.py create --event 6 --format double
+#   python brackets.py result --match 17 --score 3 1
+#   python brackets.py next-round --event 6          (Swiss and round robin)
+#   python brackets.py show --event 6
+# Formats:
+#   single  single elimination; the field is filled up to a power of two with byes for the top seeds
+#   double  double elimination: a first loss drops an entrant into the losers bracket, whose winner
+#           meets the winners bracket winner in the final (one match, no reset)
+#   swiss   a fixed number of rounds; every round pairs entrants with the same record who have not
+#           met yet, and the lowest-ranked entrant without one gets a bye when the field is odd
+#   round_robin  everyone meets everyone once, one round at a time (in an odd field everyone has one bye)
+# Swiss and round-robin rounds are paired by pairings.py, which also balances the sides (A/B) each
+# entrant plays on. A round robin follows registration order, so its field shouldn't change once started.
+# A bracket manages the event's points: every result sets both entrants' PointsEarned to the share
+# of the event's PointsAllocated they have won, so standings, live pushes and history follow it.
+
+FORMATS = ('single', 'double', 'swiss', 'round_robin')
+PAIRED_FORMATS = ('swiss', 'round_robin')  # played in rounds paired one at a time
+SEEDINGS = ('points', 'registration', 'random')
+
+
+# ---------- Knockout brackets ----------
+
+EMPTY = 0  # a bracket slot that no entrant will reach (registration ids start at 1)
+
+
+class PlannedMatch:
+    __slots__ = ('bracket', 'round', 'position', 'slots', 'status', 'winner', 'winner_to', 'loser_to',
+                 'winner_sent', 'loser_sent')
+
+    def __init__(self, bracket, round_number, position):
+        self.bracket = bracket
+        self.round = round_number
+        self.position = position
+        self.slots = [None, None]  # None until known, then EMPTY or an EventParticipantID
+        self.status = 'waiting'
+        self.winner = None
+        self.winner_to = None  # (PlannedMatch, slot index) the winner moves on to
+        self.loser_to = None
+        self.winner_sent = False
+        self.loser_sent = False
+
+
+def seed_order(size):
+    # Seeds in bracket order, so that seeds 1 and 2 can only meet in the final: 1, 8, 4, 5, 2, 7, 3, 6
+    order = [1]
+    while len(order) < size:
+        total = 2 * len(order) + 1
+        order = [seed for first in order for seed in (first, total - first)]
+    return order
+
+
+def elimination_plan(registrations, double=False):
+    # Every match of a knockout bracket for registrations (best seed first), as (matches, rounds)
+    # where rounds is the number of wins that take an entrant from the first round to the title.
+    # Byes are played out here, and later results skip past matches that became byes.
+    rounds = max(1, (len(registrations) - 1).bit_length())
+    size = 1 << rounds
+    matches = []
+
+    def add(bracket, round_number, count):
+        planned = [PlannedMatch(bracket, round_number, position) for position in range(count)]
+        matches.extend(planned)
+        return planned
+
+    winners = [add('winners', round_number, size >> round_number) for round_number in range(1, rounds + 1)]
+    for round_matches, next_matches in zip(winners, winners[1:]):
+        for position, match in enumerate(round_matches):
+            match.winner_to = (next_matches[position // 2], position % 2)
+    order = seed_order(size)
+    for position, match in enumerate(winners[0]):
+        match.slots = [registrations[seed - 1] if seed <= len(registrations) else EMPTY
+                       for seed in order[2 * position:2 * position + 2]]
+
+    if double:
+        final = add('final', 1, 1)[0]
+        winners[-1][0].winner_to = (final, 0)
+        if rounds == 1:
+            winners[0][0].loser_to = (final, 1)
+        else:
+            # Losers round 2j-1 pairs off the survivors, losers round 2j meets the losers of winners
+            # round j+1 (in reverse order, to put off rematches)
+            losers = [add('losers', round_number, size >> ((round_number + 1) // 2 + 1))
+                      for round_number in range(1, 2 * rounds - 1)]
+            for position, match in enumerate(winners[0]):
+                match.loser_to = (losers[0][position // 2], position % 2)
+            for index, round_matches in enumerate(losers):
+                round_number = index + 1
+                if round_number % 2:
+                    dropping = winners[round_number // 2 + 1]
+                    for position, match in enumerate(losers[index + 1]):
+                        round_matches[position].winner_to = (match, 0)
+                        dropping[len(dropping) - 1 - position].loser_to = (match, 1)
+                elif index + 1 < len(losers):
+                    for position, match in enumerate(round_matches):
+                        match.winner_to = (losers[index + 1][position // 2], position % 2)
+            losers[-1][0].winner_to = (final, 1)
+        rounds += 1
+
+    for match in winners[0]:
+        settle(match)
+    for match in matches:
+        if match.status != 'bye' and None not in match.slots:
+            match.status = 'ready'
+    return matches, rounds
+
+
+def settle(match):
+    # Plays out a match that has an EMPTY slot: its entrant, if any, goes through and its loser's
+    # slot further on becomes EMPTY
+    if EMPTY not in match.slots:
+        return
+    match.status = 'bye'
+    other = match.slots[1] if match.slots[0] == EMPTY else match.slots[0]
+    if not match.loser_sent:
+        match.loser_sent = True
+        deliver(match.loser_to, EMPTY)
+    if other is not None and not match.winner_sent:
+        match.winner_sent = True
+        match.winner = other or None
+        deliver(match.winner_to, other)
+
+
+def deliver(target, entrant):
+    if target is not None:
+        match, slot = target
+        match.slots[slot] = entrant
+        settle(match)
+
+
+def played_target(target):
+    # Where an entrant really goes next: past any byes, whose one entrant just goes through
+    while target is not None and target[0].status == 'bye':
+        target = target[0].winner_to
+    return target
+
+
+# ---------- Paired rounds ----------
+
+def paired_history(registrations, match_rows):
+    # What pairing a Swiss or round-robin round needs to know, from the event's registrations (in
+    # seeding order) and its event_matches rows, as (standings best first, match points, opponents
+    # met, entrants that had a bye, side balance, last side). A win or a bye is 2 match points, a
+    # draw 1; side A counts +1 in the balance and side B -1.
+    scores = dict.fromkeys(registrations, 0)
+    opponents = {registration: set() for registration in registrations}
+    had_bye = set()
+    balance = {}
+    last_side = {}
+    for _, _, _, _, first, second, _, _, winner, status in match_rows:
+        if status == 'bye':
+            had_bye.add(winner)
+        elif status == 'done':
+            opponents.setdefault(first, set()).add(second)
+            opponents.setdefault(second, set()).add(first)
+        if status != 'bye':
+            balance[first] = balance.get(first, 0) + 1
+            balance[second] = balance.get(second, 0) - 1
+            last_side[first] = 'A'
+            last_side[second] = 'B'
+        if winner is not None:
+            if winner in scores:
+                scores[winner] += 2
+        elif status == 'done':
+            for registration in (first, second):
+                if registration in scores:
+                    scores[registration] += 1
+    seed = {registration: position for position, registration in enumerate(registrations)}
+    standings = sorted(registrations, key=lambda registration: (-scores[registration], seed[registration]))
+    return standings, scores, opponents, had_bye, balance, last_side
+
+
+def paired_round_plan(bracket, round_number, pairs, bye):
+    matches = []
+    for position, slots in enumerate(pairs):
+        match = PlannedMatch(bracket, round_number, position)
+        match.slots = list(slots)
+        match.status = 'ready'
+        matches.append(match)
+    if bye is not None:
+        match = PlannedMatch(bracket, round_number, len(pairs))
+        match.slots = [bye, None]
+        match.status = 'bye'
+        match.winner = bye
+        matches.append(match)
+    return matches
+
+
+def pair_round(bracket_format, round_number, registrations, match_rows):
+    # The matches of the next round of a Swiss or round-robin event, as (matches, rematches)
+    standings, scores, opponents, had_bye, balance, last_side = paired_history(registrations, match_rows)
+    if bracket_format == 'round_robin':
+        pairs, bye = round_robin_pairs(registrations, round_number)
+        rematches = 0
+    else:
+        pairs, bye, rematches = swiss_pairings(standings, scores, opponents, had_bye)
+    return paired_round_plan(bracket_format, round_number, assign_sides(pairs, balance, last_side), bye), rematches
+
+
+# ---------- Storing brackets ----------
+
+def insert_matches(engine, event_id, matches):
+    # Inserts planned matches with consecutive MatchIDs, routes pointing at the matches really played
+    first_id = engine.queries.scalar('next_match_id')
+    match_ids = {id(match): first_id + index for index, match in enumerate(matches)}
+
+    def route(target):
+        target = played_target(target)
+        return (None, None) if target is None else (match_ids[id(target[0])], 'AB'[target[1]])
+
+    rows = []
+    for match in matches:
+        first, second = (slot or None for slot in match.slots)
+        routes = (None, None, None, None) if match.status == 'bye' else route(match.winner_to) + route(match.loser_to)
+        rows.append((match_ids[id(match)], engine.tournament_id, event_id, match.bracket, match.round,
+                     match.position, first, second, match.winner, match.status) + routes)
+    engine.queries.executemany('insert_match', rows)
+
+
+def event_or_error(engine, event_id):
+    event = engine.get_event(event_id)
+    if event is None:
+        raise RegistrationError(f"Event {event_id} does not exist.")
+    return event
+
+
+def bracket_or_error(engine, event_id):
+    bracket = engine.queries.fetchone('bracket_by_event', (event_id, engine.tournament_id))
+    if bracket is None:
+        raise RegistrationError(f"Event {event_id} has no bracket.")
+    return bracket
+
+
+def seeded_registrations(engine, event_id, seeding):
+    if seeding not in SEEDINGS:
+        raise RegistrationError(f"Unknown seeding: {seeding}. Use one of: {', '.join(SEEDINGS)}")
+    name = 'event_seeding.points' if seeding == 'points' else 'event_seeding.registration'
+    registrations = [row[0] for row in engine.queries.fetchall(name, (event_id,))]
+    if seeding == 'random':
+        random.shuffle(registrations)
+    return registrations
+
+
+def create_bracket(engine, event_id, bracket_format, seeding='points', rounds=None, replace=False):
+    # Draws the bracket (or the first round) of an event and sets its points to 0.
+    # rounds is the number of Swiss rounds (default: enough to leave one unbeaten entrant); a round
+    # robin has as many rounds as it takes for everyone to meet everyone.
+    # Returns the number of matches created.
+    event_or_error(engine, event_id)
+    if bracket_format not in FORMATS:
+        raise RegistrationError(f"Unknown bracket format: {bracket_format}. Use one of: {', '.join(FORMATS)}")
+
+    def write():
+        if engine.queries.fetchone('bracket_by_event', (event_id, engine.tournament_id)) is not None:
+            if not replace:
+                raise RegistrationError(f"Event {event_id} already has a bracket.")
+            engine.queries.execute('delete_event_matches', (event_id,))
+            engine.queries.execute('delete_event_rounds', (event_id,))
+            engine.queries.execute('delete_bracket', (event_id,))
+        registrations = seeded_registrations(engine, event_id,
+                                             'registration' if bracket_format == 'round_robin' else seeding)
+        if len(registrations) < 2:
+            raise RegistrationError("A bracket needs at least two entrants.")
+
+        if bracket_format in PAIRED_FORMATS:
+            if bracket_format == 'round_robin':
+                bracket_rounds = round_robin_rounds(len(registrations))
+            else:
+                bracket_rounds = rounds or max(1, (len(registrations) - 1).bit_length())
+            if bracket_rounds < 1:
+                raise RegistrationError("A Swiss event needs at least one round.")
+            engine.queries.execute('insert_bracket', (event_id, engine.tournament_id, bracket_format, bracket_rounds))
+            engine.queries.execute('reset_event_points', (event_id,))
+            return store_round(engine, event_id, bracket_format, bracket_rounds, 1, registrations, ())
+
+        matches, bracket_rounds = elimination_plan(registrations, double=bracket_format == 'double')
+        engine.queries.execute('insert_bracket', (event_id, engine.tournament_id, bracket_format, bracket_rounds))
+        insert_matches(engine, event_id, matches)
+        engine.queries.execute('reset_event_points', (event_id,))
+        return len(matches)
+
+    return engine.write_transaction(write)
+
+
+def next_round(engine, event_id):
+    # Pairs the next round of a Swiss or round-robin event once every match of the last one has a
+    # result. Returns the number of matches created.
+    def write():
+        bracket_format, rounds = bracket_or_error(engine, event_id)
+        if bracket_format not in PAIRED_FORMATS:
+            raise RegistrationError(f"Event {event_id} has a knockout bracket, not rounds.")
+        if engine.queries.scalar('unfinished_match_count', (event_id,)):
+            raise RegistrationError("Every match of the current round needs a result first.")
+        round_number = engine.queries.scalar('last_round', (event_id,)) + 1
+        if round_number > rounds:
+            raise RegistrationError(f"All {rounds} rounds have been played.")
+
+        # Round robins keep the order of the first round (registration order) all the way through
+        registrations = [row[0] for row in engine.queries.fetchall('event_seeding.registration', (event_id,))]
+        return store_round(engine, event_id, bracket_format, rounds, round_number, registrations,
+                           engine.queries.fetchall('event_matches', (event_id,)))
+
+    return engine.write_transaction(write)
+
+
+def store_round(engine, event_id, bracket_format, rounds, round_number, registrations, match_rows):
+    matches, rematches = pair_round(bracket_format, round_number, registrations, match_rows)
+    insert_matches(engine, event_id, matches)
+    engine.queries.execute('insert_round', (event_id, round_number, engine.tournament_id, len(matches), rematches))
+    update_registration_points(engine, event_id, rounds, [match.winner for match in matches if match.status == 'bye'])
+    return len(matches)
+
+
+def update_registration_points(engine, event_id, rounds, registrations):
+    # PointsEarned = the event's PointsAllocated * share of the rounds won. A draw, or a win in the
+    # losers bracket, is half a win: a losers bracket has two rounds for every winners bracket round.
+    allocated = engine.queries.scalar('event_points_allocated', (event_id,)) or 0
+    for registration in registrations:
+        if registration is None:
+            continue
+        half_wins = engine.queries.scalar('registration_half_wins', (registration,))
+        points = min(allocated, allocated * half_wins // (2 * rounds))
+        engine.queries.execute('set_registration_points', (points, registration))
+
+
+def record_result(engine, match_id, score_a, score_b):
+    # Records the score of a match that is ready, moves the winner (and in double elimination the
+    # loser) on, and updates both entrants' points. Matches in rounds can be drawn, knockout matches can't.
+    if score_a < 0 or score_b < 0:
+        raise RegistrationError("Scores can't be negative.")
+
+    def write():
+        match = engine.queries.fetchone('match_by_id', (match_id, engine.tournament_id))
+        if match is None:
+            raise RegistrationError(f"Match {match_id} does not exist.")
+        event_id, bracket, first, second, status, winner_to, winner_slot, loser_to, loser_slot = match
+        if status == 'done':
+            raise RegistrationError(f"Match {match_id} already has a result.")
+        if status == 'bye':
+            raise RegistrationError(f"Match {match_id} is a bye.")
+        if status != 'ready':
+            raise RegistrationError(f"Match {match_id} is waiting for its entrants.")
+        if score_a == score_b and bracket not in PAIRED_FORMATS:
+            raise RegistrationError("A knockout match needs a winner.")
+
+        winner, loser = (first, second) if score_a > score_b else (second, first) if score_b > score_a else (None, None)
+        engine.queries.execute('set_match_result', (score_a, score_b, winner, loser, match_id))
+        if winner_to is not None:
+            engine.queries.execute(f"fill_match_slot.{winner_slot}", (winner, winner_to))
+        if loser_to is not None:
+            engine.queries.execute(f"fill_match_slot.{loser_slot}", (loser, loser_to))
+        update_registration_points(engine, event_id, bracket_or_error(engine, event_id)[1], (first, second))
+        if winner_to is None and bracket not in PAIRED_FORMATS:
+            # The title match: whichever way the winner got here, they get all of the event's points
+            engine.queries.execute('set_registration_points',
+                                   (engine.queries.scalar('event_points_allocated', (event_id,)), winner))
+
+    engine.write_transaction(write)
+
+
+def event_matches(engine, event_id):
+    # (MatchID, Bracket, Round, Position, NameA, NameB, ScoreA, ScoreB, Winner, Status) for every match
+    event = event_or_error(engine, event_id)
+    names = engine.entrant_names(event[2])
+    entrants = dict(engine.queries.fetchall('event_registrations', (event_id,)))
+
+    def name(registration):
+        if registration is None:
+            return None
+        entrant_id = entrants.get(registration)
+        return names.get(entrant_id, f"#{entrant_id}") if entrant_id is not None else f"(withdrawn {registration})"
+
+    return [(match_id, bracket, round_number, position, name(first), name(second), score_a, score_b,
+             name(winner), status)
+            for match_id, bracket, round_number, position, first, second, score_a, score_b, winner, status
+            in engine.queries.fetchall('event_matches', (event_id,))]
+
+
+def event_rounds(engine, event_id):
+    # (Round, PairedAt, Matches, Rematches) of every round paired so far
+    event_or_error(engine, event_id)
+    return engine.queries.fetchall('event_rounds', (event_id,))
+
+
+# ---------- Command line ----------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Knockout brackets and Swiss rounds for head-to-head events.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument('--tournament', type=int, default=DEFAULT_TOURNAMENT_ID, help="TournamentID")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    create_parser = subparsers.add_parser('create', help="draw an event's bracket")
+    create_parser.add_argument('--event', type=int, required=True, help="EventID")
+    create_parser.add_argument('--format', choices=FORMATS, required=True)
+    create_parser.add_argument('--seeding', choices=SEEDINGS, default='points',
+                               help="seed by current points, registration order or at random")
+    create_parser.add_argument('--rounds', type=int, help="number of Swiss rounds")
+    create_parser.add_argument('--replace', action='store_true', help="throw away an existing bracket")
+    round_parser = subparsers.add_parser('next-round', help="pair the next Swiss or round-robin round")
+    round_parser.add_argument('--event', type=int, required=True, help="EventID")
+    rounds_parser = subparsers.add_parser('rounds', help="list the rounds paired so far")
+    rounds_parser.add_argument('--event', type=int, required=True, help="EventID")
+    result_parser = subparsers.add_parser('result', help="record a match result")
+    result_parser.add_argument('--match', type=int, required=True, help="MatchID")
+    result_parser.add_argument('--score', type=int, nargs=2, required=True, metavar=('A', 'B'))
+    show_parser = subparsers.add_parser('show', help="list an event's matches")
+    show_parser.add_argument('--event', type=int, required=True, help="EventID")
+    args = parser.parse_args(argv)
+
+    try:
+        engine = TournamentEngine(args.db, tournament_id=args.tournament)
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.command == 'create':
+            count = create_bracket(engine, args.event, args.format, args.seeding, args.rounds, args.replace)
+            print(f"Created {count} matches")
+        elif args.command == 'next-round':
+            print(f"Created {next_round(engine, args.event)} matches")
+        elif args.command == 'rounds':
+            print("\t".join(("Round", "Paired", "Matches", "Rematches")))
+            for round_number, paired_at, matches, rematches in event_rounds(engine, args.event):
+                print(f"{round_number}\t{datetime.fromtimestamp(paired_at):%Y-%m-%d %H:%M:%S}\t{matches}\t{rematches}")
+        elif args.command == 'result':
+            record_result(engine, args.match, *args.score)
+        else:
+            print("\t".join(("MatchID", "Bracket", "Round", "Position", "A", "B", "ScoreA", "ScoreB", "Winner",
+                             "Status")))
+            for row in event_matches(engine, args.event):
+                print("\t".join("" if value is None else str(value) for value in row))
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from tournament_engine import TournamentEngine, RegistrationError, DEFAULT_DB_PATH, DEFAULT_TOURNAMENT_ID
+
+# Number of roster rows written per transaction
+DEFAULT_BATCH_SIZE = 5000
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.participants_imported = 0
+        self.teams_created = 0
+        self.registrations_created = 0
+        self.rejected = []  # (line number, reason)
+        self.elapsed = 0.0
+
+    def rows_per_second(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.rows_read / self.elapsed
+
+    def summary(self):
+        return (f"Read {self.rows_read} rows in {self.elapsed:.2f}s ({self.rows_per_second():.0f} rows/s): "
+                f"{self.participants_imported} participants, {self.teams_created} teams, "
+                f"{self.registrations_created} event registrations, {len(self.rejected)} rejected")
+
+
+def read_roster(path):
+    # Yields (line number, nickname, team name or '', [event names or IDs]) one row at a time
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as roster_file:
+        if extension == '.csv':
+            # Columns: Nickname, Team, Events (event names or IDs separated by ';')
+            reader = csv.DictReader(roster_file)
+            for row in reader:
+                events = [event.strip() for event in (row.get('Events') or '').split(';') if event.strip()]
+                yield reader.line_num, (row.get('Nickname') or '').strip(), (row.get('Team') or '').strip(), events
+        elif extension in ('.json', '.jsonl'):
+            # One JSON object per line: {"nickname": ..., "team": ..., "events": [...]}
+            for line_number, line in enumerate(roster_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    raise RegistrationError(f"Line {line_number} is not valid JSON.")
+                events = row.get('events') or []
+                if isinstance(events, str):
+                    events = events.split(';')
+                events = [str(event).strip() for event in events if str(event).strip()]
+                yield line_number, str(row.get('nickname') or '').strip(), str(row.get('team') or '').strip(), events
+        else:
+            raise RegistrationError(f"Unsupported roster format: {extension} (use .csv, .json or .jsonl)")
+
+
+class RosterImporter:
+    def __init__(self, engine, batch_size=DEFAULT_BATCH_SIZE):
+        self.engine = engine
+        self.conn = engine.conn
+        self.queries = engine.queries
+        self.batch_size = batch_size
+        self.report = ImportReport()
+
+        # Event lookup by name and by ID -> (EventID, EventType)
+        self.events = {}
+        for event_type in ('Individual', 'Team-based'):
+            for event_id, event_name in engine.load_events(event_type):
+                self.events[event_name.lower()] = (event_id, event_type)
+                self.events[str(event_id)] = (event_id, event_type)
+
+        # Everything the validation rules need, loaded once instead of a COUNT per row
+        self.tournament_id = engine.tournament_id
+        self.names = {row[0] for row in self.queries.fetchall('all_participant_names', (self.tournament_id,))}
+        self.existing_teams = {row[0] for row in self.queries.fetchall('all_team_names', (self.tournament_id,))}
+        self.participant_count = engine.participant_count()
+        self.individual_count = engine.individual_count()
+        self.team_count = engine.team_count()
+
+        self.team_ids = {}  # team name -> TeamID for teams created by this import
+        self.team_sizes = {}
+        self.team_events = {}  # team name -> set of EventIDs already registered
+
+        self.pending_teams = []
+        self.pending_participants = []  # (name, team name or None, [EventIDs])
+        self.pending_team_events = []  # (team name, EventID)
+
+    def validate(self, nickname, team_name, event_refs):
+        # Same rules as TournamentEngine.register_individual / register_team
+        if not nickname:
+            raise RegistrationError("Please fill in the participant nickname.")
+        if nickname in self.names:
+            raise RegistrationError("Participant nickname already exists. Please choose a different one.")
+        if not event_refs:
+            raise RegistrationError("Please select at least one event.")
+
+        expected_type = 'Team-based' if team_name else 'Individual'
+        event_ids = []
+        for event_ref in event_refs:
+            event = self.events.get(event_ref.lower())
+            if event is None:
+                raise RegistrationError(f"Unknown event: {event_ref}")
+            if event[1] != expected_type:
+                raise RegistrationError(f"Event '{event_ref}' is not an {expected_type} event.")
+            event_ids.append(event[0])
+
+        # Every limit the database checks is checked here too, so a row over a limit is rejected on its
+        # own instead of the database refusing the whole batch
+        if self.participant_count >= self.engine.max_participants:
+            raise RegistrationError("Maximum participant limit reached.")
+        if team_name:
+            if team_name in self.existing_teams:
+                raise RegistrationError("Team name already exists. Please choose a different one.")
+            if team_name not in self.team_sizes and self.team_count >= self.engine.max_teams:
+                raise RegistrationError("Maximum team limit reached.")
+            if self.team_sizes.get(team_name, 0) >= self.engine.max_team_members:
+                raise RegistrationError(f"A team can have at most {self.engine.max_team_members} members.")
+        elif self.individual_count >= self.engine.max_individuals:
+            raise RegistrationError("Maximum individual participant limit reached.")
+
+        return event_ids
+
+    def add_row(self, line_number, nickname, team_name, event_refs):
+        self.report.rows_read += 1
+        try:
+            event_ids = self.validate(nickname, team_name, event_refs)
+        except RegistrationError as e:
+            self.report.rejected.append((line_number, str(e)))
+            return
+
+        self.names.add(nickname)
+        self.participant_count += 1
+        if team_name:
+            if team_name not in self.team_sizes:
+                self.team_sizes[team_name] = 0
+                self.team_events[team_name] = set()
+                self.team_count += 1
+                self.pending_teams.append(team_name)
+            self.team_sizes[team_name] += 1
+            self.pending_participants.append((nickname, team_name, []))
+
+            # A team is registered once per event, whichever member row lists it
+            for event_id in event_ids:
+                if event_id not in self.team_events[team_name]:
+                    self.team_events[team_name].add(event_id)
+                    self.pending_team_events.append((team_name, event_id))
+        else:
+            self.individual_count += 1
+            self.pending_participants.append((nickname, None, event_ids))
+
+        if len(self.pending_participants) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending_participants and not self.pending_teams:
+            return
+
+        def write_batch():
+            # IDs are handed out here so every table can be written with one executemany
+            next_team_id = self.queries.scalar('next_team_id')
+            team_rows = []
+            for team_name in self.pending_teams:
+                self.team_ids[team_name] = next_team_id
+                team_rows.append((next_team_id, self.tournament_id, team_name))
+                next_team_id += 1
+
+            next_participant_id = self.queries.scalar('next_participant_id')
+            participant_rows = []
+            registration_rows = []
+            for nickname, team_name, event_ids in self.pending_participants:
+                team_id = self.team_ids[team_name] if team_name else None
+                participant_rows.append((next_participant_id, self.tournament_id, nickname, team_id))
+                for event_id in event_ids:
+                    registration_rows.append((self.tournament_id, event_id, next_participant_id, None, 0))
+                next_participant_id += 1
+
+            for team_name, event_id in self.pending_team_events:
+                registration_rows.append((self.tournament_id, event_id, None, self.team_ids[team_name], 0))
+
+            self.queries.executemany('insert_team', team_rows)
+            self.queries.executemany('insert_participant', participant_rows)
+            self.queries.executemany('insert_registration', registration_rows)
+            return team_rows, participant_rows, registration_rows
+
+        # One write transaction, so nobody else can grab the IDs handed out above. Limits and unique
+        # names are checked by the database as well: if another program registered in the meantime,
+        # the whole batch is refused instead of going over a limit.
+        team_rows, participant_rows, registration_rows = self.engine.write_transaction(write_batch, {
+            'Participants': "A nickname in this batch is already registered.",
+            'Teams': "A team name in this batch is already registered.",
+        })
+
+        self.report.teams_created += len(team_rows)
+        self.report.participants_imported += len(participant_rows)
+        self.report.registrations_created += len(registration_rows)
+
+        self.pending_teams = []
+        self.pending_participants = []
+        self.pending_team_events = []
+
+
+def import_roster(engine, path, batch_size=DEFAULT_BATCH_SIZE):
+    importer = RosterImporter(engine, batch_size)
+    start = time.perf_counter()
+    for line_number, nickname, team_name, events in read_roster(path):
+        importer.add_row(line_number, nickname, team_name, events)
+    importer.flush()
+    importer.report.elapsed = time.perf_counter() - start
+    return importer.report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Register a whole roster file (CSV or JSON Lines) at once.")
+    parser.add_argument('roster', help="roster file (.csv with Nickname,Team,Events columns, or .json/.jsonl)")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument('--tournament', type=int, default=DEFAULT_TOURNAMENT_ID, help="TournamentID to register into")
+    args = parser.parse_args(argv)
+
+    try:
+        engine = TournamentEngine(args.db, tournament_id=args.tournament)
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        report = import_roster(engine, args.roster, args.batch_size)
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close()
+
+    for line_number, reason in report.rejected:
+        print(f"Line {line_number}: {reason}", file=sys.stderr)
+    print(report.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import queue
+import threading
+
+from tournament_engine import TournamentEngine, DEFAULT_DB_PATH, DEFAULT_PROFILE, DEFAULT_TOURNAMENT_ID
+
+# How often (ms) the Tk thread picks up finished queries
+POLL_INTERVAL = 15
+
+
+class DBWorker:
+    # Runs database reads on a background thread with its own connection, so the Tk mainloop never
+    # waits for SQLite. Jobs are functions taking the worker's TournamentEngine; their result is
+    # handed to the callback on the Tk thread through master.after().
+    #
+    # Jobs submitted with the same key replace each other: if a newer job with that key was
+    # submitted, an older one is skipped (or its result dropped), so stale refreshes never
+    # overwrite fresh data.
+    def __init__(self, master, db_path=DEFAULT_DB_PATH, profile=DEFAULT_PROFILE, tournament_id=DEFAULT_TOURNAMENT_ID):
+        self.master = master
+        self.db_path = db_path
+        self.profile = profile
+        self.tournament_id = tournament_id
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.generations = {}  # key -> number of the newest job submitted with it
+        self.lock = threading.Lock()
+        self.closed = False
+
+        self.thread = threading.Thread(target=self.run, name="db-worker", daemon=True)
+        self.thread.start()
+        self.poll_id = self.master.after(POLL_INTERVAL, self.poll)
+
+    def submit(self, function, callback=None, key=None, on_error=None):
+        with self.lock:
+            generation = self.generations.get(key, 0) + 1
+            if key is not None:
+                self.generations[key] = generation
+        self.jobs.put((function, callback, key, generation, on_error))
+
+    def cancel(self, key):
+        # Drops every pending job and result for key
+        with self.lock:
+            self.generations[key] = self.generations.get(key, 0) + 1
+
+    def is_stale(self, key, generation):
+        if key is None:
+            return False
+        with self.lock:
+            return self.generations.get(key) != generation
+
+    def run(self):
+        try:
+            engine = TournamentEngine(self.db_path, self.profile, tournament_id=self.tournament_id)
+            startup_error = None
+        except Exception as e:
+            # Reported on the Tk thread now, and again to every job, so no callback waits forever
+            engine = None
+            startup_error = e
+            self.results.put((None, e, None, None, True))
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            function, callback, key, generation, on_error = job
+            if self.is_stale(key, generation):
+                continue
+            if engine is None:
+                self.results.put((on_error, startup_error, key, generation, True))
+                continue
+            try:
+                result = function(engine)
+            except Exception as e:
+                self.results.put((on_error, e, key, generation, True))
+            else:
+                self.results.put((callback, result, key, generation, False))
+        if engine is not None:
+            engine.close()
+
+    def poll(self):
+        # Runs on the Tk thread. Scheduled again first, so an error in a callback cannot stop it.
+        if not self.closed:
+            self.poll_id = self.master.after(POLL_INTERVAL, self.poll)
+        while True:
+            try:
+                callback, result, key, generation, failed = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_stale(key, generation):
+                continue
+            if failed and callback is None:
+                # Report it the same way Tk reports errors in its own callbacks
+                self.master.report_callback_exception(type(result), result, result.__traceback__)
+            elif callback is not None:
+                callback(result)
+
+    def close(self):
+        self.closed = True
+        self.master.after_cancel(self.poll_id)
+        self.jobs.put(None)
+        self.thread.join()
+
+
+class SyncRunner:
+    # Same interface as DBWorker but runs every job straight away on the caller's engine.
+    # Handy for scripts and for widgets used without a worker thread.
+    def __init__(self, engine):
+        self.engine = engine
+
+    def submit(self, function, callback=None, key=None, on_error=None):
+        try:
+            result = function(self.engine)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(e)
+            return
+        if callback is not None:
+            callback(result)
+
+    def cancel(self, key):
+        pass
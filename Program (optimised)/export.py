@@ -0,0 +1,201 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from queries import ranked_name
+from tournament_engine import TournamentEngine, RegistrationError, DEFAULT_DB_PATH, DEFAULT_TOURNAMENT_ID
+
+# Exports a tournament's results for spreadsheets and other tools. Rows are read from the cursor
+# DEFAULT_CHUNK_SIZE at a time and written straight out, so memory use stays the same however big the
+# tournament is.
+#   python export.py --format csv --output results/
+# writes results/leaderboards.csv, standings.csv, registrations.csv and timetable.csv (schedule.py).
+
+DEFAULT_CHUNK_SIZE = 5000
+FORMATS = ('csv', 'jsonl', 'parquet')
+
+# Columns of every dataset as (name, 'int' or 'text'), in the order the export queries return them
+DATASETS = {
+    'leaderboards': (('EventID', 'int'), ('EventName', 'text'), ('EventType', 'text'), ('Rank', 'int'),
+                     ('EntrantID', 'int'), ('Name', 'text'), ('Points', 'int')),
+    'standings': (('Rank', 'int'), ('EntrantType', 'text'), ('EntrantID', 'int'), ('Name', 'text'),
+                  ('TotalPoints', 'int')),
+    'registrations': (('EventParticipantID', 'int'), ('EventID', 'int'), ('EventName', 'text'),
+                      ('ParticipantID', 'int'), ('TeamID', 'int'), ('Name', 'text'), ('PointsEarned', 'int')),
+    'timetable': (('Slot', 'int'), ('Start', 'text'), ('Venue', 'text'), ('EventID', 'int'), ('EventName', 'text'),
+                  ('EventType', 'text'), ('Entrants', 'int')),
+}
+
+
+class ExportReport:
+    def __init__(self):
+        self.files = {}  # dataset -> (path, rows)
+        self.elapsed = 0.0
+
+    def summary(self):
+        lines = [f"{dataset}: {rows} rows -> {path}" for dataset, (path, rows) in self.files.items()]
+        total_rows = sum(rows for _, rows in self.files.values())
+        rate = total_rows / self.elapsed if self.elapsed else 0
+        lines.append(f"Exported {total_rows} rows in {self.elapsed:.2f}s ({rate:.0f} rows/s)")
+        return "\n".join(lines)
+
+
+# ---------- Writers ----------
+
+class CsvExportWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesExportWriter:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.columns = [name for name, _ in columns]
+
+    def write_rows(self, rows):
+        columns = self.columns
+        self.file.write("".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExportWriter:
+    # Columnar file for data tools (pandas, DuckDB, Spark). Each chunk becomes one row group.
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RegistrationError("Parquet export needs the pyarrow package (pip install pyarrow). "
+                                    "Use --format csv or jsonl instead.")
+        self.pyarrow = pyarrow
+        types = {'int': pyarrow.int64(), 'text': pyarrow.string()}
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write_rows(self, rows):
+        arrays = [self.pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    'csv': CsvExportWriter,
+    'jsonl': JsonLinesExportWriter,
+    'parquet': ParquetExportWriter,
+}
+
+
+# ---------- Datasets ----------
+
+def stream(cursor, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+
+def leaderboard_chunks(engine, chunk_size):
+    # Every event's leaderboard, one event after the other
+    name = ranked_name('export_event_leaderboard', engine.ranking_method)
+    for event_type in ('Individual', 'Team-based'):
+        for event_id, event_name in engine.load_events(event_type):
+            event = (event_id, event_name, event_type)
+            cursor = engine.queries.execute(name, (event_id,))
+            for rows in stream(cursor, chunk_size):
+                yield [event + row for row in rows]
+
+
+def standings_chunks(engine, chunk_size):
+    name = ranked_name('export_standings', engine.ranking_method)
+    return stream(engine.queries.execute(name, (engine.tournament_id,)), chunk_size)
+
+
+def registration_chunks(engine, chunk_size):
+    return stream(engine.queries.execute('export_registrations', (engine.tournament_id,)), chunk_size)
+
+
+def timetable_chunks(engine, chunk_size):
+    return stream(engine.queries.execute('export_timetable', (engine.tournament_id,)), chunk_size)
+
+
+DATASET_CHUNKS = {
+    'leaderboards': leaderboard_chunks,
+    'standings': standings_chunks,
+    'registrations': registration_chunks,
+    'timetable': timetable_chunks,
+}
+
+
+def export_dataset(engine, dataset, path, export_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    # Writes one dataset to path and returns the number of rows written
+    if export_format not in WRITERS:
+        raise RegistrationError(f"Unknown export format: {export_format}")
+    writer = WRITERS[export_format](path, DATASETS[dataset])
+    rows_written = 0
+    try:
+        for rows in DATASET_CHUNKS[dataset](engine, chunk_size):
+            writer.write_rows(rows)
+            rows_written += len(rows)
+    finally:
+        writer.close()
+    return rows_written
+
+
+def export_tournament(engine, directory, export_format='csv', datasets=tuple(DATASETS),
+                      chunk_size=DEFAULT_CHUNK_SIZE):
+    # Writes every dataset to <directory>/<dataset>.<format>
+    os.makedirs(directory, exist_ok=True)
+    report = ExportReport()
+    start = time.perf_counter()
+    for dataset in datasets:
+        path = os.path.join(directory, f"{dataset}.{export_format}")
+        report.files[dataset] = (path, export_dataset(engine, dataset, path, export_format, chunk_size))
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export leaderboards, standings and registrations.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument('--tournament', type=int, default=DEFAULT_TOURNAMENT_ID, help="TournamentID to export")
+    parser.add_argument('--format', choices=FORMATS, default='csv', help="file format")
+    parser.add_argument('--output', default='export', help="directory to write the files to")
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows read at a time")
+    args = parser.parse_args(argv)
+
+    try:
+        engine = TournamentEngine(args.db, tournament_id=args.tournament)
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        report = export_tournament(engine, args.output, args.format, args.datasets, args.chunk_size)
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close()
+
+    print(report.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
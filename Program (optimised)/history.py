@@ -0,0 +1,216 @@
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from queries import RANKING_METHODS, typed_name
+from tournament_engine import TournamentEngine, RegistrationError, DEFAULT_DB_PATH, DEFAULT_TOURNAMENT_ID
+
+# Past standings, for audits and disputes. Every registration and score write is kept in the
+# ScoreChanges log, and now and then a snapshot of all of a tournament's points is stored. The
+# points at any moment are the last snapshot before it plus the log written after that snapshot.
+#   python history.py standings --at "2026-10-18 14:30"
+#   python history.py leaderboard --event 6 --at "2026-10-18 14:30"
+#   python history.py entrant --event 6 --entrant 12
+#   python history.py snapshot
+# The ingest service takes snapshots by itself every SNAPSHOT_EVERY changes; otherwise run
+# "history.py snapshot" now and then (e.g. every few minutes during a busy tournament).
+
+SNAPSHOT_EVERY = 5000  # logged changes replayed at most before a new snapshot is due
+
+
+# ---------- Snapshots ----------
+
+def take_snapshot(engine):
+    # Stores the current points of every registration of the engine's tournament.
+    # Returns the SnapshotID.
+    def write():
+        snapshot_id = engine.queries.execute('insert_snapshot', (engine.tournament_id,)).lastrowid
+        engine.queries.execute('copy_snapshot_registrations', (snapshot_id, engine.tournament_id))
+        return snapshot_id
+
+    return engine.write_transaction(write)
+
+
+def snapshot_if_due(engine, every=SNAPSHOT_EVERY):
+    # Takes a snapshot if more than `every` changes were logged for the tournament since the last one.
+    # Returns the new SnapshotID or None.
+    snapshot = engine.queries.fetchone('latest_snapshot', (engine.tournament_id,))
+    last_change_id = snapshot[2] if snapshot else 0
+    if engine.queries.scalar('change_count_since', (engine.tournament_id, last_change_id)) < every:
+        return None
+    return take_snapshot(engine)
+
+
+# ---------- Replay ----------
+
+def registrations_at(engine, timestamp):
+    # Points of every registration of the tournament as they were at timestamp (Unix time), as
+    # {EventParticipantID: (EventID, ParticipantID, TeamID, PointsEarned)}
+    snapshot = engine.queries.fetchone('snapshot_at', (engine.tournament_id, timestamp))
+    if snapshot is None:
+        first = engine.queries.scalar('first_snapshot_time', (engine.tournament_id,))
+        since = f" before {format_time(first)}" if first is not None else ""
+        raise RegistrationError(f"There is no score history{since} for this tournament.")
+    snapshot_id, _, last_change_id = snapshot
+
+    registrations = {row[0]: row[1:] for row in engine.queries.fetchall('snapshot_registrations', (snapshot_id,))}
+    cursor = engine.queries.execute('changes_after_snapshot', (engine.tournament_id, last_change_id, timestamp))
+    for change_type, event_participant_id, event_id, participant_id, team_id, points in cursor:
+        if change_type == 'withdraw':
+            registrations.pop(event_participant_id, None)
+        else:
+            registrations[event_participant_id] = (event_id, participant_id, team_id, points)
+    return registrations
+
+
+def head_to_head_wins(engine, event_id, timestamp, registrations):
+    # {EventParticipantID: matches won by timestamp against registrations with as many points}, with
+    # registrations as returned by registrations_at
+    wins = {}
+    for winner, loser in engine.queries.fetchall('match_results_at', (event_id, timestamp)):
+        if winner in registrations and loser in registrations and \
+                registrations[winner][3] == registrations[loser][3]:
+            wins[winner] = wins.get(winner, 0) + 1
+    return wins
+
+
+def rank_rows(rows, ranking_method, wins=None):
+    # rows: (points, registration order, ...) tuples. Returns (rank,) + row[2:] best first, ranked
+    # the same way as the leaderboard queries (queries.RANKING_METHODS). head_to_head breaks ties on
+    # wins ({registration order: head-to-head wins}); without them (the overall standings, like the
+    # scoreboard query) it gives shared ranks.
+    if ranking_method not in RANKING_METHODS:
+        raise RegistrationError(f"Unknown ranking method: {ranking_method}")
+    wins = wins if ranking_method == 'head_to_head' and wins is not None else {}
+    rows = sorted(rows, key=lambda row: (-row[0], -wins.get(row[1], 0), row[1]))
+    ranked = []
+    rank = dense_rank = 0
+    previous = None
+    for position, row in enumerate(rows, start=1):
+        if (row[0], wins.get(row[1], 0)) != previous:
+            rank = position
+            previous = (row[0], wins.get(row[1], 0))
+        if position == 1 or row[0] != rows[position - 2][0]:
+            dense_rank += 1
+        if ranking_method == 'dense':
+            ranked.append((dense_rank,) + row[2:])
+        elif ranking_method == 'registration':
+            ranked.append((position,) + row[2:])
+        else:
+            ranked.append((rank,) + row[2:])
+    return ranked
+
+
+def standings_at(engine, timestamp):
+    # The overall standings at timestamp as (Rank, EntrantType, EntrantID, Name, TotalPoints) rows,
+    # like the standings export. Entrants are listed under their current names.
+    totals = {}  # (EntrantType, EntrantID) -> [TotalPoints, first EventParticipantID]
+    for event_participant_id, (_, participant_id, team_id, points) in registrations_at(engine, timestamp).items():
+        key = ('Individual', participant_id) if participant_id is not None else ('Team', team_id)
+        total = totals.setdefault(key, [0, event_participant_id])
+        total[0] += points or 0
+        total[1] = min(total[1], event_participant_id)
+
+    names = {'Individual': engine.entrant_names('Individual'), 'Team': engine.entrant_names('Team-based')}
+    return rank_rows([(points, first, entrant_type, entrant_id,
+                       names[entrant_type].get(entrant_id, f"#{entrant_id}"), points)
+                      for (entrant_type, entrant_id), (points, first) in totals.items()], engine.ranking_method)
+
+
+def event_leaderboard_at(engine, event_id, event_type, timestamp):
+    # One event's leaderboard at timestamp as (Rank, ID, Name, Points) rows, like event_leaderboard
+    names = engine.entrant_names(event_type)
+    registrations = registrations_at(engine, timestamp)
+    rows = []
+    for event_participant_id, (registered_event, participant_id, team_id, points) in registrations.items():
+        entrant_id = participant_id if event_type == 'Individual' else team_id
+        if registered_event == event_id and entrant_id is not None:
+            rows.append((points, event_participant_id, entrant_id, names.get(entrant_id, f"#{entrant_id}"), points))
+    wins = None
+    if engine.ranking_method == 'head_to_head':
+        wins = head_to_head_wins(engine, event_id, timestamp, registrations)
+    return rank_rows(rows, engine.ranking_method, wins)
+
+
+def entrant_history(engine, event_id, event_type, entrant_id):
+    # Every logged change of one entrant in one event as (ChangeID, ChangedAt, ChangeType, Points), oldest first
+    return engine.queries.fetchall(typed_name('entrant_history', event_type), (event_id, entrant_id))
+
+
+# ---------- Command line ----------
+
+def parse_time(text):
+    # "2026-10-18 14:30[:05]" in local time, or Unix seconds
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise RegistrationError(f"'{text}' is not a time. Use e.g. \"2026-10-18 14:30\".")
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def print_table(header, rows):
+    print("\t".join(header))
+    for row in rows:
+        print("\t".join("" if value is None else str(value) for value in row))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Standings and scores as they were at an earlier time.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument('--tournament', type=int, default=DEFAULT_TOURNAMENT_ID, help="TournamentID")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    standings_parser = subparsers.add_parser('standings', help="overall standings at a time")
+    standings_parser.add_argument('--at', required=True, help="local time (2026-10-18 14:30) or Unix seconds")
+    leaderboard_parser = subparsers.add_parser('leaderboard', help="one event's leaderboard at a time")
+    leaderboard_parser.add_argument('--event', type=int, required=True, help="EventID")
+    leaderboard_parser.add_argument('--at', required=True, help="local time (2026-10-18 14:30) or Unix seconds")
+    entrant_parser = subparsers.add_parser('entrant', help="every change of one entrant's points in one event")
+    entrant_parser.add_argument('--event', type=int, required=True, help="EventID")
+    entrant_parser.add_argument('--entrant', type=int, required=True, help="ParticipantID or TeamID")
+    subparsers.add_parser('snapshot', help="store a snapshot of the current points")
+    args = parser.parse_args(argv)
+
+    try:
+        engine = TournamentEngine(args.db, tournament_id=args.tournament)
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.command == 'snapshot':
+            start = time.perf_counter()
+            snapshot_id = take_snapshot(engine)
+            print(f"Snapshot {snapshot_id} taken in {time.perf_counter() - start:.2f}s")
+        elif args.command == 'entrant':
+            event = engine.get_event(args.event)
+            if event is None:
+                raise RegistrationError(f"Event {args.event} does not exist.")
+            print_table(("ChangeID", "Time", "Change", "Points"),
+                        [(change_id, format_time(changed_at), change_type, points) for change_id, changed_at,
+                         change_type, points in entrant_history(engine, args.event, event[2], args.entrant)])
+        elif args.command == 'leaderboard':
+            event = engine.get_event(args.event)
+            if event is None:
+                raise RegistrationError(f"Event {args.event} does not exist.")
+            print_table(("Rank", "ID", "Name", "Points"),
+                        event_leaderboard_at(engine, args.event, event[2], parse_time(args.at)))
+        else:
+            print_table(("Rank", "EntrantType", "EntrantID", "Name", "TotalPoints"),
+                        standings_at(engine, parse_time(args.at)))
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from tournament_engine import TournamentEngine, RegistrationError, DEFAULT_DB_PATH, DEFAULT_TOURNAMENT_ID
+
+# Read-only JSON API for spectator screens:
+#   GET /tournaments                          all tournaments in the file
+#   GET /events                               events by type
+#   GET /events/<id>/leaderboard?offset=&limit=   one event's leaderboard
+#   GET /scoreboard?offset=&limit=            overall standings
+# Every path takes ?tournament=<id>, otherwise the server's default tournament is used.
+# Responses carry an ETag; clients sending it back in If-None-Match get "304 Not Modified".
+
+DEFAULT_HOST = '127.0.0.1'  # only this computer; --host 0.0.0.0 serves the whole network
+DEFAULT_PORT = 8080
+MAX_PAGE_SIZE = 1000
+# Responses kept between writes; the least recently used one is dropped beyond this
+MAX_CACHED_RESPONSES = 2000
+
+
+class NotFound(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+class ResponseCache:
+    # Rendered responses by request (see build_response), dropped as soon as anything is written to the
+    # database. A write by any connection (the app, bulk import, another script) changes PRAGMA
+    # data_version, which is checked once per request, so polling clients only ever cost a dictionary
+    # lookup. At most max_entries responses are kept, the least recently used go first.
+    def __init__(self, engine, max_entries=MAX_CACHED_RESPONSES):
+        self.engine = engine
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.responses = OrderedDict()  # request key -> (etag, body)
+        self.data_version = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self.lock:
+            data_version = self.engine.data_version()
+            if data_version != self.data_version:
+                self.responses.clear()
+                self.data_version = data_version
+
+            response = self.responses.get(key)
+            if response is not None:
+                self.responses.move_to_end(key)
+                self.hits += 1
+                return response
+
+            self.misses += 1
+            body = json.dumps(build(self.engine), separators=(',', ':')).encode('utf-8')
+            response = ('"' + hashlib.sha1(body).hexdigest() + '"', body)
+            self.responses[key] = response
+            if len(self.responses) > self.max_entries:
+                self.responses.popitem(last=False)
+            return response
+
+    def invalidate(self):
+        with self.lock:
+            self.responses.clear()
+
+
+def page_arguments(query):
+    try:
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', [str(MAX_PAGE_SIZE)])[0])
+    except ValueError:
+        raise BadRequest("offset and limit must be whole numbers")
+    if offset < 0 or limit < 1:
+        raise BadRequest("offset must be >= 0 and limit >= 1")
+    return offset, min(limit, MAX_PAGE_SIZE)
+
+
+def tournaments_response(engine):
+    return [{'id': tournament_id, 'name': name, 'ranking': ranking_method}
+            for tournament_id, name, ranking_method in engine.load_tournaments()]
+
+
+def in_tournament(tournament_id, build):
+    # Points the shared engine at the requested tournament before building the document
+    def build_in_tournament(engine):
+        try:
+            engine.use_tournament(tournament_id)
+        except RegistrationError:
+            raise NotFound(f"No tournament {tournament_id}")
+        return build(engine)
+    return build_in_tournament
+
+
+def events_response(engine):
+    return {event_type: [{'id': event_id, 'name': event_name}
+                         for event_id, event_name in engine.load_events(event_type)]
+            for event_type in ('Individual', 'Team-based')}
+
+
+def leaderboard_response(engine, event_id, offset, limit):
+    event = engine.get_event(event_id)
+    if event is None:
+        raise NotFound(f"No event {event_id}")
+    _, event_name, event_type = event
+    rows = engine.event_leaderboard(event_id, event_type, offset, limit)
+    return {
+        'event': {'id': event_id, 'name': event_name, 'type': event_type},
+        'total': engine.event_entrant_count(event_id, event_type),
+        'offset': offset,
+        'ranking': engine.ranking_method,
+        'rows': [{'rank': rank, 'id': entrant_id, 'name': name, 'points': points}
+                 for rank, entrant_id, name, points in rows],
+    }
+
+
+def scoreboard_response(engine, offset, limit):
+    rows = engine.scoreboard(offset, limit)
+    return {
+        'total': engine.scoreboard_count(),
+        'offset': offset,
+        'ranking': engine.ranking_method,
+        'rows': [{'rank': rank, 'type': entrant_type, 'name': name, 'points': points}
+                 for rank, entrant_type, name, points in rows],
+    }
+
+
+def build_response(url, default_tournament_id):
+    # Returns (cache key, function building the JSON document) for the URL, or raises NotFound/BadRequest.
+    # The key holds only the parsed arguments, so unknown or reordered query arguments share one entry.
+    parts = [part for part in url.path.split('/') if part]
+    query = parse_qs(url.query)
+    try:
+        tournament_id = int(query.get('tournament', [default_tournament_id])[0])
+    except ValueError:
+        raise BadRequest("tournament must be a whole number")
+
+    if parts == ['tournaments']:
+        return ('tournaments',), tournaments_response
+    if parts == ['events']:
+        return ('events', tournament_id), in_tournament(tournament_id, events_response)
+    if len(parts) == 3 and parts[0] == 'events' and parts[2] == 'leaderboard':
+        try:
+            event_id = int(parts[1])
+        except ValueError:
+            raise NotFound(f"No event {parts[1]}")
+        offset, limit = page_arguments(query)
+        return (('leaderboard', tournament_id, event_id, offset, limit),
+                in_tournament(tournament_id, lambda engine: leaderboard_response(engine, event_id, offset, limit)))
+    if parts == ['scoreboard']:
+        offset, limit = page_arguments(query)
+        return (('scoreboard', tournament_id, offset, limit),
+                in_tournament(tournament_id, lambda engine: scoreboard_response(engine, offset, limit)))
+    raise NotFound(f"Unknown path {url.path}")
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    server_version = "TournamentAPI/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            cache_key, build = build_response(url, self.server.default_tournament_id)
+            etag, body = self.server.cache.get(cache_key, build)
+        except NotFound as e:
+            self.send_error_json(404, str(e))
+            return
+        except BadRequest as e:
+            self.send_error_json(400, str(e))
+            return
+        except sqlite3.OperationalError as e:
+            # e.g. the database is locked or its file is gone; screens simply try again later
+            self.send_error_json(503, f"Database unavailable: {e}")
+            return
+
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        # Clients may keep the response but must check the ETag before using it again
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Hundreds of polling screens would flood the console
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class APIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, db_path=DEFAULT_DB_PATH, verbose=False, tournament_id=DEFAULT_TOURNAMENT_ID):
+        super().__init__(address, APIRequestHandler)
+        # One read connection shared by the request threads; the cache lock serialises its use
+        self.engine = TournamentEngine(db_path, check_same_thread=False, tournament_id=tournament_id)
+        self.default_tournament_id = tournament_id
+        self.cache = ResponseCache(self.engine)
+        self.verbose = verbose
+
+    def server_close(self):
+        super().server_close()
+        self.engine.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve live leaderboards as JSON over HTTP.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on (0.0.0.0 for every network)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    parser.add_argument('--tournament', type=int, default=DEFAULT_TOURNAMENT_ID,
+                        help="TournamentID served when a request does not name one")
+    args = parser.parse_args(argv)
+
+    server = APIServer((args.host, args.port), args.db, args.verbose, args.tournament)
+    print(f"Serving leaderboards on http://{args.host}:{args.port}/scoreboard (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
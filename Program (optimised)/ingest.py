@@ -0,0 +1,397 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.managers import BaseManager
+
+from history import snapshot_if_due
+from tournament_engine import TournamentEngine, RegistrationError, DEFAULT_DB_PATH, DEFAULT_TOURNAMENT_ID
+
+# Score and registration intake for many judges' stations at once. Instead of every station writing
+# to the database file itself (and waiting for each other's locks), stations send commands to one
+# ingest service, and its single writer applies them many at a time, one transaction per batch:
+#   python ingest.py serve                  start the service (the only program writing scores)
+#   python ingest.py metrics                show its queue depth and throughput
+#   python ingest.py load --producers 8     load test with 8 producer processes
+# From a station's program:
+#   client = IngestClient(('scores-pc', 50000))
+#   client.update_points(event_id, entrant_id, points)
+# The service and its clients share a key, taken from the TOURNAMENT_INGEST_KEY environment variable.
+# There is no default: the service unpickles what clients send, so anyone holding the key can run code
+# in it. Use a long random key and keep it secret.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 50000
+AUTHKEY_ENV = 'TOURNAMENT_INGEST_KEY'
+
+MAX_BATCH = 2000  # commands written per transaction
+BATCH_WAIT = 0.5  # seconds the writer waits for a command before checking for shutdown
+QUEUE_SIZE = 100000  # commands waiting before producers are made to wait
+METRICS_INTERVAL = 5  # seconds between metrics reports
+RATE_WINDOW = 10  # seconds the current write rate is measured over
+RECENT_ERRORS = 20
+
+
+def authkey():
+    key = os.environ.get(AUTHKEY_ENV, '')
+    if not key:
+        raise RegistrationError(f"Set the {AUTHKEY_ENV} environment variable to the ingest service's key "
+                                f"(the same secret on the service and every station).")
+    return key.encode('utf-8')
+
+
+# ---------- Commands ----------
+# Plain tuples, so they are cheap to send between processes:
+#   ('points', TournamentID, EventID, entrant ID, points)
+#   ('register_individual', TournamentID, nickname, [EventIDs])
+#   ('register_team', TournamentID, team name, [member nicknames], [EventIDs])
+
+def points_command(event_id, entrant_id, points, tournament_id=DEFAULT_TOURNAMENT_ID):
+    return ('points', tournament_id, event_id, entrant_id, points)
+
+
+def individual_command(name, event_ids, tournament_id=DEFAULT_TOURNAMENT_ID):
+    return ('register_individual', tournament_id, name, list(event_ids))
+
+
+def team_command(team_name, member_names, event_ids, tournament_id=DEFAULT_TOURNAMENT_ID):
+    return ('register_team', tournament_id, team_name, list(member_names), list(event_ids))
+
+
+class CommandQueue:
+    # The queue between the producers and the writer, together with the service's counters.
+    # It lives in the service process; producers use it through IngestManager proxies.
+    def __init__(self, max_size=QUEUE_SIZE):
+        self.commands = queue.Queue(max_size)
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.received = 0
+        self.written = 0
+        self.rejected = 0
+        self.batches = 0
+        self.write_time = 0.0
+        self.samples = deque([(self.started, 0)])  # (time, commands done) for the current rate
+        self.recent_errors = deque(maxlen=RECENT_ERRORS)
+
+    def put(self, command):
+        self.put_many([command])
+
+    def put_many(self, commands):
+        # Waits while the queue is full, so producers slow down to what the writer can take
+        for command in commands:
+            self.commands.put(tuple(command))
+        with self.lock:
+            self.received += len(commands)
+
+    def get_batch(self, max_items, timeout):
+        # Waits up to timeout for one command, then takes whatever else is already queued with it.
+        # Batches are small when it is quiet (low latency) and grow under load (fewer commits).
+        try:
+            batch = [self.commands.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < max_items:
+            try:
+                batch.append(self.commands.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def record_batch(self, size, errors, elapsed):
+        now = time.time()
+        with self.lock:
+            self.batches += 1
+            self.written += size - len(errors)
+            self.rejected += len(errors)
+            self.write_time += elapsed
+            self.recent_errors.extend(errors)
+            self.samples.append((now, self.written + self.rejected))
+            # Keep the last sample before the window as the starting point of the rate
+            while len(self.samples) > 1 and self.samples[1][0] < now - RATE_WINDOW:
+                self.samples.popleft()
+
+    def metrics(self):
+        now = time.time()
+        with self.lock:
+            done = self.written + self.rejected
+            since, done_then = self.samples[0]
+            rate = (done - done_then) / (now - since) if now > since else 0.0
+            uptime = now - self.started
+            return {
+                'queue_depth': self.commands.qsize(),
+                'received': self.received,
+                'written': self.written,
+                'rejected': self.rejected,
+                'batches': self.batches,
+                'mean_batch': done / self.batches if self.batches else 0.0,
+                'writes_per_second': rate,
+                'writer_busy': self.write_time / uptime if uptime else 0.0,
+                'uptime': uptime,
+                'recent_errors': list(self.recent_errors),
+            }
+
+
+class IngestManager(BaseManager):
+    # Shares the service's CommandQueue with producer processes (locally or over the network)
+    pass
+
+
+# Producers only need the name; the service registers it with its queue in serve()
+IngestManager.register('commands')
+
+
+class IngestClient:
+    # A producer's connection to the ingest service. Commands are queued and written shortly after;
+    # rejected ones (e.g. a full event) show up in the service's metrics and log.
+    def __init__(self, address=(DEFAULT_HOST, DEFAULT_PORT), tournament_id=DEFAULT_TOURNAMENT_ID):
+        self.tournament_id = tournament_id
+        manager = IngestManager(address=address, authkey=authkey())
+        manager.connect()
+        self.commands = manager.commands()
+
+    def update_points(self, event_id, entrant_id, points):
+        self.commands.put(points_command(event_id, entrant_id, points, self.tournament_id))
+
+    def register_individual(self, name, event_ids):
+        self.commands.put(individual_command(name, event_ids, self.tournament_id))
+
+    def register_team(self, team_name, member_names, event_ids):
+        self.commands.put(team_command(team_name, member_names, event_ids, self.tournament_id))
+
+    def submit_many(self, commands):
+        # One round trip for many commands, for stations sending whole result sheets
+        self.commands.put_many(list(commands))
+
+    def metrics(self):
+        return self.commands.metrics()
+
+
+# ---------- Writer ----------
+
+class IngestWriter:
+    # The only connection writing commands to the database. A batch is one transaction, and every
+    # command runs in its own savepoint inside it, so one rejected command does not undo the others.
+    # After a batch, take_snapshots saves a history snapshot of tournaments that have had many changes since
+    # their last one.
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.engine = TournamentEngine(db_path)
+        self.event_types = {}  # (TournamentID, EventID) -> EventType, events never change type
+
+    def close(self):
+        self.engine.close()
+
+    def event_type(self, event_id):
+        # Keyed by tournament too, so a command naming another tournament's event is still rejected
+        key = (self.engine.tournament_id, event_id)
+        if key not in self.event_types:
+            event = self.engine.get_event(event_id)
+            if event is None:
+                raise RegistrationError(f"Event {event_id} does not exist in tournament "
+                                        f"{self.engine.tournament_id}.")
+            self.event_types[key] = event[2]
+        return self.event_types[key]
+
+    def apply(self, command):
+        kind, tournament_id, *args = command
+        if tournament_id != self.engine.tournament_id:
+            self.engine.use_tournament(tournament_id)
+        if kind == 'points':
+            event_id, entrant_id, points = args
+            self.engine.update_points(event_id, self.event_type(event_id), entrant_id, points)
+        elif kind == 'register_individual':
+            self.engine.register_individual(*args)
+        elif kind == 'register_team':
+            self.engine.register_team(*args)
+        else:
+            raise RegistrationError(f"Unknown command: {kind}")
+
+    def write_batch(self, commands):
+        # Returns the [(command, reason)] of the commands that were rejected
+        errors = []
+
+        def write():
+            for command in commands:
+                try:
+                    self.apply(command)
+                except (RegistrationError, ValueError, TypeError) as e:
+                    errors.append((command, str(e)))
+
+        self.engine.write_transaction(write)
+        return errors
+
+    def take_snapshots(self, commands):
+        # Keeps history replays short (see history.py). Runs after the batch is committed, so a failure
+        # here never causes the batch to be written again.
+        for tournament_id in {command[1] for command in commands if len(command) > 1}:
+            try:
+                self.engine.use_tournament(tournament_id)
+                snapshot_if_due(self.engine)
+            except Exception as e:
+                print(f"No history snapshot of tournament {tournament_id}: {e}", file=sys.stderr)
+
+
+def format_metrics(metrics):
+    return (f"queue {metrics['queue_depth']}, {metrics['written']} written, {metrics['rejected']} rejected, "
+            f"{metrics['writes_per_second']:.0f} writes/s, mean batch {metrics['mean_batch']:.0f}, "
+            f"writer busy {metrics['writer_busy']:.0%}")
+
+
+def write_metrics_file(path, metrics):
+    # Replaced in one step, so a dashboard never reads half a file
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as metrics_file:
+        json.dump(metrics, metrics_file)
+    os.replace(temp_path, path)
+
+
+def serve(db_path, address, max_batch=MAX_BATCH, metrics_path=None, quiet=False):
+    command_queue = CommandQueue()
+    IngestManager.register('commands', callable=lambda: command_queue)
+    server = IngestManager(address=address, authkey=authkey()).get_server()
+    threading.Thread(target=server.serve_forever, name="ingest-server", daemon=True).start()
+
+    writer = IngestWriter(db_path)
+    reported_at = time.time()
+    # Ctrl+C stops taking new batches once the queue is empty, never in the middle of one
+    stop = threading.Event()
+    previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    try:
+        while True:
+            batch = command_queue.get_batch(max_batch, 0 if stop.is_set() else BATCH_WAIT)
+            if stop.is_set() and not batch:
+                break
+            if batch:
+                start = time.perf_counter()
+                while True:
+                    try:
+                        errors = writer.write_batch(batch)
+                        break
+                    except RegistrationError as e:
+                        # The database stayed locked by some other program, nothing was written
+                        print(f"Batch of {len(batch)} not written ({e}), retrying", file=sys.stderr)
+                        time.sleep(1)
+                    except Exception as e:
+                        # Rolled back; keep the service running and count the batch as rejected
+                        print(f"Batch of {len(batch)} not written: {e!r}", file=sys.stderr)
+                        errors = [(command, f"Not written: {e}") for command in batch]
+                        break
+                writer.take_snapshots(batch)
+                command_queue.record_batch(len(batch), errors, time.perf_counter() - start)
+                if not quiet:
+                    for command, reason in errors:
+                        print(f"Rejected {command}: {reason}", file=sys.stderr)
+
+            if time.time() - reported_at >= METRICS_INTERVAL:
+                reported_at = time.time()
+                metrics = command_queue.metrics()
+                if not quiet:
+                    print(format_metrics(metrics))
+                if metrics_path:
+                    write_metrics_file(metrics_path, metrics)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        writer.close()
+    return command_queue.metrics()
+
+
+# ---------- Load test ----------
+
+def produce(address, tournament_id, commands, chunk_size):
+    client = IngestClient(address, tournament_id)
+    for start in range(0, len(commands), chunk_size):
+        client.submit_many(commands[start:start + chunk_size])
+
+
+def run_load(db_path, address, producers, count, chunk_size, tournament_id=DEFAULT_TOURNAMENT_ID, seed=0):
+    # Sends count random score updates for existing registrations from producers processes at once and
+    # waits until the service has written them. Returns the commands written per second.
+    rng = random.Random(seed)
+    engine = TournamentEngine(db_path, tournament_id=tournament_id)
+    registrations = [(event_id, entrant_id)
+                     for event_type in ('Individual', 'Team-based')
+                     for event_id, _ in engine.load_events(event_type)
+                     for _, entrant_id, _, _ in engine.event_leaderboard(event_id, event_type)]
+    engine.close()
+    if not registrations:
+        raise SystemExit("The tournament has no registrations to send scores for.")
+
+    client = IngestClient(address, tournament_id)
+    done_before = client.metrics()
+    done_before = done_before['written'] + done_before['rejected']
+
+    per_producer = [[points_command(*rng.choice(registrations), rng.randint(0, 110), tournament_id)
+                     for _ in range(count // producers + (index < count % producers))]
+                    for index in range(producers)]
+    start = time.perf_counter()
+    processes = [multiprocessing.Process(target=produce, args=(address, tournament_id, commands, chunk_size))
+                 for commands in per_producer]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    while True:
+        metrics = client.metrics()
+        if metrics['written'] + metrics['rejected'] - done_before >= count:
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    print(f"{count} score updates from {producers} producers written in {elapsed:.2f}s "
+          f"({count / elapsed:.0f}/s)")
+    print(format_metrics(metrics))
+    return count / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Single-writer intake for scores and registrations.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help="run the ingest service")
+    serve_parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file")
+    serve_parser.add_argument('--max-batch', type=int, default=MAX_BATCH, help="commands per transaction")
+    serve_parser.add_argument('--metrics-file', help="also write the metrics to this JSON file")
+    serve_parser.add_argument('--quiet', action='store_true', help="no metrics or rejections on the console")
+
+    subparsers.add_parser('metrics', help="show the service's metrics")
+
+    load_parser = subparsers.add_parser('load', help="send random score updates to a running service")
+    load_parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database the service writes to")
+    load_parser.add_argument('--producers', type=int, default=4, help="producer processes")
+    load_parser.add_argument('--count', type=int, default=20000, help="score updates to send")
+    load_parser.add_argument('--chunk-size', type=int, default=100, help="commands sent per round trip")
+    load_parser.add_argument('--tournament', type=int, default=DEFAULT_TOURNAMENT_ID, help="TournamentID")
+
+    for subparser in subparsers.choices.values():
+        subparser.add_argument('--host', default=DEFAULT_HOST, help="address of the service")
+        subparser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port of the service")
+    args = parser.parse_args(argv)
+    address = (args.host, args.port)
+
+    try:
+        authkey()
+        if args.command == 'serve':
+            print(f"Taking scores on {args.host}:{args.port} (Ctrl+C to stop)")
+            print(format_metrics(serve(args.db, address, args.max_batch, args.metrics_file, args.quiet)))
+        elif args.command == 'metrics':
+            try:
+                metrics = IngestClient(address).metrics()
+            except ConnectionError as e:
+                print(f"Error: no ingest service on {args.host}:{args.port} ({e})", file=sys.stderr)
+                return 1
+            print(json.dumps(metrics, indent=2))
+        else:
+            run_load(args.db, address, args.producers, args.count, args.chunk_size, args.tournament)
+    except RegistrationError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import bisect
+import tkinter as tk
+from tkinter import ttk
+
+# Rows fetched around the visible window, so small scrolls do not hit the database
+PAGE_MARGIN = 50
+
+
+class LeaderboardView(tk.Frame):
+    # A Treeview that only ever holds the rows that fit on screen.
+    # count_rows(engine) returns how many rows the leaderboard has in total and
+    # fetch_rows(engine, offset, limit) returns that slice of it, best first. Both run through
+    # runner (a db_worker.DBWorker or SyncRunner), so with a worker they never block the Tk thread.
+    # Rows are shown as they are fetched; their first column is the rank the engine gave them.
+    # ranking_method is the tournament's (see queries.RANKING_METHODS); with it, an edited row's
+    # ranks are worked out here instead of being read again.
+    def __init__(self, parent, columns, count_rows, fetch_rows, runner, ranking_method=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.count_rows = count_rows
+        self.fetch_rows = fetch_rows
+        self.runner = runner
+        self.ranking_method = ranking_method
+
+        self.total_rows = 0
+        self.first_row = 0  # offset of the top visible row
+        self.visible_rows = 1
+        self.page_offset = 0  # offset of the first cached row
+        self.page = []  # cached rows around the visible window
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", style="Treeview", height=1)
+        for col in columns:
+            self.tree.heading(col, text=col, anchor="center")
+            self.tree.column(col, anchor="center")
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # Shown over the tree while a query is running
+        self.loading_label = tk.Label(self, text="Loading...")
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_rows(-3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_rows(3))
+        self.tree.bind('<Prior>', lambda event: self.scroll_rows(-self.visible_rows))
+        self.tree.bind('<Next>', lambda event: self.scroll_rows(self.visible_rows))
+        self.tree.bind('<Home>', lambda event: self.scroll_to(0))
+        self.tree.bind('<End>', lambda event: self.scroll_to(self.total_rows))
+        self.bind('<Destroy>', self.on_destroy)
+
+    # ---------- Loading ----------
+
+    def page_request(self):
+        # Offset and size of the page to cache around the current position
+        return max(0, self.first_row - PAGE_MARGIN), self.visible_rows + 2 * PAGE_MARGIN
+
+    def refresh(self):
+        # Re-read the row count and the rows on screen (e.g. after points were changed)
+        offset, limit = self.page_request()
+        count_rows, fetch_rows = self.count_rows, self.fetch_rows
+        self.show_loading()
+        self.runner.submit(lambda engine: (count_rows(engine), fetch_rows(engine, offset, limit)),
+                           lambda result: self.on_page_loaded(offset, result[1], result[0]),
+                           key=self)
+
+    def load_page(self):
+        offset, limit = self.page_request()
+        fetch_rows = self.fetch_rows
+        self.show_loading()
+        self.runner.submit(lambda engine: fetch_rows(engine, offset, limit),
+                           lambda rows: self.on_page_loaded(offset, rows),
+                           key=self)
+
+    def on_page_loaded(self, offset, rows, total_rows=None):
+        if not self.winfo_exists():
+            return
+        self.hide_loading()
+        if total_rows is not None:
+            self.total_rows = total_rows
+        self.page_offset = offset
+        self.page = list(rows)
+        self.scroll_to(self.first_row)
+
+    def show_loading(self):
+        self.loading_label.place(relx=0.5, rely=0.5, anchor="center")
+
+    def hide_loading(self):
+        self.loading_label.place_forget()
+
+    def on_destroy(self, event):
+        # Results for a closed tab are of no use any more
+        if event.widget is self:
+            self.runner.cancel(self)
+
+    # ---------- Editing ----------
+
+    def update_points(self, item, points):
+        # Moves one displayed row to its new place after its points changed and works out the new
+        # ranks from the cached rows, without going back to the database.
+        # The last column of every row holds the points the leaderboard is sorted by.
+        visible_index = self.tree.index(item)
+        old_index = self.first_row - self.page_offset + visible_index
+        row = self.page.pop(old_index)
+        new_row = tuple(row[:-1]) + (points,)
+
+        # Binary search over the cached rows (sorted by points, best first).
+        # A changed row goes after the rows it now ties with.
+        new_index = bisect.bisect_right(self.page, -points, key=lambda cached_row: -cached_row[-1])
+
+        # Landing on the edge of the cache means the row may belong to rows we have not fetched
+        rows_before_cache = self.page_offset > 0 and new_index == 0
+        rows_after_cache = self.page_offset + len(self.page) + 1 < self.total_rows and new_index == len(self.page)
+        if rows_before_cache or rows_after_cache:
+            self.page.insert(old_index, new_row)
+            self.render()
+            self.refresh()
+            return
+
+        self.page.insert(new_index, new_row)
+        ranked = self.rerank(new_index, min(old_index, new_index), max(old_index, new_index))
+        self.render()
+        if not ranked:
+            self.refresh()
+
+    def rerank(self, moved, first, last):
+        # Recomputes the ranks of the cached rows from index first on, after the row now at index moved
+        # came from the other end of first..last. Rows above first keep their ranks. Below last, ranks
+        # can still shift (e.g. a dense rank whose points value disappeared), so it goes on until a rank
+        # comes out unchanged. Returns False when the cached rows alone can't tell the new ranks.
+        method = self.ranking_method
+        if method not in ('shared', 'dense', 'registration'):
+            # head_to_head breaks ties on match results, which only the database has
+            return False
+        if first == 0 and self.page_offset > 0:
+            # The rank of the first cached row depends on rows above the cache
+            return False
+        if method == 'registration':
+            # Among equal points the order is registration order, which the rows don't hold
+            points = self.page[moved][-1]
+            neighbours = [self.page[index] for index in (moved - 1, moved + 1) if 0 <= index < len(self.page)]
+            if any(cached_row[-1] == points for cached_row in neighbours):
+                return False
+
+        for index in range(first, len(self.page)):
+            cached_row = self.page[index]
+            previous = self.page[index - 1] if index > 0 else None
+            if previous is None:
+                rank = 1
+            elif method == 'registration':
+                rank = self.page_offset + index + 1
+            elif cached_row[-1] == previous[-1]:
+                rank = previous[0]
+            elif method == 'shared':
+                rank = self.page_offset + index + 1
+            else:
+                rank = previous[0] + 1
+            if index > last and rank == cached_row[0]:
+                break
+            self.page[index] = (rank,) + tuple(cached_row[1:])
+        return True
+
+    # ---------- Scrolling ----------
+
+    def row_height(self):
+        height = ttk.Style().lookup("Treeview", "rowheight")
+        return int(height) if height else 20
+
+    def on_resize(self, event):
+        # Header row takes about one row of space
+        visible_rows = max(1, event.height // self.row_height() - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.scroll_to(self.first_row)
+
+    def on_mousewheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def scroll_rows(self, rows):
+        self.scroll_to(self.first_row + rows)
+        return "break"
+
+    def yview(self, *args):
+        # Called by the scrollbar with ("moveto", fraction) or ("scroll", n, "units"/"pages")
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.total_rows))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible_rows
+            self.scroll_rows(amount)
+
+    def scroll_to(self, first_row):
+        self.first_row = max(0, min(first_row, self.total_rows - self.visible_rows))
+
+        # Fetch a new page only when the rows to show are not cached yet
+        last_row = min(self.first_row + self.visible_rows, self.total_rows)
+        if self.first_row < self.page_offset or last_row > self.page_offset + len(self.page):
+            self.load_page()
+        self.render()
+
+    def render(self):
+        # Shows the cached part of the visible window (all of it, unless a page is still loading)
+        start = self.first_row - self.page_offset
+        rows = self.page[max(0, start):max(0, start + self.visible_rows)] if start >= 0 else []
+
+        # Reuse the existing items so a scroll only changes their values
+        items = self.tree.get_children()
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+            items = items[:len(rows)]
+        for index, row in enumerate(rows):
+            values = tuple(row)
+            if index < len(items):
+                self.tree.item(items[index], values=values)
+            else:
+                self.tree.insert("", "end", values=values, tags=('centered',))
+
+        if self.total_rows:
+            self.scrollbar.set(self.first_row / self.total_rows,
+                               (self.first_row + self.visible_rows) / self.total_rows)
+        else:
+            self.scrollbar.set(0, 1)
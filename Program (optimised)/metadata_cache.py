@@ -0,0 +1,55 @@
+import os
+import threading
+
+# Events and entrant names hardly ever change during a tournament, but are needed by every
+# registration window and every leaderboard page. This keeps one copy of them per process, shared by
+# all engines on the same database file (the app's own engine, its background reader, the web servers).
+#
+# Every cached value is stored with the MetadataVersions counter it was loaded at. Triggers bump the
+# counters on any change to Events, Participants or Teams, whichever connection or process makes it,
+# so a value is only used while its counter is unchanged.
+
+
+class MetadataCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # (database, TournamentID, kind, key) -> (version, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, database, tournament_id, kind, key, version, load):
+        # Returns the cached value, or load() if it is missing or was loaded at another version.
+        # load() runs without the lock held, so a slow load never blocks other threads' lookups.
+        entry_key = (database, tournament_id, kind, key)
+        with self.lock:
+            entry = self.entries.get(entry_key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = load()
+        with self.lock:
+            # Another thread may already have stored a value loaded at a newer version
+            entry = self.entries.get(entry_key)
+            if entry is None or entry[0] <= version:
+                self.entries[entry_key] = (version, value)
+        return value
+
+    def clear(self, database=None):
+        with self.lock:
+            if database is None:
+                self.entries.clear()
+            else:
+                self.entries = {key: entry for key, entry in self.entries.items() if key[0] != database}
+
+
+def database_key(db_path):
+    # Every in-memory database is a separate one, so they are never shared
+    if db_path == ':memory:':
+        return None
+    return os.path.abspath(db_path)
+
+
+# The cache every TournamentEngine uses
+shared_cache = MetadataCache()
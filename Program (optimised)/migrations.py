@@ -0,0 +1,683 @@
+import sqlite3
+import sys
+
+# Schema migrations, applied in order. The number of the last applied migration is kept in
+# PRAGMA user_version, so opening an older tournament_management.db upgrades it in place.
+
+
+def create_base_tables(cursor):
+    # Same tables as Extras/db_creation.py, so a brand new database file also works
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Participants (
+                        ParticipantID INTEGER PRIMARY KEY,
+                        Name TEXT UNIQUE,
+                        TeamID INTEGER,
+                        FOREIGN KEY (TeamID) REFERENCES Teams(TeamID)
+                    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Teams (
+                        TeamID INTEGER PRIMARY KEY,
+                        TeamName TEXT UNIQUE
+                    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Events (
+                        EventID INTEGER PRIMARY KEY,
+                        EventName TEXT,
+                        EventType TEXT,
+                        PointsAllocated INTEGER
+                    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS EventParticipants (
+                        EventParticipantID INTEGER PRIMARY KEY,
+                        EventID INTEGER,
+                        ParticipantID INTEGER,
+                        TeamID INTEGER,
+                        PointsEarned INTEGER,
+                        FOREIGN KEY (ParticipantID) REFERENCES Participants(ParticipantID),
+                        FOREIGN KEY (TeamID) REFERENCES Teams(TeamID),
+                        FOREIGN KEY (EventID) REFERENCES Events(EventID)
+                    )''')
+
+
+def add_lookup_indexes(cursor):
+    # Older databases were created without UNIQUE on Participants.Name, so duplicate nicknames
+    # may exist. Keep the first one and tag the later ones with their ID before enforcing it, and
+    # say which names changed.
+    for entrants, table, id_column, name_column in (('participant', 'Participants', 'ParticipantID', 'Name'),
+                                                    ('team', 'Teams', 'TeamID', 'TeamName')):
+        duplicates = f"{id_column} NOT IN (SELECT MIN({id_column}) FROM {table} GROUP BY {name_column})"
+        renamed = cursor.execute(f"SELECT {id_column}, {name_column} FROM {table} WHERE {duplicates}").fetchall()
+        cursor.execute(f"UPDATE {table} SET {name_column} = {name_column} || ' (' || {id_column} || ')' "
+                       f"WHERE {duplicates}")
+        for entrant_id, name in renamed:
+            print(f"Renamed {entrants} {entrant_id} from '{name}' to '{name} ({entrant_id})', "
+                  f"the name was taken", file=sys.stderr)
+
+    # An entrant can only be registered once per event. Repeated registrations are merged into the first
+    # one, which keeps the highest points of them, and the others are dropped.
+    for column in ('ParticipantID', 'TeamID'):
+        cursor.execute(f"""
+            UPDATE EventParticipants
+            SET PointsEarned = (SELECT MAX(d.PointsEarned) FROM EventParticipants d
+                                WHERE d.EventID = EventParticipants.EventID AND d.{column} = EventParticipants.{column})
+            WHERE EventParticipantID IN (SELECT MIN(EventParticipantID) FROM EventParticipants
+                                         WHERE {column} IS NOT NULL
+                                         GROUP BY EventID, {column} HAVING COUNT(*) > 1)
+        """)
+        cursor.execute(f"""
+            DELETE FROM EventParticipants
+            WHERE {column} IS NOT NULL
+            AND EventParticipantID NOT IN (SELECT MIN(EventParticipantID) FROM EventParticipants
+                                           WHERE {column} IS NOT NULL
+                                           GROUP BY EventID, {column})
+        """)
+        if cursor.rowcount > 0:
+            entrants = 'participant' if column == 'ParticipantID' else 'team'
+            print(f"Merged {cursor.rowcount} repeated {entrants} event registrations, "
+                  f"keeping the highest points of each", file=sys.stderr)
+
+    # Nickname / team name checks in the registration forms
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_participants_name ON Participants (Name)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_teams_name ON Teams (TeamName)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_participants_team ON Participants (TeamID)")
+
+    # Event leaderboards and score updates
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ep_event_points ON EventParticipants (EventID, PointsEarned DESC)")
+    cursor.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_ep_event_participant
+                      ON EventParticipants (EventID, ParticipantID) WHERE ParticipantID IS NOT NULL""")
+    cursor.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_ep_event_team
+                      ON EventParticipants (EventID, TeamID) WHERE TeamID IS NOT NULL""")
+
+    # Overall scoreboard joins on the entrant side
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ep_participant ON EventParticipants (ParticipantID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ep_team ON EventParticipants (TeamID)")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_type ON Events (EventType)")
+
+
+def add_standings_table(cursor):
+    # Running totals for the overall scoreboard, one row per individual participant and per team.
+    # Team members are not listed on their own, their team's row carries the points.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Standings (
+                        EntrantType TEXT,
+                        EntrantID INTEGER,
+                        Name TEXT,
+                        TotalPoints INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (EntrantType, EntrantID)
+                    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_standings_points ON Standings (TotalPoints DESC)")
+
+    # Fill it from the data that is already there
+    cursor.execute("""
+        INSERT INTO Standings (EntrantType, EntrantID, Name, TotalPoints)
+        SELECT 'Individual', p.ParticipantID, p.Name,
+               COALESCE((SELECT SUM(ep.PointsEarned) FROM EventParticipants ep
+                         WHERE ep.ParticipantID = p.ParticipantID), 0)
+        FROM Participants p
+        WHERE p.TeamID IS NULL
+    """)
+    cursor.execute("""
+        INSERT INTO Standings (EntrantType, EntrantID, Name, TotalPoints)
+        SELECT 'Team', t.TeamID, t.TeamName,
+               COALESCE((SELECT SUM(ep.PointsEarned) FROM EventParticipants ep
+                         WHERE ep.TeamID = t.TeamID), 0)
+        FROM Teams t
+    """)
+
+    # Keep it up to date on every write, whoever does the write (app, bulk import, scripts)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_participant_insert AFTER INSERT ON Participants
+        WHEN NEW.TeamID IS NULL
+        BEGIN
+            INSERT INTO Standings (EntrantType, EntrantID, Name, TotalPoints)
+            VALUES ('Individual', NEW.ParticipantID, NEW.Name, 0);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_participant_rename AFTER UPDATE OF Name ON Participants
+        BEGIN
+            UPDATE Standings SET Name = NEW.Name
+            WHERE EntrantType = 'Individual' AND EntrantID = NEW.ParticipantID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_participant_delete AFTER DELETE ON Participants
+        BEGIN
+            DELETE FROM Standings WHERE EntrantType = 'Individual' AND EntrantID = OLD.ParticipantID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_team_insert AFTER INSERT ON Teams
+        BEGIN
+            INSERT INTO Standings (EntrantType, EntrantID, Name, TotalPoints)
+            VALUES ('Team', NEW.TeamID, NEW.TeamName, 0);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_team_rename AFTER UPDATE OF TeamName ON Teams
+        BEGIN
+            UPDATE Standings SET Name = NEW.TeamName WHERE EntrantType = 'Team' AND EntrantID = NEW.TeamID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_team_delete AFTER DELETE ON Teams
+        BEGIN
+            DELETE FROM Standings WHERE EntrantType = 'Team' AND EntrantID = OLD.TeamID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_points_insert AFTER INSERT ON EventParticipants
+        BEGIN
+            UPDATE Standings SET TotalPoints = TotalPoints + COALESCE(NEW.PointsEarned, 0)
+            WHERE EntrantType = 'Individual' AND EntrantID = NEW.ParticipantID;
+            UPDATE Standings SET TotalPoints = TotalPoints + COALESCE(NEW.PointsEarned, 0)
+            WHERE EntrantType = 'Team' AND EntrantID = NEW.TeamID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_points_update AFTER UPDATE OF PointsEarned ON EventParticipants
+        BEGIN
+            UPDATE Standings
+            SET TotalPoints = TotalPoints - COALESCE(OLD.PointsEarned, 0) + COALESCE(NEW.PointsEarned, 0)
+            WHERE EntrantType = 'Individual' AND EntrantID = NEW.ParticipantID;
+            UPDATE Standings
+            SET TotalPoints = TotalPoints - COALESCE(OLD.PointsEarned, 0) + COALESCE(NEW.PointsEarned, 0)
+            WHERE EntrantType = 'Team' AND EntrantID = NEW.TeamID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_standings_points_delete AFTER DELETE ON EventParticipants
+        BEGIN
+            UPDATE Standings SET TotalPoints = TotalPoints - COALESCE(OLD.PointsEarned, 0)
+            WHERE EntrantType = 'Individual' AND EntrantID = OLD.ParticipantID;
+            UPDATE Standings SET TotalPoints = TotalPoints - COALESCE(OLD.PointsEarned, 0)
+            WHERE EntrantType = 'Team' AND EntrantID = OLD.TeamID;
+        END
+    """)
+
+
+def add_score_change_log(cursor):
+    # Append-only log of every registration and score write, filled by triggers so writes from any
+    # connection show up. Live displays (push_server.py) follow it by ChangeID.
+    # ChangedAt is a Unix timestamp with fractions of a second.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS ScoreChanges (
+                        ChangeID INTEGER PRIMARY KEY AUTOINCREMENT,
+                        ChangedAt REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+                        ChangeType TEXT NOT NULL,
+                        EventParticipantID INTEGER NOT NULL,
+                        EventID INTEGER,
+                        ParticipantID INTEGER,
+                        TeamID INTEGER,
+                        PointsEarned INTEGER
+                    )''')
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_score_changes_insert AFTER INSERT ON EventParticipants
+        BEGIN
+            INSERT INTO ScoreChanges (ChangeType, EventParticipantID, EventID, ParticipantID, TeamID, PointsEarned)
+            VALUES ('register', NEW.EventParticipantID, NEW.EventID, NEW.ParticipantID, NEW.TeamID,
+                    NEW.PointsEarned);
+        END
+    """)
+    # Saving the same points again is not a change
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_score_changes_update AFTER UPDATE OF PointsEarned ON EventParticipants
+        WHEN OLD.PointsEarned IS NOT NEW.PointsEarned
+        BEGIN
+            INSERT INTO ScoreChanges (ChangeType, EventParticipantID, EventID, ParticipantID, TeamID, PointsEarned)
+            VALUES ('points', NEW.EventParticipantID, NEW.EventID, NEW.ParticipantID, NEW.TeamID,
+                    NEW.PointsEarned);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_score_changes_delete AFTER DELETE ON EventParticipants
+        BEGIN
+            INSERT INTO ScoreChanges (ChangeType, EventParticipantID, EventID, ParticipantID, TeamID, PointsEarned)
+            VALUES ('withdraw', OLD.EventParticipantID, OLD.EventID, OLD.ParticipantID, OLD.TeamID, NULL);
+        END
+    """)
+
+
+def add_tournaments(cursor):
+    # One file can hold many tournaments, each with its own registration limits.
+    # Everything already in the file becomes tournament 1.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Tournaments (
+                        TournamentID INTEGER PRIMARY KEY,
+                        Name TEXT NOT NULL UNIQUE,
+                        MaxParticipants INTEGER NOT NULL DEFAULT 40,
+                        MaxIndividuals INTEGER NOT NULL DEFAULT 20,
+                        MaxTeams INTEGER NOT NULL DEFAULT 4,
+                        MaxTeamMembers INTEGER NOT NULL DEFAULT 5
+                    )''')
+    cursor.execute("INSERT OR IGNORE INTO Tournaments (TournamentID, Name) VALUES (1, 'Tournament')")
+
+    for table in ('Events', 'EventParticipants', 'Standings', 'ScoreChanges'):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN TournamentID INTEGER NOT NULL DEFAULT 1 "
+                       f"REFERENCES Tournaments(TournamentID)")
+
+    # Names are only unique within a tournament, but the UNIQUE constraints of the original
+    # tables cannot be dropped, so Participants and Teams are rebuilt (their triggers go with them)
+    cursor.execute('''CREATE TABLE Participants_new (
+                        ParticipantID INTEGER PRIMARY KEY,
+                        TournamentID INTEGER NOT NULL DEFAULT 1,
+                        Name TEXT,
+                        TeamID INTEGER,
+                        FOREIGN KEY (TournamentID) REFERENCES Tournaments(TournamentID),
+                        FOREIGN KEY (TeamID) REFERENCES Teams(TeamID)
+                    )''')
+    cursor.execute("INSERT INTO Participants_new (ParticipantID, Name, TeamID) "
+                   "SELECT ParticipantID, Name, TeamID FROM Participants")
+    cursor.execute("DROP TABLE Participants")
+    cursor.execute("ALTER TABLE Participants_new RENAME TO Participants")
+
+    cursor.execute('''CREATE TABLE Teams_new (
+                        TeamID INTEGER PRIMARY KEY,
+                        TournamentID INTEGER NOT NULL DEFAULT 1,
+                        TeamName TEXT,
+                        FOREIGN KEY (TournamentID) REFERENCES Tournaments(TournamentID)
+                    )''')
+    cursor.execute("INSERT INTO Teams_new (TeamID, TeamName) SELECT TeamID, TeamName FROM Teams")
+    cursor.execute("DROP TABLE Teams")
+    cursor.execute("ALTER TABLE Teams_new RENAME TO Teams")
+
+    # Every per-tournament lookup starts with TournamentID
+    cursor.execute("CREATE UNIQUE INDEX idx_participants_name ON Participants (TournamentID, Name)")
+    cursor.execute("CREATE INDEX idx_participants_team ON Participants (TeamID)")
+    cursor.execute("CREATE INDEX idx_participants_individuals ON Participants (TournamentID, TeamID)")
+    cursor.execute("CREATE UNIQUE INDEX idx_teams_name ON Teams (TournamentID, TeamName)")
+    cursor.execute("DROP INDEX IF EXISTS idx_events_type")
+    cursor.execute("CREATE INDEX idx_events_type ON Events (TournamentID, EventType)")
+    cursor.execute("DROP INDEX IF EXISTS idx_standings_points")
+    cursor.execute("CREATE INDEX idx_standings_points ON Standings (TournamentID, TotalPoints DESC)")
+
+    # Standings and ScoreChanges rows carry the tournament of the entrant they belong to
+    cursor.execute("""
+        CREATE TRIGGER trg_standings_participant_insert AFTER INSERT ON Participants
+        WHEN NEW.TeamID IS NULL
+        BEGIN
+            INSERT INTO Standings (TournamentID, EntrantType, EntrantID, Name, TotalPoints)
+            VALUES (NEW.TournamentID, 'Individual', NEW.ParticipantID, NEW.Name, 0);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_standings_participant_rename AFTER UPDATE OF Name ON Participants
+        BEGIN
+            UPDATE Standings SET Name = NEW.Name
+            WHERE EntrantType = 'Individual' AND EntrantID = NEW.ParticipantID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_standings_participant_delete AFTER DELETE ON Participants
+        BEGIN
+            DELETE FROM Standings WHERE EntrantType = 'Individual' AND EntrantID = OLD.ParticipantID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_standings_team_insert AFTER INSERT ON Teams
+        BEGIN
+            INSERT INTO Standings (TournamentID, EntrantType, EntrantID, Name, TotalPoints)
+            VALUES (NEW.TournamentID, 'Team', NEW.TeamID, NEW.TeamName, 0);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_standings_team_rename AFTER UPDATE OF TeamName ON Teams
+        BEGIN
+            UPDATE Standings SET Name = NEW.TeamName WHERE EntrantType = 'Team' AND EntrantID = NEW.TeamID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_standings_team_delete AFTER DELETE ON Teams
+        BEGIN
+            DELETE FROM Standings WHERE EntrantType = 'Team' AND EntrantID = OLD.TeamID;
+        END
+    """)
+
+    for trigger in ('insert', 'update', 'delete'):
+        cursor.execute(f"DROP TRIGGER trg_score_changes_{trigger}")
+    cursor.execute("""
+        CREATE TRIGGER trg_score_changes_insert AFTER INSERT ON EventParticipants
+        BEGIN
+            INSERT INTO ScoreChanges (TournamentID, ChangeType, EventParticipantID, EventID, ParticipantID, TeamID,
+                                      PointsEarned)
+            VALUES (NEW.TournamentID, 'register', NEW.EventParticipantID, NEW.EventID, NEW.ParticipantID,
+                    NEW.TeamID, NEW.PointsEarned);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_score_changes_update AFTER UPDATE OF PointsEarned ON EventParticipants
+        WHEN OLD.PointsEarned IS NOT NEW.PointsEarned
+        BEGIN
+            INSERT INTO ScoreChanges (TournamentID, ChangeType, EventParticipantID, EventID, ParticipantID, TeamID,
+                                      PointsEarned)
+            VALUES (NEW.TournamentID, 'points', NEW.EventParticipantID, NEW.EventID, NEW.ParticipantID,
+                    NEW.TeamID, NEW.PointsEarned);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_score_changes_delete AFTER DELETE ON EventParticipants
+        BEGIN
+            INSERT INTO ScoreChanges (TournamentID, ChangeType, EventParticipantID, EventID, ParticipantID, TeamID,
+                                      PointsEarned)
+            VALUES (OLD.TournamentID, 'withdraw', OLD.EventParticipantID, OLD.EventID, OLD.ParticipantID,
+                    OLD.TeamID, NULL);
+        END
+    """)
+
+
+def add_metadata_versions(cursor):
+    # Counters bumped by triggers whenever events or entrant names change, so cached copies of them
+    # (metadata_cache.py) can tell they are out of date with one small read.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS MetadataVersions (
+                        Name TEXT PRIMARY KEY,
+                        Version INTEGER NOT NULL DEFAULT 0
+                    )''')
+    cursor.execute("INSERT OR IGNORE INTO MetadataVersions (Name) VALUES ('events'), ('names')")
+
+    for action in ('INSERT', 'DELETE', 'UPDATE'):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_metadata_events_{action.lower()} AFTER {action} ON Events
+            BEGIN
+                UPDATE MetadataVersions SET Version = Version + 1 WHERE Name = 'events';
+            END
+        """)
+    for table, name_columns in (('Participants', 'Name, TeamID'), ('Teams', 'TeamName')):
+        for action in ('INSERT', 'DELETE', f'UPDATE OF {name_columns}'):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_metadata_{table.lower()}_{action.split()[0].lower()}
+                AFTER {action} ON {table}
+                BEGIN
+                    UPDATE MetadataVersions SET Version = Version + 1 WHERE Name = 'names';
+                END
+            """)
+
+    # Leaderboards now read only IDs and points and take names from the cache, so the index also
+    # carries the entrant columns: a leaderboard page is read from the index alone
+    cursor.execute("DROP INDEX IF EXISTS idx_ep_event_points")
+    cursor.execute("""CREATE INDEX idx_ep_event_points
+                      ON EventParticipants (EventID, PointsEarned DESC, EventParticipantID, ParticipantID, TeamID)""")
+
+
+def add_ranking_methods(cursor):
+    # How each tournament ranks entrants with equal points (see queries.RANKING_METHODS).
+    # Ranks themselves are never stored: they are computed by the leaderboard queries while reading
+    # the points index in order, so a score change never has to rewrite the ranks below it.
+    cursor.execute("ALTER TABLE Tournaments ADD COLUMN RankingMethod TEXT NOT NULL DEFAULT 'shared'")
+
+
+def add_capacity_checks(cursor):
+    # Registration limits are enforced by the database itself, so two programs registering at the
+    # same time (the app, a bulk import, a second window) can never both take the last place.
+    # Running counts are kept next to the limits, so each check is one row lookup instead of a COUNT.
+    for column in ('ParticipantCount', 'IndividualCount', 'TeamCount'):
+        cursor.execute(f"ALTER TABLE Tournaments ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE Teams ADD COLUMN MemberCount INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("""
+        UPDATE Tournaments SET
+            ParticipantCount = (SELECT COUNT(*) FROM Participants p WHERE p.TournamentID = Tournaments.TournamentID),
+            IndividualCount = (SELECT COUNT(*) FROM Participants p
+                               WHERE p.TournamentID = Tournaments.TournamentID AND p.TeamID IS NULL),
+            TeamCount = (SELECT COUNT(*) FROM Teams t WHERE t.TournamentID = Tournaments.TournamentID)
+    """)
+    cursor.execute("UPDATE Teams SET MemberCount = (SELECT COUNT(*) FROM Participants p WHERE p.TeamID = Teams.TeamID)")
+
+    # Checks, run before the row is written. The messages are shown to the user as they are.
+    cursor.execute("""
+        CREATE TRIGGER trg_capacity_participants BEFORE INSERT ON Participants
+        WHEN (SELECT ParticipantCount >= MaxParticipants FROM Tournaments WHERE TournamentID = NEW.TournamentID)
+        BEGIN
+            SELECT RAISE(ABORT, 'Maximum participant limit reached.');
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_capacity_individuals BEFORE INSERT ON Participants
+        WHEN NEW.TeamID IS NULL
+        AND (SELECT IndividualCount >= MaxIndividuals FROM Tournaments WHERE TournamentID = NEW.TournamentID)
+        BEGIN
+            SELECT RAISE(ABORT, 'Maximum individual participant limit reached.');
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_capacity_team_members BEFORE INSERT ON Participants
+        WHEN NEW.TeamID IS NOT NULL
+        AND (SELECT t.MemberCount >= tr.MaxTeamMembers
+             FROM Teams t INNER JOIN Tournaments tr ON tr.TournamentID = t.TournamentID
+             WHERE t.TeamID = NEW.TeamID)
+        BEGIN
+            SELECT RAISE(ABORT, 'Maximum team member limit reached.');
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_capacity_teams BEFORE INSERT ON Teams
+        WHEN (SELECT TeamCount >= MaxTeams FROM Tournaments WHERE TournamentID = NEW.TournamentID)
+        BEGIN
+            SELECT RAISE(ABORT, 'Maximum team limit reached.');
+        END
+    """)
+
+    # Counters, kept up to date after every write
+    cursor.execute("""
+        CREATE TRIGGER trg_counts_participant_insert AFTER INSERT ON Participants
+        BEGIN
+            UPDATE Tournaments
+            SET ParticipantCount = ParticipantCount + 1,
+                IndividualCount = IndividualCount + (NEW.TeamID IS NULL)
+            WHERE TournamentID = NEW.TournamentID;
+            UPDATE Teams SET MemberCount = MemberCount + 1 WHERE TeamID = NEW.TeamID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_counts_participant_delete AFTER DELETE ON Participants
+        BEGIN
+            UPDATE Tournaments
+            SET ParticipantCount = ParticipantCount - 1,
+                IndividualCount = IndividualCount - (OLD.TeamID IS NULL)
+            WHERE TournamentID = OLD.TournamentID;
+            UPDATE Teams SET MemberCount = MemberCount - 1 WHERE TeamID = OLD.TeamID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_counts_participant_move AFTER UPDATE OF TeamID ON Participants
+        WHEN OLD.TeamID IS NOT NEW.TeamID
+        BEGIN
+            UPDATE Tournaments
+            SET IndividualCount = IndividualCount - (OLD.TeamID IS NULL) + (NEW.TeamID IS NULL)
+            WHERE TournamentID = NEW.TournamentID;
+            UPDATE Teams SET MemberCount = MemberCount - 1 WHERE TeamID = OLD.TeamID;
+            UPDATE Teams SET MemberCount = MemberCount + 1 WHERE TeamID = NEW.TeamID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_counts_team_insert AFTER INSERT ON Teams
+        BEGIN
+            UPDATE Tournaments SET TeamCount = TeamCount + 1 WHERE TournamentID = NEW.TournamentID;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_counts_team_delete AFTER DELETE ON Teams
+        BEGIN
+            UPDATE Tournaments SET TeamCount = TeamCount - 1 WHERE TournamentID = OLD.TournamentID;
+        END
+    """)
+
+
+def add_standings_snapshots(cursor):
+    # Copies of every registration's points taken now and then (history.py). The points at any moment
+    # are the last snapshot before it plus the ScoreChanges logged after that snapshot, so a past
+    # standings table is rebuilt from a short stretch of the log instead of all of it.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS StandingsSnapshots (
+                        SnapshotID INTEGER PRIMARY KEY,
+                        TournamentID INTEGER NOT NULL REFERENCES Tournaments(TournamentID),
+                        TakenAt REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+                        LastChangeID INTEGER NOT NULL
+                    )''')
+    cursor.execute("CREATE INDEX idx_snapshots_time ON StandingsSnapshots (TournamentID, TakenAt)")
+    cursor.execute('''CREATE TABLE IF NOT EXISTS SnapshotRegistrations (
+                        SnapshotID INTEGER NOT NULL REFERENCES StandingsSnapshots(SnapshotID),
+                        EventParticipantID INTEGER NOT NULL,
+                        EventID INTEGER,
+                        ParticipantID INTEGER,
+                        TeamID INTEGER,
+                        PointsEarned INTEGER,
+                        PRIMARY KEY (SnapshotID, EventParticipantID)
+                    ) WITHOUT ROWID''')
+
+    # Replays read one tournament's log after a snapshot, audits one event's log
+    cursor.execute("CREATE INDEX idx_score_changes_tournament ON ScoreChanges (TournamentID, ChangeID)")
+    cursor.execute("CREATE INDEX idx_score_changes_event ON ScoreChanges (EventID, ChangeID)")
+
+    # The log is the record the history is rebuilt from, so it can only grow
+    for action in ('UPDATE', 'DELETE'):
+        cursor.execute(f"""
+            CREATE TRIGGER trg_score_changes_append_only_{action.lower()} BEFORE {action} ON ScoreChanges
+            BEGIN
+                SELECT RAISE(ABORT, 'The score change log cannot be changed.');
+            END
+        """)
+
+    # A new tournament's history starts empty, everything after that is in the log
+    cursor.execute("""
+        CREATE TRIGGER trg_snapshots_tournament_insert AFTER INSERT ON Tournaments
+        BEGIN
+            INSERT INTO StandingsSnapshots (TournamentID, LastChangeID)
+            SELECT NEW.TournamentID, COALESCE(MAX(ChangeID), 0) FROM ScoreChanges;
+        END
+    """)
+
+    # History of the existing tournaments starts with the points as they are now; the older log may
+    # not cover everything
+    for (tournament_id,) in cursor.execute("SELECT TournamentID FROM Tournaments").fetchall():
+        cursor.execute("""INSERT INTO StandingsSnapshots (TournamentID, LastChangeID)
+                          SELECT ?, COALESCE(MAX(ChangeID), 0) FROM ScoreChanges""", (tournament_id,))
+        cursor.execute("""INSERT INTO SnapshotRegistrations
+                          SELECT ?, EventParticipantID, EventID, ParticipantID, TeamID, PointsEarned
+                          FROM EventParticipants WHERE TournamentID = ?""", (cursor.lastrowid, tournament_id))
+
+
+def add_brackets(cursor):
+    # Knockout and Swiss events (brackets.py). Matches are between registrations (EventParticipantID),
+    # so individual and team events work the same way.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Brackets (
+                        EventID INTEGER PRIMARY KEY REFERENCES Events(EventID),
+                        TournamentID INTEGER NOT NULL REFERENCES Tournaments(TournamentID),
+                        Format TEXT NOT NULL,
+                        Rounds INTEGER NOT NULL
+                    )''')
+    # Knockout matches are all created up front: WinnerTo/LoserTo name the match (and its slot 'A'
+    # or 'B') the winner and loser move on to. Status is 'waiting' for entrants, 'ready' to be
+    # played, 'done', or 'bye' for a match with only one entrant.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Matches (
+                        MatchID INTEGER PRIMARY KEY,
+                        TournamentID INTEGER NOT NULL REFERENCES Tournaments(TournamentID),
+                        EventID INTEGER NOT NULL REFERENCES Events(EventID),
+                        Bracket TEXT NOT NULL,
+                        Round INTEGER NOT NULL,
+                        Position INTEGER NOT NULL,
+                        RegistrationA INTEGER,
+                        RegistrationB INTEGER,
+                        ScoreA INTEGER,
+                        ScoreB INTEGER,
+                        WinnerRegistration INTEGER,
+                        LoserRegistration INTEGER,
+                        Status TEXT NOT NULL DEFAULT 'waiting',
+                        WinnerTo INTEGER,
+                        WinnerSlot TEXT,
+                        LoserTo INTEGER,
+                        LoserSlot TEXT
+                    )''')
+    cursor.execute("CREATE UNIQUE INDEX idx_matches_event ON Matches (EventID, Bracket, Round, Position)")
+    cursor.execute("CREATE INDEX idx_matches_registration_a ON Matches (RegistrationA)")
+    cursor.execute("CREATE INDEX idx_matches_registration_b ON Matches (RegistrationB)")
+    # Head-to-head ranking looks up the matches a registration won
+    cursor.execute("CREATE INDEX idx_matches_winner ON Matches (WinnerRegistration)")
+
+
+def add_rounds(cursor):
+    # One row per paired round of a Swiss or round-robin event (brackets.py, pairings.py); the
+    # round's matches and results are in Matches
+    cursor.execute('''CREATE TABLE IF NOT EXISTS Rounds (
+                        EventID INTEGER NOT NULL REFERENCES Events(EventID),
+                        Round INTEGER NOT NULL,
+                        TournamentID INTEGER NOT NULL REFERENCES Tournaments(TournamentID),
+                        PairedAt REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+                        Matches INTEGER NOT NULL,
+                        Rematches INTEGER NOT NULL DEFAULT 0,
+                        PRIMARY KEY (EventID, Round)
+                    ) WITHOUT ROWID''')
+    # Swiss brackets drawn before this version already have rounds
+    cursor.execute('''INSERT INTO Rounds (EventID, Round, TournamentID, Matches)
+                      SELECT EventID, Round, TournamentID, COUNT(*)
+                      FROM Matches
+                      WHERE Bracket = 'swiss'
+                      GROUP BY EventID, Round''')
+
+
+def add_event_schedule(cursor):
+    # Time slot and venue of every event, planned by schedule.py. The unique index keeps a venue
+    # to one event per slot.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS EventSchedule (
+                        EventID INTEGER PRIMARY KEY REFERENCES Events(EventID),
+                        TournamentID INTEGER NOT NULL REFERENCES Tournaments(TournamentID),
+                        Slot INTEGER NOT NULL,
+                        StartsAt REAL,
+                        Venue TEXT NOT NULL
+                    )''')
+    cursor.execute("CREATE UNIQUE INDEX idx_schedule_slot_venue ON EventSchedule (TournamentID, Slot, Venue)")
+
+
+def add_match_times(cursor):
+    # When each match result was recorded, so history.py can replay head-to-head tie-breaks.
+    # Results recorded before this migration have none and count as decided at any time.
+    cursor.execute("ALTER TABLE Matches ADD COLUMN DecidedAt REAL")
+
+
+# (version, description, function)
+MIGRATIONS = [
+    (1, "Base tables", create_base_tables),
+    (2, "Lookup indexes and unique registrations", add_lookup_indexes),
+    (3, "Standings table kept up to date by triggers", add_standings_table),
+    (4, "Score change log for live displays", add_score_change_log),
+    (5, "Tournaments with their own limits, all tables scoped by tournament", add_tournaments),
+    (6, "Metadata change counters and covering leaderboard index", add_metadata_versions),
+    (7, "Per-tournament ranking of tied entrants", add_ranking_methods),
+    (8, "Registration limits enforced by the database", add_capacity_checks),
+    (9, "Standings snapshots for point-in-time history", add_standings_snapshots),
+    (10, "Brackets and matches for knockout and Swiss events", add_brackets),
+    (11, "Rounds of Swiss and round-robin events", add_rounds),
+    (12, "Time slots and venues of events", add_event_schedule),
+    (13, "Times of match results for head-to-head history", add_match_times),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, verbose=False):
+    # Applies every migration newer than the database, each one in its own transaction.
+    # Returns the list of versions that were applied.
+    applied = []
+    for version, description, function in MIGRATIONS:
+        if version <= schema_version(conn):
+            continue
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Another process may have migrated the file while we were waiting for the lock
+            if version <= schema_version(conn):
+                conn.rollback()
+                continue
+            function(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        applied.append(version)
+        if verbose:
+            print(f"Applied migration {version}: {description}")
+    return applied
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'Extras/tournament_management.db'
+    connection = sqlite3.connect(db_path)
+    migrate(connection, verbose=True)
+    print(f"Database is at schema version {schema_version(connection)}")
+    connection.close()
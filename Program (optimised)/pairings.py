@@ -0,0 +1,142 @@
+from collections import deque
+
+# Pairing rounds of round-robin and Swiss events (brackets.py stores them). Works on plain
+# EventParticipantIDs, so it doesn't touch the database.
+#   round_robin_pairs  the circle method: everyone meets everyone once over len(field) - 1 rounds
+#   swiss_pairings     pairs each score group top half against bottom half, as close to
+#                      1st-vs-(n/2+1)th as rematches allow; whoever can't be paired in their group
+#                      moves down to the next one, and whoever is left at the bottom is paired
+#                      again together with the groups above
+#   assign_sides       decides who plays on side A (home, white, first to answer) so that every
+#                      entrant's sides stay balanced
+# Pairing a round of a few thousand entrants takes milliseconds.
+
+
+def round_robin_pairs(field, round_number):
+    # Pairs of round round_number (from 1) of a round robin of field, as (pairs, bye). With an odd
+    # field everyone sits out once, otherwise bye is None.
+    players = list(field) + ([None] if len(field) % 2 else [])
+    if len(players) < 2:
+        return [], players[0] if players else None
+    shift = (round_number - 1) % (len(players) - 1)
+    rotating = players[1:]
+    if shift:
+        rotating = rotating[-shift:] + rotating[:-shift]
+    circle = [players[0]] + rotating
+
+    pairs = []
+    bye = None
+    for index in range(len(circle) // 2):
+        first, second = circle[index], circle[len(circle) - 1 - index]
+        if first is None or second is None:
+            bye = second if first is None else first
+        else:
+            pairs.append((first, second))
+    return pairs, bye
+
+
+def round_robin_rounds(field_size):
+    return field_size - 1 if field_size % 2 == 0 else field_size
+
+
+def swiss_pairings(standings, scores, opponents, had_bye=()):
+    # standings: entrants best first; scores: {entrant: match points}; opponents: {entrant: set of
+    # entrants met}. Returns (pairs, bye, rematches). The bye goes to the lowest-ranked entrant without
+    # one, and rematches are only made when an entrant can't be paired with anyone left otherwise.
+    players = list(standings)
+    bye = None
+    if len(players) % 2:
+        bye = next((entrant for entrant in reversed(players) if entrant not in had_bye), players[-1])
+        players.remove(bye)
+
+    rank = {entrant: position for position, entrant in enumerate(players)}
+    groups = []  # the pairs made in each score group
+    floaters = []
+    start = 0
+    while start < len(players):
+        end = start
+        while end < len(players) and scores.get(players[end], 0) == scores.get(players[start], 0):
+            end += 1
+        group_pairs, floaters = pair_group(floaters + players[start:end], opponents)
+        groups.append(group_pairs)
+        start = end
+
+    # Whoever is left at the bottom has met everyone else left: pair them again together with the
+    # groups above, one group at a time, before making rematches
+    rematches = 0
+    pool = floaters
+    while pool:
+        if not groups:
+            group_pairs, left = pair_group(pool, opponents)
+            for first, second in zip(left[0::2], left[1::2]):
+                group_pairs.append((first, second))
+                rematches += second in opponents.get(first, ())
+            groups.append(group_pairs)
+            break
+        pool = sorted(pool + [entrant for pair in groups.pop() for entrant in pair], key=rank.__getitem__)
+        group_pairs, left = pair_group(pool, opponents)
+        if not left:
+            groups.append(group_pairs)
+            break
+    return [pair for group_pairs in groups for pair in group_pairs], bye, rematches
+
+
+def pair_group(pool, opponents):
+    # Pairs the top half of pool with its bottom half without rematches: first i-th with i-th, then
+    # augmenting paths for the entrants that had met. Returns (pairs, entrants left unpaired) in
+    # standings order.
+    half = len(pool) // 2
+    top, bottom = pool[:half], pool[half:]
+    top_match = [None] * len(top)
+    bottom_match = [None] * len(bottom)
+    met = [opponents.get(entrant, ()) for entrant in top]
+
+    for index in range(len(top)):
+        if bottom[index] not in met[index]:
+            top_match[index] = index
+            bottom_match[index] = index
+    for index in range(len(top)):
+        if top_match[index] is None:
+            augment(index, bottom, met, top_match, bottom_match)
+
+    pairs = [(top[index], bottom[match]) for index, match in enumerate(top_match) if match is not None]
+    left = [entrant for entrant, match in zip(top, top_match) if match is None] + \
+        [entrant for entrant, match in zip(bottom, bottom_match) if match is None]
+    return pairs, left
+
+
+def augment(start, bottom, met, top_match, bottom_match):
+    # Breadth-first search for an alternating path from unpaired top[start] to an unpaired bottom
+    # entrant; flips the path if one is found. Looks at the bottom entrants nearest the canonical
+    # opponent first, so pairs stay as close to i-th against i-th as they can.
+    reached_from = {}  # bottom index -> top index it was reached from
+    queue = deque([start])
+    while queue:
+        index = queue.popleft()
+        for candidate in list(range(index, len(bottom))) + list(range(index - 1, -1, -1)):
+            if candidate in reached_from or bottom[candidate] in met[index]:
+                continue
+            reached_from[candidate] = index
+            if bottom_match[candidate] is None:
+                while True:
+                    index = reached_from[candidate]
+                    previous = top_match[index]
+                    top_match[index] = candidate
+                    bottom_match[candidate] = index
+                    if index == start:
+                        return True
+                    candidate = previous
+            queue.append(bottom_match[candidate])
+    return False
+
+
+def assign_sides(pairs, balance, last_side):
+    # Orders every pair as (side A, side B). balance: {entrant: times on side A - times on side B};
+    # last_side: {entrant: 'A' or 'B'}. Whoever has been on side B more often gets side A, then
+    # whoever was on side B last time; otherwise the higher-ranked entrant (first in the pair).
+    ordered = []
+    for first, second in pairs:
+        first_due = (balance.get(first, 0), last_side.get(first) == 'A')
+        second_due = (balance.get(second, 0), last_side.get(second) == 'A')
+        ordered.append((second, first) if second_due < first_due else (first, second))
+    return ordered
@@ -0,0 +1,143 @@
+import atexit
+import logging
+import os
+import sys
+import threading
+from logging.handlers import RotatingFileHandler
+
+# Opt-in query profiling. Switched off unless one of these environment variables is set, e.g.
+#   TOURNAMENT_SLOW_QUERY_MS=20 python software_opt.py
+# TOURNAMENT_SLOW_QUERY_MS  log statements slower than this many ms, with their query plan
+# TOURNAMENT_QUERY_LOG      log file (default Extras/query_profile.log)
+# TOURNAMENT_SQL_TRACE      set to 1 to also log every SQL statement the connection runs
+# A summary of all statements of the engines still open is printed and logged when the program exits
+# (slow statements are logged as they happen either way).
+
+SLOW_QUERY_ENV = 'TOURNAMENT_SLOW_QUERY_MS'
+QUERY_LOG_ENV = 'TOURNAMENT_QUERY_LOG'
+SQL_TRACE_ENV = 'TOURNAMENT_SQL_TRACE'
+
+DEFAULT_THRESHOLD_MS = 50.0
+DEFAULT_LOG_PATH = 'Extras/query_profile.log'
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+_handlers = {}  # log path -> handler, shared by every connection logging there
+_handlers_lock = threading.Lock()
+
+# Profilers whose summary is still due. One atexit hook per process writes them, however many
+# engines come and go.
+_open_profilers = set()
+_open_profilers_lock = threading.Lock()
+_exit_hook_registered = False
+
+
+def get_logger(log_path):
+    # A logger writing to log_path, rotated at LOG_MAX_BYTES with LOG_BACKUP_COUNT old files kept
+    logger = logging.getLogger(f"tournament.queries.{os.path.abspath(log_path)}")
+    with _handlers_lock:
+        if log_path not in _handlers:
+            directory = os.path.dirname(log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                          encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(asctime)s [%(threadName)s] %(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+            _handlers[log_path] = handler
+    return logger
+
+
+class QueryProfiler:
+    # Watches one engine's statements (through its QueryRegistry) and logs the slow ones together
+    # with their EXPLAIN QUERY PLAN. With trace=True every statement run on the connection is logged
+    # too, including ones sent outside the registry and the statements run by triggers.
+    def __init__(self, engine, threshold_ms=DEFAULT_THRESHOLD_MS, log_path=DEFAULT_LOG_PATH, trace=False,
+                 summary_at_exit=True):
+        self.engine = engine
+        self.threshold = threshold_ms / 1000
+        self.logger = get_logger(log_path)
+        self.plans = {}  # statement name -> query plan text, each plan is looked up once
+        self.slow_counts = {}
+        self.label = f"{os.path.basename(engine.db_path)} on {threading.current_thread().name}"
+
+        engine.queries.observer = self.observe
+        if trace:
+            engine.conn.set_trace_callback(self.trace)
+        if summary_at_exit:
+            summary_on_exit(self)
+
+    def observe(self, name, sql, params, elapsed, rows):
+        if elapsed < self.threshold:
+            return
+        self.slow_counts[name] = self.slow_counts.get(name, 0) + 1
+        self.logger.warning("slow query %s: %.2f ms, %s rows, params %r\n%s",
+                            name, elapsed * 1000, rows, params, self.query_plan(name, sql, params))
+
+    def query_plan(self, name, sql, params):
+        if name not in self.plans:
+            try:
+                # executemany statements are logged without parameters, NULLs give the same plan
+                plan_params = params if params is not None else [None] * sql.count('?')
+                rows = self.engine.conn.execute("EXPLAIN QUERY PLAN " + sql, plan_params).fetchall()
+                self.plans[name] = "\n".join(f"    {detail}" for _, _, _, detail in rows)
+            except Exception as e:
+                self.plans[name] = f"    (no query plan: {e})"
+        return self.plans[name]
+
+    def trace(self, statement):
+        self.logger.debug("sql: %s", " ".join(statement.split()))
+
+    def detach(self):
+        # Stops watching the engine (TournamentEngine.close calls it); no summary is written for it
+        with _open_profilers_lock:
+            _open_profilers.discard(self)
+        self.engine.queries.observer = None
+        self.engine.conn.set_trace_callback(None)
+
+    def summary(self):
+        lines = [f"Query profile for {self.label}", self.engine.queries.format_report()]
+        if self.slow_counts:
+            lines.append(f"Slower than {self.threshold * 1000:g} ms: "
+                         + ", ".join(f"{name} x{count}" for name, count in
+                                     sorted(self.slow_counts.items(), key=lambda item: -item[1])))
+        return "\n".join(lines)
+
+    def write_summary(self):
+        if not self.engine.queries.report():
+            return
+        summary = self.summary()
+        self.logger.info(summary)
+        print(summary, file=sys.stderr)
+
+
+def summary_on_exit(profiler):
+    global _exit_hook_registered
+    with _open_profilers_lock:
+        _open_profilers.add(profiler)
+        if not _exit_hook_registered:
+            atexit.register(write_open_summaries)
+            _exit_hook_registered = True
+
+
+def write_open_summaries():
+    with _open_profilers_lock:
+        profilers = list(_open_profilers)
+        _open_profilers.clear()
+    for profiler in profilers:
+        profiler.write_summary()
+
+
+def profile_from_environment(engine):
+    # Attaches a QueryProfiler to engine if profiling was switched on through the environment
+    threshold = os.environ.get(SLOW_QUERY_ENV)
+    trace = os.environ.get(SQL_TRACE_ENV, '') not in ('', '0')
+    if threshold is None and not trace:
+        return None
+    try:
+        threshold_ms = float(threshold) if threshold else DEFAULT_THRESHOLD_MS
+    except ValueError:
+        threshold_ms = DEFAULT_THRESHOLD_MS
+    return QueryProfiler(engine, threshold_ms, os.environ.get(QUERY_LOG_ENV, DEFAULT_LOG_PATH), trace)
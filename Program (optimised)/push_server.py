@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from tournament_engine import TournamentEngine, DEFAULT_DB_PATH
+
+# Pushes every score and registration change to live displays as Server-Sent Events:
+#   GET /changes                   every tournament in the file
+#   GET /changes?tournament=<id>   one tournament only
+#   GET /changes?event=<id>        one event only
+# Each message is one change of one entrant:
+#   id: <ChangeID>
+#   event: score
+#   data: {"change": "points", "tournament": 1, "event": 6, "type": "Individual", "entrant": 4, "points": 10,
+#          "rank": 1}
+# "change" is "register", "points" or "withdraw" (points and rank are null for "withdraw").
+# Browsers reconnect by themselves and send Last-Event-ID, so no change is missed across reconnects;
+# if too much was missed an "event: reset" tells the display to reload the whole leaderboard instead.
+
+DEFAULT_HOST = '127.0.0.1'  # only this computer; --host 0.0.0.0 serves the whole network
+DEFAULT_PORT = 8081
+POLL_INTERVAL = 0.2  # seconds between checks for new writes
+HEARTBEAT_INTERVAL = 15  # seconds of silence before a keep-alive comment is sent
+CLIENT_QUEUE_SIZE = 256  # messages a slow client may fall behind before it is disconnected
+BATCH_SIZE = 1000  # log rows read per query
+MAX_REPLAY = 5000  # changes replayed to a reconnecting client before sending a reset instead
+MAX_REQUEST_SIZE = 8192
+MAX_RETRY_DELAY = 5  # longest wait, in seconds, before reading the change log again after an error
+
+RESET_MESSAGE = b"event: reset\ndata: {}\n\n"
+KEEP_ALIVE_MESSAGE = b": keep-alive\n\n"
+
+
+def change_message(change_id, change_type, tournament_id, event_id, event_type, entrant_id, points, rank):
+    data = {'change': change_type, 'tournament': tournament_id, 'event': event_id, 'type': event_type,
+            'entrant': entrant_id, 'points': points, 'rank': rank}
+    return f"id: {change_id}\nevent: score\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+def read_changes(engine, change_id, up_to=None):
+    # Reads one batch of the change log after change_id.
+    # Returns (last ChangeID read, [((TournamentID, EventID), message)], whether there may be more).
+    rows = engine.changes_since(change_id, BATCH_SIZE)
+    more = len(rows) == BATCH_SIZE
+    if up_to is not None:
+        rows = [row for row in rows if row[0] <= up_to]
+        more = more and len(rows) == BATCH_SIZE
+    if not rows:
+        return change_id, [], False
+
+    # Ranks are read from the current table, so only the newest change of each registration matters
+    latest = {}
+    for row in rows:
+        latest[row[3]] = row
+    # Every tournament ranks ties its own way
+    ranking_methods = {tournament_id: ranking_method
+                       for tournament_id, _, ranking_method in engine.load_tournaments()}
+
+    messages = []
+    for change_id, tournament_id, change_type, event_participant_id, event_id, event_type, entrant_id, points in \
+            sorted(latest.values()):
+        rank = None if change_type == 'withdraw' else engine.event_rank(event_participant_id,
+                                                                        ranking_methods.get(tournament_id))
+        if rank is None:
+            # Withdrawn since (the withdrawal itself is further down the log)
+            change_type, points = 'withdraw', None
+        messages.append(((tournament_id, event_id),
+                         change_message(change_id, change_type, tournament_id, event_id, event_type,
+                                        entrant_id, points, rank)))
+    return rows[-1][0], messages, more
+
+
+class Client:
+    def __init__(self, writer, tournament_id, event_id):
+        self.writer = writer
+        self.tournament_id = tournament_id  # None for all tournaments
+        self.event_id = event_id  # None for all events
+        self.queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        self.task = asyncio.current_task()
+
+    def wants(self, topic):
+        tournament_id, event_id = topic
+        return ((self.tournament_id is None or self.tournament_id == tournament_id)
+                and (self.event_id is None or self.event_id == event_id))
+
+    def send(self, message):
+        # Never waits: returns False if the client is too far behind
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+
+class PushServer:
+    # One task follows the change log and fans each message out to per-client queues; every
+    # client has its own task writing its queue to the socket. Messages are encoded once and
+    # shared by all clients, and a client that stops reading is dropped instead of holding
+    # up the others.
+    def __init__(self, db_path=DEFAULT_DB_PATH, poll_interval=POLL_INTERVAL):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.clients = set()
+        # The engine is only ever used from this one thread, one query at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="push-db")
+        self.engine = None
+        self.last_change_id = 0
+        self.server = None
+        self.follow_task = None
+
+    async def db(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, self.engine, *args)
+
+    async def start(self, host, port):
+        loop = asyncio.get_running_loop()
+        self.engine = await loop.run_in_executor(
+            self.executor, lambda: TournamentEngine(self.db_path, check_same_thread=False))
+        self.last_change_id = await self.db(TournamentEngine.last_change_id)
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_REQUEST_SIZE)
+        self.follow_task = asyncio.create_task(self.follow_changes())
+        return self.server
+
+    async def close(self):
+        self.follow_task.cancel()
+        self.server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        await self.server.wait_closed()
+        await self.db(TournamentEngine.close)
+        self.executor.shutdown()
+
+    # ---------- Change log ----------
+
+    async def follow_changes(self):
+        data_version = None
+        delay = self.poll_interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                # Cheap check first: data_version only changes when another connection commits
+                version = await self.db(TournamentEngine.data_version)
+                if version == data_version:
+                    continue
+                data_version = version
+
+                more = True
+                while more:
+                    self.last_change_id, messages, more = await self.db(read_changes, self.last_change_id)
+                    self.broadcast(messages)
+                delay = self.poll_interval
+            except Exception as e:
+                # e.g. the database is locked or briefly unreadable: keep following, a little slower each
+                # time. Clients miss nothing, reading resumes from last_change_id.
+                data_version = None
+                delay = min(max(delay * 2, 0.5), MAX_RETRY_DELAY)
+                print(f"Could not read the change log ({e!r}), retrying in {delay:g}s", file=sys.stderr)
+
+    def broadcast(self, messages):
+        if not messages:
+            return
+        for client in list(self.clients):
+            for topic, message in messages:
+                if client.wants(topic) and not client.send(message):
+                    self.drop(client)
+                    break
+
+    def drop(self, client):
+        # The browser reconnects with Last-Event-ID and catches up from the log
+        self.clients.discard(client)
+        client.task.cancel()
+
+    # ---------- Connections ----------
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEARTBEAT_INTERVAL)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+
+        lines = request.decode('latin-1').split("\r\n")
+        method, target = (lines[0].split(" ") + ["", ""])[:2]
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        url = urlparse(target)
+        query = parse_qs(url.query)
+        if method != 'GET' or url.path.rstrip('/') != '/changes':
+            await self.send_error(writer, "404 Not Found", "Use GET /changes")
+            return
+        try:
+            tournament_id = int(query['tournament'][0]) if 'tournament' in query else None
+            event_id = int(query['event'][0]) if 'event' in query else None
+            since = int(headers.get('last-event-id') or query.get('since', ['-1'])[0])
+        except ValueError:
+            await self.send_error(writer, "400 Bad Request", "tournament, event and since must be whole numbers")
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\n"
+                     b"Connection: keep-alive\r\n"
+                     b"Access-Control-Allow-Origin: *\r\n"
+                     b"\r\n"
+                     b"retry: 2000\n\n")
+
+        client = Client(writer, tournament_id, event_id)
+        # Everything after up_to reaches the client through its queue, everything up to it is replayed
+        up_to = self.last_change_id
+        self.clients.add(client)
+        try:
+            if since >= 0:
+                await self.replay(client, since, up_to)
+            await self.write_messages(client)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    async def replay(self, client, since, up_to):
+        if up_to - since > MAX_REPLAY:
+            client.writer.write(RESET_MESSAGE)
+            return
+        more = since < up_to
+        while more:
+            since, messages, more = await self.db(read_changes, since, up_to)
+            client.writer.writelines(message for topic, message in messages if client.wants(topic))
+            await client.writer.drain()
+
+    async def write_messages(self, client):
+        while True:
+            try:
+                message = await asyncio.wait_for(client.queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                message = KEEP_ALIVE_MESSAGE
+            # Send whatever else is already waiting with it in one go
+            messages = [message]
+            while not client.queue.empty():
+                messages.append(client.queue.get_nowait())
+            client.writer.writelines(messages)
+            await client.writer.drain()
+
+    async def send_error(self, writer, status, message):
+        body = json.dumps({'error': message}).encode('utf-8')
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+async def serve(db_path, host, port, poll_interval):
+    push_server = PushServer(db_path, poll_interval)
+    server = await push_server.start(host, port)
+    print(f"Pushing score changes on http://{host}:{port}/changes (Ctrl+C to stop)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await push_server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Push live score changes to displays as Server-Sent Events.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on (0.0.0.0 for every network)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--poll', type=float, default=POLL_INTERVAL, help="seconds between checks for new scores")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.poll))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,610 @@
+import time
+
+# Every statement the program runs against the tournament tables, by name.
+# Statements that differ per event type are named "<name>.Individual" / "<name>.Team-based".
+# They are always sent with the exact same text, so sqlite3's per-connection statement cache
+# prepares each of them once and reuses it afterwards.
+QUERIES = {
+    # ---------- Events ----------
+    'events_by_type': """
+        SELECT EventID, EventName FROM Events WHERE TournamentID = ? AND EventType = ?
+    """,
+    'event_by_id': """
+        SELECT EventID, EventName, EventType FROM Events WHERE TournamentID = ? AND EventID = ?
+    """,
+    'insert_event': """
+        INSERT INTO Events (TournamentID, EventName, EventType, PointsAllocated) VALUES (?, ?, ?, ?)
+    """,
+
+    # ---------- Tournaments ----------
+    'tournament_by_id': """
+        SELECT TournamentID, Name, MaxParticipants, MaxIndividuals, MaxTeams, MaxTeamMembers, RankingMethod
+        FROM Tournaments WHERE TournamentID = ?
+    """,
+    'all_tournaments': """
+        SELECT TournamentID, Name, RankingMethod FROM Tournaments ORDER BY TournamentID
+    """,
+    'insert_tournament': """
+        INSERT INTO Tournaments (Name, MaxParticipants, MaxIndividuals, MaxTeams, MaxTeamMembers, RankingMethod)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    'update_tournament_limits': """
+        UPDATE Tournaments
+        SET MaxParticipants = ?, MaxIndividuals = ?, MaxTeams = ?, MaxTeamMembers = ?
+        WHERE TournamentID = ?
+    """,
+    'update_tournament_ranking': """
+        UPDATE Tournaments SET RankingMethod = ? WHERE TournamentID = ?
+    """,
+
+    # ---------- Registration ----------
+    'participant_exists': """
+        SELECT COUNT(*) FROM Participants WHERE TournamentID = ? AND Name = ?
+    """,
+    'team_exists': """
+        SELECT COUNT(*) FROM Teams WHERE TournamentID = ? AND TeamName = ?
+    """,
+    # Running counts kept by the capacity triggers (migrations.add_capacity_checks)
+    'participant_count': """
+        SELECT ParticipantCount FROM Tournaments WHERE TournamentID = ?
+    """,
+    'individual_count': """
+        SELECT IndividualCount FROM Tournaments WHERE TournamentID = ?
+    """,
+    'team_count': """
+        SELECT TeamCount FROM Tournaments WHERE TournamentID = ?
+    """,
+    'all_participant_names': """
+        SELECT Name FROM Participants WHERE TournamentID = ?
+    """,
+    'all_team_names': """
+        SELECT TeamName FROM Teams WHERE TournamentID = ?
+    """,
+    'next_participant_id': """
+        SELECT COALESCE(MAX(ParticipantID), 0) + 1 FROM Participants
+    """,
+    'next_team_id': """
+        SELECT COALESCE(MAX(TeamID), 0) + 1 FROM Teams
+    """,
+    'insert_participant': """
+        INSERT INTO Participants (ParticipantID, TournamentID, Name, TeamID) VALUES (?, ?, ?, ?)
+    """,
+    'insert_team': """
+        INSERT INTO Teams (TeamID, TournamentID, TeamName) VALUES (?, ?, ?)
+    """,
+    'insert_registration': """
+        INSERT INTO EventParticipants (TournamentID, EventID, ParticipantID, TeamID, PointsEarned)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+
+    # ---------- Scoring ----------
+    'update_points.Individual': """
+        UPDATE EventParticipants
+        SET PointsEarned = ?
+        WHERE EventID = ?
+        AND ParticipantID = ?
+    """,
+    'update_points.Team-based': """
+        UPDATE EventParticipants
+        SET PointsEarned = ?
+        WHERE EventID = ?
+        AND TeamID = ?
+    """,
+    'event_entrant_ids.Individual': """
+        SELECT ParticipantID FROM EventParticipants WHERE EventID = ? AND ParticipantID IS NOT NULL
+    """,
+    'event_entrant_ids.Team-based': """
+        SELECT TeamID FROM EventParticipants WHERE EventID = ? AND TeamID IS NOT NULL
+    """,
+
+    # ---------- Standings ----------
+    'event_entrant_count.Individual': """
+        SELECT COUNT(*) FROM EventParticipants WHERE EventID = ? AND ParticipantID IS NOT NULL
+    """,
+    'event_entrant_count.Team-based': """
+        SELECT COUNT(*) FROM EventParticipants WHERE EventID = ? AND TeamID IS NOT NULL
+    """,
+    'entrant_names.Individual': """
+        SELECT ParticipantID, Name FROM Participants WHERE TournamentID = ? AND TeamID IS NULL
+    """,
+    'entrant_names.Team-based': """
+        SELECT TeamID, TeamName FROM Teams WHERE TournamentID = ?
+    """,
+    'metadata_versions': """
+        SELECT Name, Version FROM MetadataVersions
+    """,
+    # Changes whenever another connection commits to the database file
+    'data_version': """
+        PRAGMA data_version
+    """,
+    'scoreboard_count': """
+        SELECT COUNT(*) FROM Standings WHERE TournamentID = ?
+    """,
+
+    # ---------- Export ----------
+    # Whole-tournament reads for export.py, streamed from the cursor in chunks
+    'export_registrations': """
+        SELECT
+            ep.EventParticipantID,
+            ep.EventID,
+            e.EventName,
+            ep.ParticipantID,
+            ep.TeamID,
+            COALESCE(p.Name, t.TeamName),
+            ep.PointsEarned
+        FROM
+            EventParticipants ep
+        INNER JOIN
+            Events e ON e.EventID = ep.EventID
+        LEFT JOIN
+            Participants p ON p.ParticipantID = ep.ParticipantID
+        LEFT JOIN
+            Teams t ON t.TeamID = ep.TeamID
+        WHERE
+            ep.TournamentID = ?
+        ORDER BY
+            ep.EventParticipantID
+    """,
+
+    # ---------- Live changes ----------
+    'last_change_id': """
+        SELECT COALESCE(MAX(ChangeID), 0) FROM ScoreChanges
+    """,
+    'changes_since': """
+        SELECT
+            sc.ChangeID,
+            sc.TournamentID,
+            sc.ChangeType,
+            sc.EventParticipantID,
+            sc.EventID,
+            e.EventType,
+            COALESCE(sc.ParticipantID, sc.TeamID),
+            sc.PointsEarned
+        FROM
+            ScoreChanges sc
+        LEFT JOIN
+            Events e ON e.EventID = sc.EventID
+        WHERE
+            sc.ChangeID > ?
+        ORDER BY
+            sc.ChangeID
+        LIMIT ?
+    """,
+    # Rank of one registration in its event's leaderboard, the same rank event_scores.* gives it.
+    # No row at all if the registration no longer exists.
+    'event_rank.shared': """
+        SELECT COUNT(ep.EventParticipantID) + 1
+        FROM EventParticipants me
+        LEFT JOIN EventParticipants ep
+            ON ep.EventID = me.EventID AND ep.PointsEarned > me.PointsEarned
+        WHERE me.EventParticipantID = ?
+        GROUP BY me.EventParticipantID
+    """,
+    'event_rank.dense': """
+        SELECT COUNT(DISTINCT ep.PointsEarned) + 1
+        FROM EventParticipants me
+        LEFT JOIN EventParticipants ep
+            ON ep.EventID = me.EventID AND ep.PointsEarned > me.PointsEarned
+        WHERE me.EventParticipantID = ?
+        GROUP BY me.EventParticipantID
+    """,
+    'event_rank.registration': """
+        SELECT COUNT(ep.EventParticipantID) + 1
+        FROM EventParticipants me
+        LEFT JOIN EventParticipants ep
+            ON ep.EventID = me.EventID
+            AND (ep.PointsEarned > me.PointsEarned
+                 OR (ep.PointsEarned = me.PointsEarned AND ep.EventParticipantID < me.EventParticipantID))
+        WHERE me.EventParticipantID = ?
+        GROUP BY me.EventParticipantID
+    """,
+
+    # ---------- Brackets ----------
+    # Knockout and Swiss events for brackets.py
+    'bracket_by_event': """
+        SELECT Format, Rounds FROM Brackets WHERE EventID = ? AND TournamentID = ?
+    """,
+    'insert_bracket': """
+        INSERT INTO Brackets (EventID, TournamentID, Format, Rounds) VALUES (?, ?, ?, ?)
+    """,
+    'delete_bracket': """
+        DELETE FROM Brackets WHERE EventID = ?
+    """,
+    'delete_event_matches': """
+        DELETE FROM Matches WHERE EventID = ?
+    """,
+    # Match ids are chosen before inserting so that WinnerTo and LoserTo can be filled in at once
+    'next_match_id': """
+        SELECT COALESCE(MAX(MatchID), 0) + 1 FROM Matches
+    """,
+    'insert_match': """
+        INSERT INTO Matches (MatchID, TournamentID, EventID, Bracket, Round, Position, RegistrationA, RegistrationB,
+                             WinnerRegistration, Status, WinnerTo, WinnerSlot, LoserTo, LoserSlot)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    'match_by_id': """
+        SELECT EventID, Bracket, RegistrationA, RegistrationB, Status, WinnerTo, WinnerSlot, LoserTo, LoserSlot
+        FROM Matches
+        WHERE MatchID = ? AND TournamentID = ?
+    """,
+    'set_match_result': """
+        UPDATE Matches
+        SET ScoreA = ?, ScoreB = ?, WinnerRegistration = ?, LoserRegistration = ?, Status = 'done',
+            DecidedAt = (julianday('now') - 2440587.5) * 86400.0
+        WHERE MatchID = ?
+    """,
+    # Moves an entrant into the next match, which can be played once both slots are filled
+    'fill_match_slot.A': """
+        UPDATE Matches
+        SET RegistrationA = ?, Status = CASE WHEN RegistrationB IS NULL THEN 'waiting' ELSE 'ready' END
+        WHERE MatchID = ?
+    """,
+    'fill_match_slot.B': """
+        UPDATE Matches
+        SET RegistrationB = ?, Status = CASE WHEN RegistrationA IS NULL THEN 'waiting' ELSE 'ready' END
+        WHERE MatchID = ?
+    """,
+    'insert_round': """
+        INSERT INTO Rounds (EventID, Round, TournamentID, Matches, Rematches) VALUES (?, ?, ?, ?, ?)
+    """,
+    'delete_event_rounds': """
+        DELETE FROM Rounds WHERE EventID = ?
+    """,
+    'event_rounds': """
+        SELECT Round, PairedAt, Matches, Rematches FROM Rounds WHERE EventID = ? ORDER BY Round
+    """,
+    'event_matches': """
+        SELECT MatchID, Bracket, Round, Position, RegistrationA, RegistrationB, ScoreA, ScoreB,
+               WinnerRegistration, Status
+        FROM Matches
+        WHERE EventID = ?
+        ORDER BY Bracket DESC, Round, Position
+    """,
+    'unfinished_match_count': """
+        SELECT COUNT(*) FROM Matches WHERE EventID = ? AND Status IN ('waiting', 'ready')
+    """,
+    'last_round': """
+        SELECT COALESCE(MAX(Round), 0) FROM Rounds WHERE EventID = ?
+    """,
+    # Seeding orders; equal points are seeded in registration order
+    'event_seeding.points': """
+        SELECT EventParticipantID FROM EventParticipants WHERE EventID = ? ORDER BY PointsEarned DESC, EventParticipantID
+    """,
+    'event_seeding.registration': """
+        SELECT EventParticipantID FROM EventParticipants WHERE EventID = ? ORDER BY EventParticipantID
+    """,
+    'event_registrations': """
+        SELECT EventParticipantID, COALESCE(ParticipantID, TeamID) FROM EventParticipants WHERE EventID = ?
+    """,
+    'reset_event_points': """
+        UPDATE EventParticipants SET PointsEarned = 0 WHERE EventID = ?
+    """,
+    # Half-wins of one registration: a win is 2, a draw or a win in the losers bracket 1.
+    # A bye counts as a win in Swiss and round-robin rounds, not in knockout brackets.
+    'registration_half_wins': """
+        SELECT COALESCE(SUM(CASE
+            WHEN WinnerRegistration = ?1 AND (Status = 'done' OR Bracket IN ('swiss', 'round_robin'))
+                THEN CASE WHEN Bracket = 'losers' THEN 1 ELSE 2 END
+            WHEN Status = 'done' AND WinnerRegistration IS NULL THEN 1
+            ELSE 0
+        END), 0)
+        FROM Matches
+        WHERE RegistrationA = ?1 OR RegistrationB = ?1
+    """,
+    'set_registration_points': """
+        UPDATE EventParticipants SET PointsEarned = ? WHERE EventParticipantID = ?
+    """,
+    'event_points_allocated': """
+        SELECT PointsAllocated FROM Events WHERE EventID = ?
+    """,
+
+    # ---------- Schedule ----------
+    # Who is in which event, for the conflict graph of schedule.py. Reads only the tournament's events,
+    # all from the covering idx_ep_event_points.
+    'schedule_registrations': """
+        SELECT e.EventID, ep.ParticipantID, ep.TeamID
+        FROM Events e
+        LEFT JOIN EventParticipants ep ON ep.EventID = e.EventID
+        WHERE e.TournamentID = ?
+    """,
+    'delete_schedule': """
+        DELETE FROM EventSchedule WHERE TournamentID = ?
+    """,
+    'insert_schedule': """
+        INSERT INTO EventSchedule (EventID, TournamentID, Slot, StartsAt, Venue) VALUES (?, ?, ?, ?, ?)
+    """,
+    # Also the timetable dataset of export.py
+    'export_timetable': """
+        SELECT
+            s.Slot,
+            strftime('%Y-%m-%d %H:%M', s.StartsAt, 'unixepoch', 'localtime'),
+            s.Venue,
+            e.EventID,
+            e.EventName,
+            e.EventType,
+            (SELECT COUNT(*) FROM EventParticipants ep WHERE ep.EventID = e.EventID)
+        FROM
+            EventSchedule s
+        INNER JOIN
+            Events e ON e.EventID = s.EventID
+        WHERE
+            s.TournamentID = ?
+        ORDER BY
+            s.Slot, s.Venue
+    """,
+
+    # ---------- History ----------
+    # Snapshots and log replay for history.py
+    'insert_snapshot': """
+        INSERT INTO StandingsSnapshots (TournamentID, LastChangeID)
+        SELECT ?, COALESCE(MAX(ChangeID), 0) FROM ScoreChanges
+    """,
+    'copy_snapshot_registrations': """
+        INSERT INTO SnapshotRegistrations (SnapshotID, EventParticipantID, EventID, ParticipantID, TeamID, PointsEarned)
+        SELECT ?, EventParticipantID, EventID, ParticipantID, TeamID, PointsEarned
+        FROM EventParticipants
+        WHERE TournamentID = ?
+    """,
+    'latest_snapshot': """
+        SELECT SnapshotID, TakenAt, LastChangeID
+        FROM StandingsSnapshots
+        WHERE TournamentID = ?
+        ORDER BY TakenAt DESC
+        LIMIT 1
+    """,
+    'snapshot_at': """
+        SELECT SnapshotID, TakenAt, LastChangeID
+        FROM StandingsSnapshots
+        WHERE TournamentID = ? AND TakenAt <= ?
+        ORDER BY TakenAt DESC
+        LIMIT 1
+    """,
+    'first_snapshot_time': """
+        SELECT MIN(TakenAt) FROM StandingsSnapshots WHERE TournamentID = ?
+    """,
+    'snapshot_registrations': """
+        SELECT EventParticipantID, EventID, ParticipantID, TeamID, PointsEarned
+        FROM SnapshotRegistrations
+        WHERE SnapshotID = ?
+    """,
+    'changes_after_snapshot': """
+        SELECT ChangeType, EventParticipantID, EventID, ParticipantID, TeamID, PointsEarned
+        FROM ScoreChanges
+        WHERE TournamentID = ? AND ChangeID > ? AND ChangedAt <= ?
+        ORDER BY ChangeID
+    """,
+    # Decided matches of an event at a time, for head-to-head ranks (HEAD_TO_HEAD_WINS does it live)
+    'match_results_at': """
+        SELECT WinnerRegistration, LoserRegistration
+        FROM Matches
+        WHERE EventID = ? AND Status = 'done' AND LoserRegistration IS NOT NULL
+          AND (DecidedAt IS NULL OR DecidedAt <= ?)
+    """,
+    'change_count_since': """
+        SELECT COUNT(*) FROM ScoreChanges WHERE TournamentID = ? AND ChangeID > ?
+    """,
+    'entrant_history.Individual': """
+        SELECT ChangeID, ChangedAt, ChangeType, PointsEarned
+        FROM ScoreChanges
+        WHERE EventID = ? AND ParticipantID = ?
+        ORDER BY ChangeID
+    """,
+    'entrant_history.Team-based': """
+        SELECT ChangeID, ChangedAt, ChangeType, PointsEarned
+        FROM ScoreChanges
+        WHERE EventID = ? AND TeamID = ?
+        ORDER BY ChangeID
+    """,
+}
+
+# How entrants with equal points are ranked, chosen per tournament (Tournaments.RankingMethod):
+#   shared        they share a rank and the ranks after them are skipped (1, 1, 3)
+#   dense         they share a rank and no rank is skipped (1, 1, 2)
+#   registration  whoever registered first ranks higher (1, 2, 3)
+#   head_to_head  in an event, whoever won more bracket matches (brackets.py) against the entrants
+#                 they are tied with ranks higher; otherwise they share a rank. Overall standings
+#                 have no head-to-head, so there it is the same as shared.
+# Each maps to (window function, the ORDER BY it ranks by).
+RANKING_METHODS = {
+    'shared': ('RANK()', "{points} DESC"),
+    'dense': ('DENSE_RANK()', "{points} DESC"),
+    'registration': ('ROW_NUMBER()', "{points} DESC, {registration}"),
+    'head_to_head': ('RANK()', "{points} DESC{head_to_head}"),
+}
+DEFAULT_RANKING_METHOD = 'shared'
+
+# Matches a registration won against registrations that have as many points as it has
+HEAD_TO_HEAD_WINS = """(
+            SELECT COUNT(*)
+            FROM Matches m
+            INNER JOIN EventParticipants beaten ON beaten.EventParticipantID = m.LoserRegistration
+            WHERE m.WinnerRegistration = {table}.EventParticipantID
+              AND m.Status = 'done'
+              AND beaten.PointsEarned = {table}.PointsEarned
+        )"""
+
+# Statements that return ranked rows, with {rank} for the rank column and {order} for their ORDER BY.
+# Each becomes one "<name>.<ranking method>" statement in QUERIES. Listed as
+# (points column, registration order column, registration table for head-to-head or None, SQL).
+# The window and the ORDER BY both follow the points index (idx_ep_event_points or idx_standings_points),
+# so ranks are computed while reading the index and a page stops after LIMIT rows, without sorting.
+# Equal points come out in index order, which is registration order. (head_to_head has to sort.)
+RANKED_QUERIES = {
+    # Every column comes from idx_ep_event_points. Names are added from metadata_cache instead of a join.
+    'event_scores.Individual': ('PointsEarned', 'EventParticipantID', 'EventParticipants', """
+        SELECT {rank}, ParticipantID, PointsEarned
+        FROM EventParticipants
+        WHERE EventID = ? AND ParticipantID IS NOT NULL
+        ORDER BY {order}
+        LIMIT ? OFFSET ?
+    """),
+    'event_scores.Team-based': ('PointsEarned', 'EventParticipantID', 'EventParticipants', """
+        SELECT {rank}, TeamID, PointsEarned
+        FROM EventParticipants
+        WHERE EventID = ? AND TeamID IS NOT NULL
+        ORDER BY {order}
+        LIMIT ? OFFSET ?
+    """),
+    # Standings rows are added as entrants register, so their rowid is the registration order
+    'scoreboard': ('TotalPoints', 'rowid', None, """
+        SELECT {rank}, EntrantType, Name, TotalPoints
+        FROM Standings
+        WHERE TournamentID = ?
+        ORDER BY {order}
+        LIMIT ? OFFSET ?
+    """),
+    # One event at a time, so the rows come straight out of idx_ep_event_points
+    'export_event_leaderboard': ('ep.PointsEarned', 'ep.EventParticipantID', 'ep', """
+        SELECT
+            {rank},
+            COALESCE(ep.ParticipantID, ep.TeamID),
+            COALESCE(p.Name, t.TeamName),
+            ep.PointsEarned
+        FROM
+            EventParticipants ep
+        LEFT JOIN
+            Participants p ON p.ParticipantID = ep.ParticipantID
+        LEFT JOIN
+            Teams t ON t.TeamID = ep.TeamID
+        WHERE
+            ep.EventID = ?
+        ORDER BY
+            {order}
+    """),
+    'export_standings': ('TotalPoints', 'rowid', None, """
+        SELECT
+            {rank},
+            EntrantType,
+            EntrantID,
+            Name,
+            TotalPoints
+        FROM Standings
+        WHERE TournamentID = ?
+        ORDER BY {order}
+    """),
+}
+
+
+def ranked_sql(sql, points, registration, table, ranking_method):
+    function, order = RANKING_METHODS[ranking_method]
+    head_to_head = f", {HEAD_TO_HEAD_WINS.format(table=table)} DESC" if table else ""
+    order = order.format(points=points, registration=registration, head_to_head=head_to_head)
+    return sql.format(rank=f"{function} OVER (ORDER BY {order})", order=order)
+
+
+QUERIES.update({f"{name}.{method}": ranked_sql(sql, points, registration, table, method)
+                for name, (points, registration, table, sql) in RANKED_QUERIES.items()
+                for method in RANKING_METHODS})
+
+# event_rank.* for head_to_head. It ranks the whole event, as head-to-head wins can't be counted
+# for one registration alone.
+QUERIES['event_rank.head_to_head'] = f"""
+        SELECT Rank
+        FROM (
+            SELECT EventParticipantID, RANK() OVER (ORDER BY PointsEarned DESC, {HEAD_TO_HEAD_WINS.format(table='ep')} DESC) AS Rank
+            FROM EventParticipants ep
+            WHERE EventID = (SELECT EventID FROM EventParticipants WHERE EventParticipantID = ?1)
+        )
+        WHERE EventParticipantID = ?1
+    """
+
+EVENT_TYPES = ('Individual', 'Team-based')
+
+
+def typed_name(name, event_type):
+    # Name of the per-event-type variant of a statement
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type: {event_type}")
+    return f"{name}.{event_type}"
+
+
+def ranked_name(name, ranking_method):
+    # Name of the variant of a statement that ranks ties with ranking_method
+    if ranking_method not in RANKING_METHODS:
+        raise ValueError(f"Unknown ranking method: {ranking_method}")
+    return f"{name}.{ranking_method}"
+
+
+class QueryStats:
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, elapsed, rows):
+        self.calls += 1
+        self.rows += max(rows, 0)
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+
+class QueryRegistry:
+    # Runs the named statements of QUERIES on one connection and keeps timing counters per statement.
+    # If observer is set (see profiler.py) it is called as observer(name, sql, params, seconds, rows)
+    # after every statement.
+    def __init__(self, conn, queries=QUERIES):
+        self.conn = conn
+        self.queries = queries
+        self.stats = {name: QueryStats() for name in queries}
+        self.observer = None
+
+    def sql(self, name):
+        return self.queries[name]
+
+    def record(self, name, sql, params, elapsed, rows):
+        self.stats[name].add(elapsed, rows)
+        if self.observer is not None:
+            self.observer(name, sql, params, elapsed, rows)
+
+    def execute(self, name, params=()):
+        sql = self.queries[name]
+        start = time.perf_counter()
+        cursor = self.conn.execute(sql, params)
+        self.record(name, sql, params, time.perf_counter() - start, cursor.rowcount)
+        return cursor
+
+    def executemany(self, name, seq_of_params):
+        sql = self.queries[name]
+        start = time.perf_counter()
+        cursor = self.conn.executemany(sql, seq_of_params)
+        self.record(name, sql, None, time.perf_counter() - start, cursor.rowcount)
+        return cursor
+
+    def fetchall(self, name, params=()):
+        # Timed including the fetch, which is where SQLite does most of the work for a SELECT
+        sql = self.queries[name]
+        start = time.perf_counter()
+        rows = self.conn.execute(sql, params).fetchall()
+        self.record(name, sql, params, time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchone(self, name, params=()):
+        sql = self.queries[name]
+        start = time.perf_counter()
+        row = self.conn.execute(sql, params).fetchone()
+        self.record(name, sql, params, time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def scalar(self, name, params=()):
+        row = self.fetchone(name, params)
+        return None if row is None else row[0]
+
+    def report(self):
+        # (name, calls, rows, total ms, mean ms, max ms) for every statement used, slowest total first
+        lines = []
+        for name, stats in self.stats.items():
+            if stats.calls:
+                lines.append((name, stats.calls, stats.rows, stats.total_time * 1000,
+                              stats.total_time * 1000 / stats.calls, stats.max_time * 1000))
+        lines.sort(key=lambda line: line[3], reverse=True)
+        return lines
+
+    def format_report(self):
+        lines = [f"{'query':<32} {'calls':>7} {'rows':>9} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+        for name, calls, rows, total_ms, mean_ms, max_ms in self.report():
+            lines.append(f"{name:<32} {calls:>7} {rows:>9} {total_ms:>10.2f} {mean_ms:>9.3f} {max_ms:>9.3f}")
+        return "\n".join(lines)
+
+    def reset_stats(self):
+        self.stats = {name: QueryStats() for name in self.queries}
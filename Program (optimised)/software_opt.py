@@ -1,22 +1,26 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-from tkinter import simpledialog
-import sqlite3
+from tkinter import simpledialog, filedialog
+
+from db_worker import DBWorker
+from leaderboard_view import LeaderboardView
+from tournament_engine import TournamentEngine, RegistrationError, parse_score_lines, DEFAULT_TOURNAMENT_ID
 
 class RegistrationApp:
-    def __init__(self, master):
+    def __init__(self, master, tournament_id=DEFAULT_TOURNAMENT_ID):
         self.master = master
         self.master.title("App")
         self.master.geometry("300x150")
         self.master.resizable(False, False)
 
-        self.conn = sqlite3.connect('Extras/tournament_management.db')
-        self.cursor = self.conn.cursor()
+        self.engine = TournamentEngine('Extras/tournament_management.db', tournament_id=tournament_id)
+        # Reads run on a background thread so the windows never freeze while loading data
+        self.worker = DBWorker(self.master, 'Extras/tournament_management.db', tournament_id=tournament_id)
         print("Connection to database established")
 
         self.participant_count = 0
         self.team_count = 0
-        self.max_participants = 40
+        self.max_participants = self.engine.max_participants
 
         self.create_widgets()
 
@@ -68,12 +72,31 @@ class RegistrationApp:
 
     def confirm_exit(self):
         if messagebox.askyesno("Confirmation", "Are you sure you want to exit?"):
+            self.worker.close()
+            self.engine.close()
             self.master.destroy()
 
-    def load_events(self, registration_type):
-        self.cursor.execute("SELECT EventID, EventName FROM Events WHERE EventType=?", (registration_type,))
-        events = {str(row[0]): row[1] for row in self.cursor.fetchall()}
-        return events
+    def load_event_checkboxes(self, events_frame, registration_type):
+        # Fills events_frame with one checkbox per event once the events have been read
+        self.selected_events = []
+        # The newest window's checkboxes; filled in by this window's load only
+        checkboxes = self.event_checkboxes = {}
+        loading_label = tk.Label(events_frame, text="Loading events...")
+        loading_label.pack()
+
+        def show_events(events):
+            if not events_frame.winfo_exists():
+                return
+            loading_label.destroy()
+            self.predefined_events = {str(event_id): event_name for event_id, event_name in events}
+            for event_id, event_name in self.predefined_events.items():
+                var = tk.BooleanVar()
+                checkbox = tk.Checkbutton(events_frame, text=event_name, variable=var)
+                checkbox.pack(anchor=tk.W)
+                checkboxes[event_id] = (var, event_name)
+
+        # Keyed by the frame, so opening another registration window doesn't cancel this one's load
+        self.worker.submit(lambda engine: engine.load_events(registration_type), show_events, key=events_frame)
 
     def register_individual(self):
         if self.participant_count < self.max_participants:
@@ -82,8 +105,6 @@ class RegistrationApp:
             individual_registration_window.geometry("250x350")
             individual_registration_window.resizable(False, False)
 
-            self.predefined_events = self.load_events("Individual")
-
             label_info = tk.Label(individual_registration_window, text="Enter participant nickname:")
             label_info.pack()
 
@@ -93,13 +114,9 @@ class RegistrationApp:
             label_events_info = tk.Label(individual_registration_window, text="Select events:")
             label_events_info.pack()
 
-            self.selected_events = []
-            self.event_checkboxes = {}
-            for event_id, event_name in self.predefined_events.items():
-                var = tk.BooleanVar()
-                checkbox = tk.Checkbutton(individual_registration_window, text=event_name, variable=var)
-                checkbox.pack(anchor=tk.W)
-                self.event_checkboxes[event_id] = (var, event_name)
+            events_frame = tk.Frame(individual_registration_window)
+            events_frame.pack(fill=tk.X)
+            self.load_event_checkboxes(events_frame, "Individual")
 
             submit_button = tk.Button(individual_registration_window, text="Submit", command=self.submit_individual)
             submit_button.pack()
@@ -115,42 +132,15 @@ class RegistrationApp:
             messagebox.showinfo("Registration Limit", "Maximum participant limit reached.")
 
     def submit_individual(self):
-        info = self.entry_info.get().strip()
-        if not info:
-            messagebox.showerror("Error", "Please fill in the participant nickname.")
-            return
-
-        self.cursor.execute("SELECT COUNT(*) FROM Participants WHERE Name=?", (info,))
-        participant_count = self.cursor.fetchone()[0]
-        if participant_count > 0:
-            messagebox.showerror("Error", "Participant nickname already exists. Please choose a different one.")
-            return
-
-        # Check if at least one event is selected
-        if not any(var.get() for var, _ in self.event_checkboxes.values()):
-            messagebox.showerror("Error", "Please select at least one event.")
-            return
+        info = self.entry_info.get()
+        event_ids = [event_id for event_id, (var, _) in self.event_checkboxes.items() if var.get()]
 
-        # Check if the maximum number of individual participants has been reached
-        self.cursor.execute("SELECT COUNT(*) FROM Participants WHERE TeamID IS NULL")
-        individual_participant_count = self.cursor.fetchone()[0]
-        if individual_participant_count >= 20:
-            messagebox.showerror("Error", "Maximum individual participant limit reached.")
+        try:
+            self.engine.register_individual(info, event_ids)
+        except RegistrationError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        # Insert the participant into the Participants table
-        self.cursor.execute("INSERT INTO Participants (Name) VALUES (?)", (info,))
-        participant_id = self.cursor.lastrowid
-
-        for event_id, (var, event_name) in self.event_checkboxes.items():
-            if var.get():
-                # Register the participant for each selected event in the EventParticipants table
-                self.cursor.execute(
-                    "INSERT INTO EventParticipants (EventID, ParticipantID, TeamID, PointsEarned) VALUES (?, ?, ?, ?)",
-                    (event_id, participant_id, None, 0))
-
-        self.conn.commit()
-
         messagebox.showinfo("Registration Successful", "Participant successfully registered for selected events.")
 
         # Clear the selected events list
@@ -167,8 +157,6 @@ class RegistrationApp:
         team_registration_window.geometry("350x500")
         team_registration_window.resizable(False, False)
 
-        self.predefined_events = self.load_events("Team-based")
-
         label_team_name = tk.Label(team_registration_window, text="Enter desired team name:")
         label_team_name.pack()
 
@@ -195,13 +183,9 @@ class RegistrationApp:
         label_events_info = tk.Label(team_registration_window, text="Select events:")
         label_events_info.pack()
 
-        self.selected_events = []
-        self.event_checkboxes = {}
-        for event_id, event_name in self.predefined_events.items():
-            var = tk.BooleanVar()
-            checkbox = tk.Checkbutton(team_registration_window, text=event_name, variable=var)
-            checkbox.pack(anchor=tk.W)
-            self.event_checkboxes[event_id] = (var, event_name)
+        events_frame = tk.Frame(team_registration_window)
+        events_frame.pack(fill=tk.X)
+        self.load_event_checkboxes(events_frame, "Team-based")
 
         submit_button = tk.Button(team_registration_window, text="Submit", command=self.submit_team)
         submit_button.pack()
@@ -215,54 +199,16 @@ class RegistrationApp:
                                       is_first_window=False)
 
     def submit_team(self):
-        team_name = self.entry_team_name.get().strip()
-        if not team_name:
-            messagebox.showerror("Error", "Please fill in the team name.")
-            return
-
-        self.cursor.execute("SELECT COUNT(*) FROM Teams WHERE TeamName=?", (team_name,))
-        participant_count = self.cursor.fetchone()[0]
-        if participant_count > 0:
-            messagebox.showerror("Error", "Team name already exists. Please choose a different one.")
-            return
-
-        # Check if at least one member name is provided
-        if not any(entry_member.get().strip() for entry_member in self.team_members):
-            messagebox.showerror("Error", "Please fill in at least one member name.")
+        team_name = self.entry_team_name.get()
+        member_names = [entry_member.get() for entry_member in self.team_members]
+        event_ids = [event_id for event_id, (var, _) in self.event_checkboxes.items() if var.get()]
+
+        try:
+            self.engine.register_team(team_name, member_names, event_ids)
+        except RegistrationError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        # Check if at least one event is selected
-        if not any(var.get() for var, _ in self.event_checkboxes.values()):
-            messagebox.showerror("Error", "Please select at least one event.")
-            return
-
-        # Check if the maximum number of teams has been reached
-        self.cursor.execute("SELECT COUNT(*) FROM Teams")
-        team_count = self.cursor.fetchone()[0]
-        if team_count >= 4:
-            messagebox.showerror("Error", "Maximum team limit reached.")
-            return
-
-        # Insert the team into the Teams table
-        self.cursor.execute("INSERT INTO Teams (TeamName) VALUES (?)", (team_name,))
-        team_id = self.cursor.lastrowid
-
-        # Insert team members into the Participants table
-        for entry_member in self.team_members:
-            member_name = entry_member.get().strip()
-            if member_name:
-                self.cursor.execute("INSERT INTO Participants (Name, TeamID) VALUES (?, ?)", (member_name, team_id))
-
-        # Insert the team into the EventParticipants table for each selected event
-        for event_id, (var, _) in self.event_checkboxes.items():
-            if var.get():
-                self.cursor.execute(
-                    "INSERT INTO EventParticipants (EventID, TeamID, PointsEarned) VALUES (?, ?, ?)",
-                    (event_id, team_id, 0)
-                )
-
-        self.conn.commit()
-
         # Inform the user about successful team registration
         messagebox.showinfo("Registration Successful", "Team successfully registered.")
 
@@ -298,124 +244,66 @@ class RegistrationApp:
             outer_notebook.add(team_tab, text="Team Events")
             outer_notebook.add(scoreboard_tab, text="Tournament Scoreboard")
 
+            # Event tabs are only filled in the first time they are shown, so the window opens
+            # straight away no matter how many events there are
+            event_tabs = {}  # tab widget name -> (frame, event_id, event_type)
+            loaded_tabs = {}  # tab widget name -> treeview
+
             individual_notebook = ttk.Notebook(individual_tab)
             individual_notebook.pack(fill=tk.BOTH, expand=True)
 
-            # Retrieve individual events from the database
-            self.cursor.execute("SELECT EventID, EventName FROM Events WHERE EventType='Individual'")
-            individual_events = self.cursor.fetchall()
-
-            # Create tabs for individual events
-            for event in individual_events:
-                event_id, event_name = event
-                individual_event_tab = tk.Frame(individual_notebook)
-                individual_notebook.add(individual_event_tab, text=event_name)
-
-                # Create a treeview widget for displaying participants and their points
-                tree = ttk.Treeview(individual_event_tab, columns=("Rank", "ID", "Participant", "Points"),
-                                    show="headings",
-                                    style="Treeview")
-                tree.heading("Rank", text="Rank")
-                tree.heading("ID", text="ID")
-                tree.heading("Participant", text="Participant")
-                tree.heading("Points", text="Points")
-                tree.pack(fill=tk.BOTH, expand=True)
-
-                # Retrieve participants and their points for the current event from the database
-                self.cursor.execute("""
-                    SELECT 
-                        ep.ParticipantID, 
-                        COALESCE(p.Name, t.TeamName) AS Name, 
-                        ep.PointsEarned
-                    FROM 
-                        EventParticipants ep
-                    LEFT JOIN 
-                        Participants p ON p.ParticipantID = ep.ParticipantID
-                    LEFT JOIN 
-                        Teams t ON t.TeamID = ep.TeamID
-                    WHERE 
-                        ep.EventID = ?
-                    ORDER BY 
-                        ep.PointsEarned DESC
-                """, (event_id,))
-                participants = self.cursor.fetchall()
-
-                # Insert participants and their points into the treeview
-                for rank, participant in enumerate(participants, start=1):
-                    tree.insert("", "end", values=(rank, participant[0], participant[1], participant[2]),
-                                tags=('centered',))
-
-                # Center the text in all columns
-                for col in tree["columns"]:
-                    tree.heading(col, anchor="center")
-                    tree.column(col, anchor="center")
-
-                # Bind the edit_points method to the treeview for individual events
-                tree.bind('<Double-1>',
-                          lambda event, tree=tree, event_id=event_id, event_type='Individual': self.edit_points(event,
-                                                                                                                tree,
-                                                                                                                event_id,
-                                                                                                                event_type))
-
             # Create a notebook for team events
             team_notebook = ttk.Notebook(team_tab)
             team_notebook.pack(fill=tk.BOTH, expand=True)
 
-            # Retrieve team events from the database
-            self.cursor.execute("SELECT EventID, EventName FROM Events WHERE EventType='Team-based'")
-            team_events = self.cursor.fetchall()
-
-            # Create tabs for team events
-            for event in team_events:
-                event_id, event_name = event
-                team_event_tab = tk.Frame(team_notebook)
-                team_notebook.add(team_event_tab, text=event_name)
-
-                # Create a treeview widget for displaying teams and their points
-                tree = ttk.Treeview(team_event_tab, columns=("Rank", "ID", "Team", "Points"), show="headings",
-                                    style="Treeview")
-                tree.heading("Rank", text="Rank")
-                tree.heading("ID", text="ID")
-                tree.heading("Team", text="Team")
-                tree.heading("Points", text="Points")
-                tree.pack(fill=tk.BOTH, expand=True)
-
-                # Retrieve teams and their points for the current event from the database
-                self.cursor.execute("""
-                            SELECT 
-                                ep.TeamID, 
-                                t.TeamName, 
-                                SUM(ep.PointsEarned) AS TotalPoints
-                            FROM 
-                                Teams t
-                            INNER JOIN 
-                                EventParticipants ep ON t.TeamID = ep.TeamID
-                            WHERE 
-                                ep.EventID = ?
-                            GROUP BY 
-                                ep.TeamID, t.TeamName
-                            ORDER BY 
-                                TotalPoints DESC
-                        """, (event_id,))
-                teams = self.cursor.fetchall()
-
-                # Insert teams and their points into the treeview
-                for rank, team in enumerate(teams, start=1):
-                    tree.insert("", "end", values=(rank, team[0], team[1], team[2]), tags=('centered',))
-
-                # Center the text in all columns
-                for col in tree["columns"]:
-                    tree.heading(col, anchor="center")
-                    tree.column(col, anchor="center")
-
-                # Bind the edit_points method to the treeview for team events
-                tree.bind('<Double-1>',
-                          lambda event, tree=tree, event_id=event_id, event_type='Team-based': self.edit_points(event,
-                                                                                                                tree,
-                                                                                                                event_id,
-                                                                                                                event_type))
-
-            self.populate_scoreboard_tab(scoreboard_tab)
+            loading_label = tk.Label(individual_tab, text="Loading events...")
+            loading_label.place(relx=0.5, rely=0.5, anchor="center")
+
+            def load_selected_tab(notebook):
+                selected = notebook.select()
+                if not selected or selected in loaded_tabs:
+                    return
+                frame, event_id, event_type = event_tabs[selected]
+                loaded_tabs[selected] = self.build_event_tab(frame, event_id, event_type)
+
+            def on_outer_tab_changed(event):
+                selected = outer_notebook.select()
+                if selected == str(individual_tab):
+                    load_selected_tab(individual_notebook)
+                elif selected == str(team_tab):
+                    load_selected_tab(team_notebook)
+                elif selected == str(scoreboard_tab):
+                    # One indexed read of the Standings table, so it is simply reloaded every time it is shown
+                    self.populate_scoreboard_tab(scoreboard_tab)
+
+            individual_notebook.bind('<<NotebookTabChanged>>', lambda event: load_selected_tab(individual_notebook))
+            team_notebook.bind('<<NotebookTabChanged>>', lambda event: load_selected_tab(team_notebook))
+            outer_notebook.bind('<<NotebookTabChanged>>', on_outer_tab_changed)
+
+            def add_event_tabs(events):
+                if not tournament_handling_window.winfo_exists():
+                    return
+                loading_label.destroy()
+                individual_events, team_events = events
+
+                # Create (empty) tabs for individual events
+                for event_id, event_name in individual_events:
+                    individual_event_tab = tk.Frame(individual_notebook)
+                    individual_notebook.add(individual_event_tab, text=event_name)
+                    event_tabs[str(individual_event_tab)] = (individual_event_tab, event_id, 'Individual')
+
+                # Create (empty) tabs for team events
+                for event_id, event_name in team_events:
+                    team_event_tab = tk.Frame(team_notebook)
+                    team_notebook.add(team_event_tab, text=event_name)
+                    event_tabs[str(team_event_tab)] = (team_event_tab, event_id, 'Team-based')
+
+                # Fill the tab that is visible right now
+                on_outer_tab_changed(None)
+
+            # Retrieve individual and team events from the database
+            self.worker.submit(lambda engine: (engine.load_events('Individual'), engine.load_events('Team-based')),
+                               add_event_tabs)
 
             # Add Exit and Help buttons
             self.create_exit_help_buttons(tournament_handling_window,
@@ -425,44 +313,55 @@ class RegistrationApp:
             # Apply custom style to center text in all cells
             tournament_handling_window.mainloop()
 
+    def build_event_tab(self, event_tab, event_id, event_type):
+        entrant_column = "Participant" if event_type == 'Individual' else "Team"
+
+        # Create a leaderboard for displaying participants/teams and their points.
+        # It only fetches and shows the rows that fit on screen, so big events stay fast.
+        view = LeaderboardView(event_tab, ("Rank", "ID", entrant_column, "Points"),
+                               lambda engine: engine.event_entrant_count(event_id, event_type),
+                               lambda engine, offset, limit: engine.event_leaderboard(event_id, event_type, offset, limit),
+                               self.worker, ranking_method=self.engine.ranking_method)
+
+        # Button for typing/pasting a whole event's results at once
+        batch_button = tk.Button(event_tab, text="Batch Score Entry",
+                                 command=lambda: self.show_batch_scores_window(view, event_id, event_type))
+        batch_button.pack(side=tk.BOTTOM, pady=5)
+        view.pack(fill=tk.BOTH, expand=True)
+
+        # Retrieve participants/teams and their points for the event
+        self.refresh_treeview(view, event_id, event_type)
+
+        # Bind the edit_points method to the treeview
+        view.tree.bind('<Double-1>',
+                       lambda event, view=view, event_id=event_id, event_type=event_type: self.edit_points(event,
+                                                                                                           view,
+                                                                                                           event_id,
+                                                                                                           event_type))
+        return view
+
     def populate_scoreboard_tab(self, scoreboard_tab):
-        # Create a treeview widget for displaying the tournament scoreboard
-        tree = ttk.Treeview(scoreboard_tab, columns=("Rank", "Team/Participant", "Total Points"), show="headings",
-                            style="Treeview")
-        tree.heading("Rank", text="Rank")
-        tree.heading("Team/Participant", text="Team/Participant")
-        tree.heading("Total Points", text="Total Points")
-        tree.pack(fill=tk.BOTH, expand=True)
+        # Create a leaderboard for displaying the tournament scoreboard (only the first time)
+        view = getattr(scoreboard_tab, 'view', None)
+        if view is None:
+            view = LeaderboardView(scoreboard_tab, ("Rank", "Team/Participant", "Total Points"),
+                                   lambda engine: engine.scoreboard_count(),
+                                   lambda engine, offset, limit: [(row[0],) + row[2:] for row in engine.scoreboard(offset, limit)],
+                                   self.worker)
+            view.pack(fill=tk.BOTH, expand=True)
+            scoreboard_tab.view = view
 
         # Retrieve participants and their total points across all events from the database
-        self.cursor.execute("""
-            SELECT
-                COALESCE(p.TeamID, 'Individual') AS TeamOrIndividual,
-                COALESCE(t.TeamName, p.Name) AS TeamOrParticipant,
-                COALESCE(SUM(ep.PointsEarned), 
-                         (SELECT SUM(ep2.PointsEarned) 
-                          FROM EventParticipants ep2
-                          WHERE ep2.TeamID = p.TeamID)) AS TotalPoints
-            FROM Participants p
-            LEFT JOIN Teams t ON p.TeamID = t.TeamID
-            LEFT JOIN EventParticipants ep ON p.ParticipantID = ep.ParticipantID
-            GROUP BY TeamOrIndividual, TeamOrParticipant
-            Order BY TotalPoints DESC
-        """)
-        participants = self.cursor.fetchall()
-
-        # Insert participants and their total points into the treeview
-        for rank, participant in enumerate(participants, start=1):
-            tree.insert("", "end", values=(rank, participant[1], participant[2]), tags=('centered',))
-
-        # Center the text in all columns
-        for col in tree["columns"]:
-            tree.heading(col, anchor="center")
-            tree.column(col, anchor="center")
-
-    def edit_points(self, event, tree, event_id, event_type):
+        view.refresh()
+
+    def edit_points(self, event, view, event_id, event_type):
+        tree = view.tree
+
         # Identify the item clicked on
-        item = tree.selection()[0]
+        selection = tree.selection()
+        if not selection:
+            return
+        item = selection[0]
 
         # Retrieve current points value, participant/team ID, and rank
         current_points = tree.item(item, "values")[3]
@@ -470,7 +369,6 @@ class RegistrationApp:
             participant_id = tree.item(item, "values")[1]
         elif event_type == 'Team-based':
             team_id = tree.item(item, "values")[1]
-        rank = tree.item(item, "values")[0]
 
         # Prompt the user to input new points value
         new_points = simpledialog.askinteger("Edit Points", f"Enter new points for {tree.item(item, 'values')[2]}:",
@@ -485,78 +383,81 @@ class RegistrationApp:
             return
 
         # Update the points value in the database
-        if event_type == 'Individual':
-            self.cursor.execute("""
-                UPDATE EventParticipants 
-                SET PointsEarned = ? 
-                WHERE EventID = ? 
-                AND ParticipantID = ?
-            """, (new_points, event_id, participant_id))
-        elif event_type == 'Team-based':
-            self.cursor.execute("""
-                UPDATE EventParticipants 
-                SET PointsEarned = ? 
-                WHERE EventID = ? 
-                AND TeamID = ?
-            """, (new_points, event_id, team_id))
-
-        self.conn.commit()
-
-        # Update the displayed value in the treeview
-        tree.item(item, values=(rank, tree.item(item, "values")[1], tree.item(item, "values")[2], new_points))
-
-        # Reorder participants in the treeview based on the updated points
-        self.refresh_treeview(tree, event_id, event_type)
+        entrant_id = participant_id if event_type == 'Individual' else team_id
+        try:
+            self.engine.update_points(event_id, event_type, entrant_id, new_points)
+        except RegistrationError as e:
+            messagebox.showerror("Error", str(e))
+            return
 
-    def refresh_treeview(self, tree, event_id, event_type):
-        # Clear the existing items in the treeview
-        tree.delete(*tree.get_children())
+        # Move just the edited row to its new place instead of reloading the whole event
+        view.update_points(item, new_points)
+
+    def show_batch_scores_window(self, view, event_id, event_type):
+        batch_window = tk.Toplevel(self.master)
+        batch_window.title("Batch Score Entry")
+        batch_window.geometry("400x500")
+
+        label_info = tk.Label(batch_window, text="One entry per line: ID, name (optional), points")
+        label_info.pack()
+
+        # Plain text grid, so whole result sheets can be typed or pasted from a spreadsheet
+        text_frame = tk.Frame(batch_window)
+        text_frame.pack(fill=tk.BOTH, expand=True)
+        scrollbar = tk.Scrollbar(text_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        scores_text = tk.Text(text_frame, height=15, yscrollcommand=scrollbar.set)
+        scores_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=scores_text.yview)
+
+        # Start from the current results of the event
+        def show_current_scores(rows):
+            if scores_text.winfo_exists() and not scores_text.get("1.0", tk.END).strip():
+                scores_text.insert("1.0", "\n".join(f"{entrant_id}\t{name}\t{points}"
+                                                    for _, entrant_id, name, points in rows))
+
+        self.worker.submit(lambda engine: engine.event_leaderboard(event_id, event_type), show_current_scores)
+
+        def import_file():
+            file_path = filedialog.askopenfilename(parent=batch_window, title="Import Scores",
+                                                   filetypes=[("CSV files", "*.csv"), ("Text files", "*.txt"),
+                                                              ("All files", "*.*")])
+            if not file_path:
+                return
+            try:
+                with open(file_path, encoding='utf-8') as scores_file:
+                    text = scores_file.read()
+            except (OSError, UnicodeDecodeError) as e:
+                messagebox.showerror("Error", f"Could not read {file_path}: {e}", parent=batch_window)
+                return
+            scores_text.delete("1.0", tk.END)
+            scores_text.insert("1.0", text)
+
+        def submit_scores():
+            try:
+                scores = parse_score_lines(scores_text.get("1.0", tk.END).splitlines())
+                count = self.engine.update_points_many(event_id, event_type, scores)
+            except RegistrationError as e:
+                messagebox.showerror("Error", str(e), parent=batch_window)
+                return
+            messagebox.showinfo("Scores Saved", f"Points saved for {count} entries.", parent=batch_window)
+            self.refresh_treeview(view, event_id, event_type)
+            batch_window.destroy()
+
+        button_frame = tk.Frame(batch_window)
+        button_frame.pack()
+        import_button = tk.Button(button_frame, text="Import File", command=import_file)
+        import_button.pack(side=tk.LEFT, padx=5)
+        submit_button = tk.Button(button_frame, text="Submit", command=submit_scores)
+        submit_button.pack(side=tk.LEFT, padx=5)
+
+        self.create_exit_help_buttons(batch_window,
+                                      "In this window you can enter the results of a whole event at once. Each line holds the ID of a participant or team and their points, separated by tabs, commas or spaces; a name column in between is ignored. You can paste results from a spreadsheet or import a CSV file, then click Submit to save all of them together. If you need assistance, click Help.",
+                                      is_first_window=False)
 
-        # Retrieve participants and their points for the current event from the database
-        if event_type == 'Individual':
-            query = """
-                SELECT 
-                    ep.ParticipantID, 
-                    COALESCE(p.Name, t.TeamName) AS Name, 
-                    ep.PointsEarned
-                FROM 
-                    EventParticipants ep
-                LEFT JOIN 
-                    Participants p ON p.ParticipantID = ep.ParticipantID
-                LEFT JOIN 
-                    Teams t ON t.TeamID = ep.TeamID
-                WHERE 
-                    ep.EventID = ?
-                ORDER BY 
-                    ep.PointsEarned DESC
-            """
-        elif event_type == 'Team-based':
-            query = """
-                SELECT 
-                    ep.TeamID, 
-                    t.TeamName, 
-                    ep.PointsEarned
-                FROM 
-                    Teams t
-                INNER JOIN 
-                    EventParticipants ep ON t.TeamID = ep.TeamID
-                WHERE 
-                    ep.EventID = ?
-                ORDER BY 
-                    ep.PointsEarned DESC
-            """
-
-        self.cursor.execute(query, (event_id,))
-        participants = self.cursor.fetchall()
-
-        # Insert participants and their points into the treeview
-        for rank, participant in enumerate(participants, start=1):
-            tree.insert("", "end", values=(rank, participant[0], participant[1], participant[2]), tags=('centered',))
-
-        # Center the text in all columns
-        for col in tree["columns"]:
-            tree.heading(col, anchor="center")
-            tree.column(col, anchor="center")
+    def refresh_treeview(self, view, event_id, event_type):
+        # Re-read the rows currently on screen for this event from the database
+        view.refresh()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# The programs import each other as top-level modules, the way they are run from this folder
+PROGRAM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROGRAM_DIR)
+
+from tournament_engine import TournamentEngine  # noqa: E402
+
+SHIPPED_DB = os.path.join(PROGRAM_DIR, 'Extras', 'tournament_management.db')
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    # A copy of the shipped database, so every test starts from the same data
+    path = str(tmp_path / 'tournament_management.db')
+    shutil.copyfile(SHIPPED_DB, path)
+    return path
+
+
+@pytest.fixture
+def engine(db_path):
+    engine = TournamentEngine(db_path)
+    yield engine
+    engine.close()
+
+
+@pytest.fixture
+def tournament(engine):
+    # engine switched to a new, empty tournament with shared ranks
+    engine.use_tournament(engine.create_tournament('Test Cup'))
+    return engine
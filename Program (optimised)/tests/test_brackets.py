@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+import brackets
+from tournament_engine import RegistrationError
+
+ALLOCATED = 120
+
+
+def event_with_entrants(engine, count):
+    event_id = engine.add_event('Chess', 'Individual', ALLOCATED)
+    for number in range(count):
+        engine.register_individual(f'Player {number + 1}', [event_id])
+    return event_id
+
+
+def ready_matches(engine, event_id):
+    return [match for match in brackets.event_matches(engine, event_id) if match[9] == 'ready']
+
+
+def play_out(engine, event_id, rng, draws=False):
+    # Records a result for every ready match until none is left; returns the number of results
+    played = 0
+    while True:
+        matches = ready_matches(engine, event_id)
+        if not matches:
+            return played
+        for match in matches:
+            score_a, score_b = rng.choice([(1, 0), (0, 1)] + ([(1, 1)] if draws else []))
+            brackets.record_result(engine, match[0], score_a, score_b)
+            played += 1
+
+
+def points(engine, event_id):
+    return {row[2]: row[3] for row in engine.event_leaderboard(event_id, 'Individual')}
+
+
+@pytest.mark.parametrize('entrants', [2, 5, 8, 13])
+def test_single_elimination_crowns_one_winner(tournament, entrants):
+    event_id = event_with_entrants(tournament, entrants)
+    brackets.create_bracket(tournament, event_id, 'single')
+
+    # Every entrant but the winner loses exactly once
+    assert play_out(tournament, event_id, random.Random(entrants)) == entrants - 1
+    final = [match for match in brackets.event_matches(tournament, event_id) if match[9] == 'done'][-1]
+    scores = points(tournament, event_id)
+    assert scores[final[8]] == ALLOCATED
+    assert sorted(scores.values())[-2] < ALLOCATED
+
+
+@pytest.mark.parametrize('entrants', [2, 3, 6, 9])
+def test_double_elimination_plays_until_everyone_but_the_winner_lost_twice(tournament, entrants):
+    event_id = event_with_entrants(tournament, entrants)
+    brackets.create_bracket(tournament, event_id, 'double')
+
+    # No bracket reset: the final is the last match whoever wins it
+    assert play_out(tournament, event_id, random.Random(entrants)) == 2 * entrants - 2
+    assert list(points(tournament, event_id).values()).count(ALLOCATED) == 1
+
+
+def test_knockout_results_are_checked(tournament):
+    event_id = event_with_entrants(tournament, 4)
+    brackets.create_bracket(tournament, event_id, 'single')
+    first, second = ready_matches(tournament, event_id)[:2]
+
+    with pytest.raises(RegistrationError, match="needs a winner"):
+        brackets.record_result(tournament, first[0], 2, 2)
+    brackets.record_result(tournament, first[0], 2, 1)
+    with pytest.raises(RegistrationError, match="already has a result"):
+        brackets.record_result(tournament, first[0], 2, 1)
+    final = [match for match in brackets.event_matches(tournament, event_id) if match[9] == 'waiting'][0]
+    with pytest.raises(RegistrationError, match="waiting for its entrants"):
+        brackets.record_result(tournament, final[0], 1, 0)
+    with pytest.raises(RegistrationError, match="already has a bracket"):
+        brackets.create_bracket(tournament, event_id, 'single')
+
+
+def test_swiss_rounds_have_no_rematches(tournament):
+    event_id = event_with_entrants(tournament, 15)
+    rng = random.Random(7)
+    brackets.create_bracket(tournament, event_id, 'swiss', rounds=5)
+    play_out(tournament, event_id, rng, draws=True)
+    for _ in range(4):
+        brackets.next_round(tournament, event_id)
+        play_out(tournament, event_id, rng, draws=True)
+    with pytest.raises(RegistrationError, match="All 5 rounds"):
+        brackets.next_round(tournament, event_id)
+
+    assert [row[3] for row in brackets.event_rounds(tournament, event_id)] == [0] * 5
+    met = [frozenset(match[4:6]) for match in brackets.event_matches(tournament, event_id) if match[9] == 'done']
+    assert len(met) == len(set(met)) == 5 * 7
+    assert max(points(tournament, event_id).values()) <= ALLOCATED
+
+
+def test_next_round_waits_for_results(tournament):
+    event_id = event_with_entrants(tournament, 6)
+    brackets.create_bracket(tournament, event_id, 'swiss', rounds=3)
+    with pytest.raises(RegistrationError, match="needs a result first"):
+        brackets.next_round(tournament, event_id)
+
+
+def test_round_robin_pairs_everyone_once(tournament):
+    event_id = event_with_entrants(tournament, 5)
+    rng = random.Random(3)
+    brackets.create_bracket(tournament, event_id, 'round_robin')
+    play_out(tournament, event_id, rng, draws=True)
+    for _ in range(4):
+        brackets.next_round(tournament, event_id)
+        play_out(tournament, event_id, rng, draws=True)
+
+    met = [frozenset(match[4:6]) for match in brackets.event_matches(tournament, event_id) if match[9] == 'done']
+    assert len(met) == len(set(met)) == 5 * 4 // 2
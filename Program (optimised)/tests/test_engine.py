@@ -0,0 +1,117 @@
+import pytest
+
+from tournament_engine import RegistrationError
+
+
+def add_events(engine):
+    return (engine.add_event('Sprint', 'Individual', 100),
+            engine.add_event('Relay', 'Team-based', 100))
+
+
+def test_register_individual(tournament):
+    sprint, _ = add_events(tournament)
+    participant_id = tournament.register_individual('  Ada  ', [sprint])
+
+    assert tournament.participant_exists('Ada')
+    assert [row[1:] for row in tournament.event_leaderboard(sprint, 'Individual')] == [(participant_id, 'Ada', 0)]
+    assert tournament.individual_count() == 1
+
+
+@pytest.mark.parametrize('name, event_ids, message', [
+    ('', [1], "nickname"),
+    ('Bob', [], "at least one event"),
+])
+def test_register_individual_rejects_incomplete_forms(tournament, name, event_ids, message):
+    with pytest.raises(RegistrationError, match=message):
+        tournament.register_individual(name, event_ids)
+
+
+def test_register_individual_rejects_taken_nickname(tournament):
+    sprint, _ = add_events(tournament)
+    tournament.register_individual('Ada', [sprint])
+    with pytest.raises(RegistrationError, match="already exists"):
+        tournament.register_individual('Ada', [sprint])
+    assert tournament.individual_count() == 1
+
+
+def test_register_checks_event_types(tournament):
+    sprint, relay = add_events(tournament)
+    with pytest.raises(RegistrationError, match="not an Individual event"):
+        tournament.register_individual('Ada', [relay])
+    with pytest.raises(RegistrationError, match="not an Team-based event"):
+        tournament.register_team('Owls', ['Ann'], [sprint])
+    with pytest.raises(RegistrationError, match="does not exist"):
+        tournament.register_individual('Ada', [9999])
+    assert tournament.participant_count() == 0
+
+
+def test_register_team(tournament):
+    _, relay = add_events(tournament)
+    team_id = tournament.register_team('Owls', ['Ann', 'Ben'], [relay])
+
+    assert tournament.team_exists('Owls')
+    assert [row[1:] for row in tournament.event_leaderboard(relay, 'Team-based')] == [(team_id, 'Owls', 0)]
+    assert tournament.participant_count() == 2
+    assert tournament.team_count() == 1
+
+
+def test_limits_are_enforced(tournament):
+    sprint, relay = add_events(tournament)
+    tournament.set_limits(max_participants=3, max_team_members=2)
+    with pytest.raises(RegistrationError, match="at most 2 members"):
+        tournament.register_team('Owls', ['Ann', 'Ben', 'Cy'], [relay])
+    tournament.register_team('Owls', ['Ann', 'Ben'], [relay])
+    tournament.register_individual('Ada', [sprint])
+    with pytest.raises(RegistrationError, match="Maximum participant limit reached."):
+        tournament.register_individual('Bob', [sprint])
+    assert tournament.participant_count() == 3
+
+
+def test_update_points(tournament):
+    sprint, _ = add_events(tournament)
+    ada = tournament.register_individual('Ada', [sprint])
+    bob = tournament.register_individual('Bob', [sprint])
+
+    tournament.update_points(sprint, 'Individual', bob, 7)
+    assert [row[1:] for row in tournament.event_leaderboard(sprint, 'Individual')] == [(bob, 'Bob', 7),
+                                                                                       (ada, 'Ada', 0)]
+    assert tournament.scoreboard()[0][2:] == ('Bob', 7)
+
+    with pytest.raises(RegistrationError, match="Invalid points"):
+        tournament.update_points(sprint, 'Individual', ada, -1)
+    with pytest.raises(RegistrationError, match="Not registered"):
+        tournament.update_points(sprint, 'Individual', 9999, 1)
+
+
+def test_update_points_many_writes_all_or_nothing(tournament):
+    sprint, _ = add_events(tournament)
+    ada = tournament.register_individual('Ada', [sprint])
+    bob = tournament.register_individual('Bob', [sprint])
+
+    with pytest.raises(RegistrationError, match="Not registered"):
+        tournament.update_points_many(sprint, 'Individual', [(ada, 5), (9999, 3)])
+    assert {row[3] for row in tournament.event_leaderboard(sprint, 'Individual')} == {0}
+
+    assert tournament.update_points_many(sprint, 'Individual', [(ada, 5), (bob, 3)]) == 2
+    assert [row[3] for row in tournament.event_leaderboard(sprint, 'Individual')] == [5, 3]
+
+
+@pytest.mark.parametrize('ranking_method, ranks', [
+    ('shared', [1, 1, 3, 4]),
+    ('dense', [1, 1, 2, 3]),
+    ('registration', [1, 2, 3, 4]),
+    ('head_to_head', [1, 1, 3, 4]),
+])
+def test_ranking_methods(engine, ranking_method, ranks):
+    engine.use_tournament(engine.create_tournament('Ranked Cup', ranking_method=ranking_method))
+    sprint, _ = add_events(engine)
+    entrants = [engine.register_individual(name, [sprint]) for name in ('Ada', 'Bob', 'Cy', 'Dee')]
+    engine.update_points_many(sprint, 'Individual', zip(entrants, (10, 10, 5, 0)))
+
+    leaderboard = engine.event_leaderboard(sprint, 'Individual')
+    assert [row[0] for row in leaderboard] == ranks
+    # Equal points come out in registration order
+    assert [row[2] for row in leaderboard] == ['Ada', 'Bob', 'Cy', 'Dee']
+    assert [row[0] for row in engine.scoreboard()] == ranks
+    # A page carries the same ranks as the whole leaderboard
+    assert engine.event_leaderboard(sprint, 'Individual', 1, 2) == leaderboard[1:3]
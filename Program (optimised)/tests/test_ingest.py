@@ -0,0 +1,44 @@
+from ingest import IngestWriter, individual_command, team_command
+
+
+def registrations(engine):
+    return engine.conn.execute("SELECT COUNT(*) FROM EventParticipants").fetchone()[0]
+
+
+def test_register_commands_with_bad_events_are_rejected(db_path):
+    writer = IngestWriter(db_path)
+    try:
+        before = registrations(writer.engine)
+        commands = [
+            individual_command('Sneaky', [6, 1]),  # event 1 is a team event
+            individual_command('Ghost', [999]),  # no such event
+            team_command('TT', ['x'], [6]),  # event 6 is an individual event
+            team_command('Nowhere', ['y'], [999]),
+        ]
+        errors = writer.write_batch(commands)
+
+        assert [command for command, _ in errors] == commands
+        assert "is not an Individual event" in errors[0][1]
+        assert "does not exist" in errors[1][1]
+        assert "is not an Team-based event" in errors[2][1]
+        assert "does not exist" in errors[3][1]
+        assert registrations(writer.engine) == before
+        assert not writer.engine.participant_exists('Sneaky')
+        assert not writer.engine.team_exists('TT')
+    finally:
+        writer.close()
+
+
+def test_good_commands_are_written_next_to_rejected_ones(db_path):
+    writer = IngestWriter(db_path)
+    try:
+        errors = writer.write_batch([
+            individual_command('Solo', [6, 7]),
+            individual_command('Sneaky', [1]),
+            team_command('Squad', ['a', 'b'], [1]),
+        ])
+        assert len(errors) == 1 and errors[0][0][2] == 'Sneaky'
+        assert writer.engine.participant_exists('Solo')
+        assert writer.engine.team_exists('Squad')
+    finally:
+        writer.close()
@@ -0,0 +1,55 @@
+import sqlite3
+
+from migrations import MIGRATIONS, migrate, schema_version
+from tournament_engine import TournamentEngine
+
+
+def table_counts(conn):
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('Participants', 'Teams', 'Events', 'EventParticipants')}
+
+
+def test_shipped_database_migrates_to_the_latest_version(db_path):
+    conn = sqlite3.connect(db_path)
+    assert schema_version(conn) < MIGRATIONS[-1][0]
+    before = table_counts(conn)
+
+    assert migrate(conn) == [version for version, _, _ in MIGRATIONS]
+    assert schema_version(conn) == MIGRATIONS[-1][0]
+    assert table_counts(conn) == before
+    # Every row now belongs to the default tournament
+    assert conn.execute("SELECT COUNT(*) FROM EventParticipants WHERE TournamentID IS NULL").fetchone()[0] == 0
+    conn.close()
+
+
+def test_migrating_again_changes_nothing(db_path):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    assert migrate(conn) == []
+    conn.close()
+
+
+def test_standings_and_counters_match_the_registrations(db_path):
+    engine = TournamentEngine(db_path)
+    try:
+        conn = engine.conn
+        totals = dict(conn.execute("""
+            SELECT 'Individual:' || ParticipantID, SUM(PointsEarned) FROM EventParticipants
+            WHERE ParticipantID IS NOT NULL GROUP BY ParticipantID
+            UNION ALL
+            SELECT 'Team:' || TeamID, SUM(PointsEarned) FROM EventParticipants
+            WHERE TeamID IS NOT NULL GROUP BY TeamID
+        """).fetchall())
+        standings = dict(conn.execute(
+            "SELECT EntrantType || ':' || EntrantID, TotalPoints FROM Standings WHERE TournamentID = ?",
+            (engine.tournament_id,)).fetchall())
+        assert {key: standings.get(key) for key in totals} == totals
+
+        participants = conn.execute("SELECT COUNT(*) FROM Participants").fetchone()[0]
+        individuals = conn.execute("SELECT COUNT(*) FROM Participants WHERE TeamID IS NULL").fetchone()[0]
+        teams = conn.execute("SELECT COUNT(*) FROM Teams").fetchone()[0]
+        assert engine.participant_count() == participants
+        assert engine.individual_count() == individuals
+        assert engine.team_count() == teams
+    finally:
+        engine.close()
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from pairings import assign_sides, round_robin_pairs, round_robin_rounds, swiss_pairings
+
+
+def play_swiss(players, rounds, rng):
+    # Plays rounds Swiss rounds with random results; returns the rematches made in each round
+    scores = {player: 0 for player in players}
+    opponents = {player: set() for player in players}
+    had_bye = set()
+    rematches = []
+    for _ in range(rounds):
+        standings = sorted(players, key=lambda player: (-scores[player], player))
+        pairs, bye, round_rematches = swiss_pairings(standings, scores, opponents, had_bye)
+        rematches.append(round_rematches)
+
+        seated = [player for pair in pairs for player in pair] + ([bye] if bye is not None else [])
+        assert sorted(seated) == sorted(players)
+        if bye is not None:
+            had_bye.add(bye)
+            scores[bye] += 2
+        for first, second in pairs:
+            assert second not in opponents[first]
+            opponents[first].add(second)
+            opponents[second].add(first)
+            result = rng.choice([(2, 0), (0, 2), (1, 1)])
+            scores[first] += result[0]
+            scores[second] += result[1]
+    return rematches
+
+
+@pytest.mark.parametrize('field, rounds', [(8, 3), (15, 5), (64, 6), (33, 7)])
+def test_swiss_pairings_avoid_rematches(field, rounds):
+    for seed in range(5):
+        assert play_swiss(list(range(1, field + 1)), rounds, random.Random(seed)) == [0] * rounds
+
+
+def test_swiss_bye_goes_to_the_lowest_ranked_entrant_without_one():
+    standings = [1, 2, 3, 4, 5]
+    scores = dict.fromkeys(standings, 0)
+    _, bye, _ = swiss_pairings(standings, scores, {}, had_bye={5})
+    assert bye == 4
+
+
+def test_swiss_pairs_top_half_against_bottom_half():
+    standings = list(range(1, 9))
+    pairs, bye, rematches = swiss_pairings(standings, dict.fromkeys(standings, 0), {})
+    assert pairs == [(1, 5), (2, 6), (3, 7), (4, 8)]
+    assert (bye, rematches) == (None, 0)
+
+
+@pytest.mark.parametrize('field', [2, 5, 6, 9])
+def test_round_robin_meets_everyone_once(field):
+    players = list(range(1, field + 1))
+    met = []
+    byes = []
+    for round_number in range(1, round_robin_rounds(field) + 1):
+        pairs, bye = round_robin_pairs(players, round_number)
+        met.extend(frozenset(pair) for pair in pairs)
+        byes.append(bye)
+    assert len(met) == len(set(met)) == field * (field - 1) // 2
+    if field % 2:
+        assert sorted(byes) == players
+    else:
+        assert byes == [None] * (field - 1)
+
+
+def test_assign_sides_balances_sides():
+    pairs = [(1, 2), (3, 4)]
+    assert assign_sides(pairs, {1: 1, 2: -1, 3: 0, 4: 0}, {3: 'B', 4: 'A'}) == [(2, 1), (3, 4)]
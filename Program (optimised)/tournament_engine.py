@@ -0,0 +1,455 @@
+import random
+import sqlite3
+import time
+
+from metadata_cache import database_key, shared_cache
+from migrations import migrate
+from profiler import profile_from_environment
+from queries import DEFAULT_RANKING_METHOD, EVENT_TYPES, RANKING_METHODS, QueryRegistry, ranked_name, typed_name
+
+DEFAULT_DB_PATH = 'Extras/tournament_management.db'
+
+# The tournament older database files are migrated into
+DEFAULT_TOURNAMENT_ID = 1
+
+# Registration limits given to new tournaments (each tournament stores its own)
+MAX_PARTICIPANTS = 40
+MAX_INDIVIDUALS = 20
+MAX_TEAMS = 4
+MAX_TEAM_MEMBERS = 5
+
+# Write transactions that find the database locked (after busy_timeout) are retried this many times,
+# waiting BUSY_BACKOFF seconds the first time and twice as long every next time
+BUSY_RETRIES = 4
+BUSY_BACKOFF = 0.05
+
+# SQLite settings applied every time a connection is opened.
+# "baseline" is SQLite's own behaviour and is only kept for benchmarking against.
+CONNECTION_PROFILES = {
+    'baseline': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,  # negative values are KiB, so about 2 MB
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,  # ms to wait for a lock before "database is locked"
+    },
+    'tuned': {
+        # Readers no longer block the writer and a commit is an append to the WAL file
+        'journal_mode': 'WAL',
+        # In WAL mode NORMAL can only lose the last commits on power loss, never corrupt the file
+        'synchronous': 'NORMAL',
+        'cache_size': -32000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'durable': {
+        # Same as "tuned" but every commit is flushed to disk
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -32000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+}
+DEFAULT_PROFILE = 'tuned'
+
+
+def connect(db_path=DEFAULT_DB_PATH, profile=DEFAULT_PROFILE, check_same_thread=True):
+    # Opens a connection with one of CONNECTION_PROFILES (by name) or a dict of pragmas.
+    # check_same_thread=False is for callers that share the connection between threads behind a lock.
+    settings = CONNECTION_PROFILES[profile] if isinstance(profile, str) else profile
+    # Big enough statement cache to keep every statement of queries.QUERIES prepared
+    conn = sqlite3.connect(db_path, cached_statements=256, check_same_thread=check_same_thread)
+    for pragma, value in settings.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+class RegistrationError(Exception):
+    # Raised when a registration or score update breaks one of the tournament rules.
+    # The message is meant to be shown to the user as it is.
+    pass
+
+
+def parse_score_lines(lines):
+    # Reads "ID, points" lines as typed or pasted into the batch score grid or read from a CSV file.
+    # Tabs, commas, semicolons or spaces separate the fields; anything between the ID and the points
+    # (e.g. a name column) is ignored, and so is a header line. Returns a list of (ID, points).
+    scores = []
+    for line_number, line in enumerate(lines, start=1):
+        fields = line.replace('\t', ',').replace(';', ',').split(',')
+        fields = [field.strip() for field in fields if field.strip()]
+        if len(fields) == 1:
+            fields = fields[0].split()
+        if not fields:
+            continue
+        if len(fields) < 2:
+            raise RegistrationError(f"Line {line_number}: expected an ID and points.")
+        try:
+            entrant_id = int(fields[0])
+        except ValueError:
+            if not scores:
+                continue  # header line
+            raise RegistrationError(f"Line {line_number}: '{fields[0]}' is not an ID.")
+        try:
+            points = int(fields[-1])
+        except ValueError:
+            raise RegistrationError(f"Line {line_number}: '{fields[-1]}' is not a whole number of points.")
+        scores.append((entrant_id, points))
+    return scores
+
+
+def is_busy(error):
+    # True for the errors another connection holding the write lock causes
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def constraint_message(error, duplicate_messages):
+    # Message for the user about a write the database refused
+    message = str(error)
+    if message.startswith('UNIQUE constraint failed: '):
+        table = message[len('UNIQUE constraint failed: '):].split('.')[0]
+        return duplicate_messages.get(table, "This entry already exists.")
+    # Messages raised by the limit triggers are meant for the user already
+    return message
+
+
+class TournamentEngine:
+    # Works on one tournament of the database file; everything it reads and registers
+    # belongs to tournament_id.
+    def __init__(self, db_path=DEFAULT_DB_PATH, profile=DEFAULT_PROFILE, check_same_thread=True,
+                 tournament_id=DEFAULT_TOURNAMENT_ID):
+        self.db_path = db_path
+        self.conn = connect(db_path, profile, check_same_thread)
+
+        # Bring older database files up to the current schema
+        migrate(self.conn)
+
+        # Named statements with per-statement timing (see queries.py)
+        self.queries = QueryRegistry(self.conn)
+        # Slow-query log, only when switched on through the environment (see profiler.py)
+        self.profiler = profile_from_environment(self)
+
+        # Events and names are shared with the other engines of this process (see metadata_cache.py)
+        self.metadata = shared_cache
+        self.database = database_key(db_path)
+        self.metadata_checked_at = None
+        self.metadata_versions = {}
+
+        self.tournament_id = None
+        self.tournament_name = None
+        self.use_tournament(tournament_id)
+
+    def close(self):
+        if self.profiler is not None:
+            self.profiler.detach()
+        self.conn.close()
+
+    # ---------- Tournaments ----------
+
+    def use_tournament(self, tournament_id):
+        # Switches the engine to another tournament and loads its limits
+        row = self.queries.fetchone('tournament_by_id', (tournament_id,))
+        if row is None:
+            raise RegistrationError(f"Tournament {tournament_id} does not exist.")
+        (self.tournament_id, self.tournament_name, self.max_participants, self.max_individuals,
+         self.max_teams, self.max_team_members, self.ranking_method) = row
+
+    def load_tournaments(self):
+        # (TournamentID, Name, RankingMethod) of every tournament in the file
+        return self.queries.fetchall('all_tournaments')
+
+    def create_tournament(self, name, max_participants=MAX_PARTICIPANTS, max_individuals=MAX_INDIVIDUALS,
+                          max_teams=MAX_TEAMS, max_team_members=MAX_TEAM_MEMBERS,
+                          ranking_method=DEFAULT_RANKING_METHOD):
+        name = name.strip()
+        if not name:
+            raise RegistrationError("Please fill in the tournament name.")
+        self.check_ranking_method(ranking_method)
+        return self.write_transaction(
+            lambda: self.queries.execute('insert_tournament', (name, max_participants, max_individuals, max_teams,
+                                                               max_team_members, ranking_method)).lastrowid,
+            {'Tournaments': "Tournament name already exists. Please choose a different one."})
+
+    def set_limits(self, max_participants=None, max_individuals=None, max_teams=None, max_team_members=None):
+        # Changes the current tournament's limits; limits left as None stay as they are
+        limits = [self.max_participants if max_participants is None else max_participants,
+                  self.max_individuals if max_individuals is None else max_individuals,
+                  self.max_teams if max_teams is None else max_teams,
+                  self.max_team_members if max_team_members is None else max_team_members]
+        if any(limit < 0 for limit in limits):
+            raise RegistrationError("Limits cannot be negative.")
+        self.write_transaction(lambda: self.queries.execute('update_tournament_limits', limits + [self.tournament_id]))
+        self.max_participants, self.max_individuals, self.max_teams, self.max_team_members = limits
+
+    def check_ranking_method(self, ranking_method):
+        if ranking_method not in RANKING_METHODS:
+            raise RegistrationError(f"Unknown ranking method: {ranking_method}. "
+                                    f"Choose one of: {', '.join(RANKING_METHODS)}.")
+
+    def set_ranking_method(self, ranking_method):
+        # Changes how the current tournament ranks entrants with equal points (see queries.RANKING_METHODS)
+        self.check_ranking_method(ranking_method)
+        self.write_transaction(lambda: self.queries.execute('update_tournament_ranking',
+                                                            (ranking_method, self.tournament_id)))
+        self.ranking_method = ranking_method
+
+    # ---------- Cached metadata ----------
+
+    def metadata_version(self, kind):
+        # Current MetadataVersions counter for 'events' or 'names'. It is only read again after a
+        # commit by another connection (data_version) or by this one (total_changes).
+        checked_at = (self.data_version(), self.conn.total_changes)
+        if checked_at != self.metadata_checked_at:
+            self.metadata_versions = dict(self.queries.fetchall('metadata_versions'))
+            self.metadata_checked_at = checked_at
+        return self.metadata_versions[kind]
+
+    def cached(self, kind, key, load):
+        if self.database is None:
+            return load()
+        return self.metadata.get(self.database, self.tournament_id, kind, key, self.metadata_version(kind), load)
+
+    def entrant_names(self, event_type):
+        # {ID: name} of the tournament's individual participants or teams
+        return self.cached('names', event_type, lambda: dict(
+            self.queries.fetchall(typed_name('entrant_names', event_type), (self.tournament_id,))))
+
+    # ---------- Events ----------
+
+    def load_events(self, event_type):
+        return list(self.cached('events', event_type, lambda: self.queries.fetchall(
+            'events_by_type', (self.tournament_id, event_type))))
+
+    def get_event(self, event_id):
+        # (EventID, EventName, EventType) or None if the tournament has no such event
+        return self.queries.fetchone('event_by_id', (self.tournament_id, event_id))
+
+    def add_event(self, event_name, event_type, points_allocated):
+        if event_type not in EVENT_TYPES:
+            raise RegistrationError(f"Unknown event type: {event_type}")
+        return self.write_transaction(lambda: self.queries.execute(
+            'insert_event', (self.tournament_id, event_name, event_type, points_allocated)).lastrowid)
+
+    # ---------- Registration ----------
+
+    def participant_exists(self, name):
+        return self.queries.scalar('participant_exists', (self.tournament_id, name)) > 0
+
+    def team_exists(self, team_name):
+        return self.queries.scalar('team_exists', (self.tournament_id, team_name)) > 0
+
+    def participant_count(self):
+        # Individuals and team members
+        return self.queries.scalar('participant_count', (self.tournament_id,))
+
+    def individual_count(self):
+        return self.queries.scalar('individual_count', (self.tournament_id,))
+
+    def team_count(self):
+        return self.queries.scalar('team_count', (self.tournament_id,))
+
+    def check_events(self, event_ids, event_type):
+        # Every event must be one of this tournament's events of event_type
+        for event_id in event_ids:
+            event = self.get_event(event_id)
+            if event is None:
+                raise RegistrationError(f"Event {event_id} does not exist in tournament {self.tournament_id}.")
+            if event[2] != event_type:
+                raise RegistrationError(f"Event '{event[1]}' is not an {event_type} event.")
+
+    def register_individual(self, name, event_ids):
+        name = name.strip()
+        if not name:
+            raise RegistrationError("Please fill in the participant nickname.")
+
+        # Check if at least one event is selected
+        if not event_ids:
+            raise RegistrationError("Please select at least one event.")
+
+        # Unique nicknames and the participant limits are checked by the database (see write_transaction)
+        def register():
+            # Checked inside the transaction, so an event can't be removed in between
+            self.check_events(event_ids, 'Individual')
+
+            # Insert the participant into the Participants table
+            participant_id = self.queries.execute('insert_participant',
+                                                  (None, self.tournament_id, name, None)).lastrowid
+
+            # Register the participant for each selected event in the EventParticipants table
+            self.queries.executemany('insert_registration',
+                                     [(self.tournament_id, event_id, participant_id, None, 0) for event_id in event_ids])
+            return participant_id
+
+        return self.write_transaction(register, {
+            'Participants': "Participant nickname already exists. Please choose a different one.",
+        })
+
+    def register_team(self, team_name, member_names, event_ids):
+        team_name = team_name.strip()
+        if not team_name:
+            raise RegistrationError("Please fill in the team name.")
+
+        # Check if at least one member name is provided
+        member_names = [name.strip() for name in member_names if name.strip()]
+        if not member_names:
+            raise RegistrationError("Please fill in at least one member name.")
+        if len(member_names) > self.max_team_members:
+            raise RegistrationError(f"A team can have at most {self.max_team_members} members.")
+
+        # Check if at least one event is selected
+        if not event_ids:
+            raise RegistrationError("Please select at least one event.")
+
+        # Unique names and the team limits are checked by the database (see write_transaction)
+        def register():
+            # Checked inside the transaction, so an event can't be removed in between
+            self.check_events(event_ids, 'Team-based')
+
+            # Insert the team into the Teams table
+            team_id = self.queries.execute('insert_team', (None, self.tournament_id, team_name)).lastrowid
+
+            # Insert team members into the Participants table
+            self.queries.executemany('insert_participant',
+                                     [(None, self.tournament_id, member_name, team_id) for member_name in member_names])
+
+            # Insert the team into the EventParticipants table for each selected event
+            self.queries.executemany('insert_registration',
+                                     [(self.tournament_id, event_id, None, team_id, 0) for event_id in event_ids])
+            return team_id
+
+        return self.write_transaction(register, {
+            'Teams': "Team name already exists. Please choose a different one.",
+            'Participants': "Member name already exists. Please choose a different one.",
+        })
+
+    def write_transaction(self, write, duplicate_messages=None):
+        # Runs write() in one BEGIN IMMEDIATE transaction and commits it, or rolls everything back.
+        # Taking the write lock up front means nothing can change between write()'s checks and its
+        # inserts. A locked database is retried with backoff. The database's own checks become
+        # RegistrationErrors: a broken UNIQUE constraint on table X gets duplicate_messages[X], and
+        # the limit triggers (migrations.add_capacity_checks) carry their message with them.
+        # Called inside another write_transaction, write() runs in a savepoint of the outer transaction
+        # instead: a failure undoes only its own changes and nothing is committed yet.
+        if self.conn.in_transaction:
+            return self.savepoint(write, duplicate_messages)
+
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                if not is_busy(e):
+                    raise
+                if attempt == BUSY_RETRIES:
+                    raise RegistrationError("The database is busy. Please try again.")
+                time.sleep(BUSY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
+        try:
+            result = write()
+        except sqlite3.IntegrityError as e:
+            self.conn.rollback()
+            raise RegistrationError(constraint_message(e, duplicate_messages or {}))
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return result
+
+    def savepoint(self, write, duplicate_messages=None):
+        self.conn.execute("SAVEPOINT engine_write")
+        try:
+            result = write()
+        except BaseException as e:
+            self.conn.execute("ROLLBACK TO engine_write")
+            self.conn.execute("RELEASE engine_write")
+            if isinstance(e, sqlite3.IntegrityError):
+                raise RegistrationError(constraint_message(e, duplicate_messages or {}))
+            raise
+        self.conn.execute("RELEASE engine_write")
+        return result
+
+    # ---------- Scoring ----------
+
+    def update_points(self, event_id, event_type, entrant_id, points):
+        if points is None or points < 0:
+            raise RegistrationError("Invalid points value. Please enter a non-negative integer.")
+
+        def write_points():
+            cursor = self.queries.execute(typed_name('update_points', event_type), (points, event_id, entrant_id))
+            if cursor.rowcount == 0:
+                raise RegistrationError(f"Not registered for this event: {entrant_id}")
+
+        self.write_transaction(write_points)
+
+    def update_points_many(self, event_id, event_type, scores):
+        # Writes a whole event's results, given as (entrant ID, points) pairs, in one transaction.
+        # Nothing is written if any of the rows is invalid.
+        scores = [(int(entrant_id), points) for entrant_id, points in scores]
+        for entrant_id, points in scores:
+            if points is None or points < 0:
+                raise RegistrationError(f"Invalid points value for {entrant_id}. "
+                                        f"Please enter a non-negative integer.")
+
+        def write_scores():
+            # Checked inside the transaction, so nobody can withdraw in between
+            registered = {row[0] for row in self.queries.fetchall(typed_name('event_entrant_ids', event_type),
+                                                                   (event_id,))}
+            unknown = [str(entrant_id) for entrant_id, _ in scores if entrant_id not in registered]
+            if unknown:
+                raise RegistrationError(f"Not registered for this event: {', '.join(unknown[:10])}"
+                                        + (" ..." if len(unknown) > 10 else ""))
+
+            self.queries.executemany(typed_name('update_points', event_type),
+                                     [(points, event_id, entrant_id) for entrant_id, points in scores])
+            return len(scores)
+
+        return self.write_transaction(write_scores)
+
+    # ---------- Standings ----------
+
+    def event_entrant_count(self, event_id, event_type):
+        return self.queries.scalar(typed_name('event_entrant_count', event_type), (event_id,))
+
+    def event_leaderboard(self, event_id, event_type, offset=0, limit=-1):
+        # Returns (Rank, ID, Name, Points) rows for one event, best first, ranked with the tournament's
+        # ranking method. offset/limit select one page of it (limit -1 means all rows).
+        name = ranked_name(typed_name('event_scores', event_type), self.ranking_method)
+        rows = self.queries.fetchall(name, (event_id, limit, offset))
+        names = self.entrant_names(event_type)
+        return [(rank, entrant_id, names[entrant_id], points) for rank, entrant_id, points in rows
+                if entrant_id in names]
+
+    def scoreboard_count(self):
+        return self.queries.scalar('scoreboard_count', (self.tournament_id,))
+
+    def scoreboard(self, offset=0, limit=-1):
+        # Returns (Rank, EntrantType, Name, TotalPoints) rows across all events, best first.
+        # Standings is kept up to date by triggers, so this is a single indexed read.
+        return self.queries.fetchall(ranked_name('scoreboard', self.ranking_method),
+                                     (self.tournament_id, limit, offset))
+
+    def data_version(self):
+        # A number that changes every time another connection commits a write, e.g. to invalidate caches
+        return self.queries.scalar('data_version')
+
+    # ---------- Live changes ----------
+
+    def last_change_id(self):
+        return self.queries.scalar('last_change_id')
+
+    def changes_since(self, change_id, limit=1000):
+        # Returns (ChangeID, TournamentID, ChangeType, EventParticipantID, EventID, EventType, entrant ID,
+        # Points) for the registration and score writes logged after change_id in any tournament, oldest first.
+        # ChangeType is 'register', 'points' or 'withdraw' (Points is None for 'withdraw').
+        return self.queries.fetchall('changes_since', (change_id, limit))
+
+    def event_rank(self, event_participant_id, ranking_method=None):
+        # Rank of one registration in its event's leaderboard, None if it was withdrawn.
+        # Ranked with the engine's tournament's method unless another one is given.
+        return self.queries.scalar(ranked_name('event_rank', ranking_method or self.ranking_method),
+                                   (event_participant_id,))